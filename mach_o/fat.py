@@ -1,12 +1,59 @@
+import cPickle
+import multiprocessing
+
 from headers.fat_header import FatHeader
 from headers.fat_arch import FatArch
 from mach_o import MachO
+from non_headers.arch_block import UnparsedArchBlock
+from utils.bytes import Bytes
+from utils.byte_range import ByteRange
+from utils.compact_byte_range import CompactSubranges, VirtualByteRangeStore
+from utils.header import IndexedHeader
 from utils.byte_range_parser import ByteRangeParser
+from utils.byte_range_registry import ByteRangeRegistry
+from utils.parse_context import ParseContext
+
+
+def _parse_arch(args):
+    """
+    Parse one architecture in a worker process. The file is opened as given by Bytes.open_args() of the
+    parent (memory-mapped unless it is PagedBytes) instead of receiving pickled bytes. The parsed byte
+    range and MachO are returned pickled with the number of indices of each IndexedHeader class allocated
+    by the worker.
+    """
+    (bytes_class, bytes_args, offset, size, validate, context) = args
+    bytes_ = bytes_class(*bytes_args)
+    root = ByteRange(0, len(bytes_), data=bytes_)
+    mach_o_br = root.add_subrange(offset, size)
+    macho = MachO(mach_o_br, validate, context)
+    root.data = None  # the file cannot be pickled
+    result = cPickle.dumps((mach_o_br, macho, context.index_counts()), 2)
+    bytes_.close()
+    return result
 
 
 class Fat(ByteRangeParser):
-    def __init__(self, fat_br):
+    def __init__(self, fat_br, validate=True, jobs=1, archs=None, context=None):
+        """
+        If archs is a list of architecture names (e.g. ['arm64']), only those architectures are parsed. The
+        others become opaque byte ranges.
+
+        If jobs is more than 1, architectures are parsed concurrently in a pool of up to jobs processes.
+        This requires the root byte range to hold a Bytes of a file. Header indices (e.g. section_64[N])
+        are the same as when architectures are parsed one after another.
+
+        context is the ParseContext of all architectures. (See MachO.) Default to the current context.
+        """
+        if context is None:
+            context = ParseContext.current()
         super(Fat, self).__init__(fat_br)
+        self.context = context
+        with context:
+            self._parse(validate, jobs, archs)
+
+    def _parse(self, validate, jobs, archs):
+        fat_br = self.byte_range
+        self.registry = ByteRangeRegistry(fat_br)
         self.initialize(0, len(fat_br))
 
         # Create the fat header
@@ -16,20 +63,94 @@ class Fat(ByteRangeParser):
 
         # Create all fat arch headers
         hdr_size = FatArch.get_size()
-        self.archs = list()
-        for arch_idx in xrange(self.fat_header.nfat_arch):
-            bytes_ = self.get_bytes(hdr_size)
-            fat_arch = FatArch(bytes_)
+        self.archs = FatArch.decode_array(self.get_bytes(self.fat_header.nfat_arch * hdr_size), 0,
+                                          self.fat_header.nfat_arch, validate)
+        for fat_arch in self.archs:
             self.add_subrange(fat_arch, hdr_size)
-            self.archs.append(fat_arch)
 
-        # Create Mach-O section for each architecture
-        for arch_idx in xrange(self.fat_header.nfat_arch):
-            fat_arch = self.archs[arch_idx]
+        # Select the architectures to be parsed
+        selected = self.select_archs(self.archs, archs)
+        if archs is not None:
+            for fat_arch in self.archs:
+                if fat_arch.arch_name() not in archs:
+                    self.byte_range.add_subrange(fat_arch.offset, fat_arch.size,
+                                                 data=UnparsedArchBlock(fat_arch.arch_name()))
+
+        # Create Mach-O section for each selected architecture
+        bytes_ = fat_br.root().data
+        if jobs > 1 and len(selected) > 1 and isinstance(bytes_, Bytes):
+            self._parse_archs_in_pool(selected, bytes_, validate, jobs)
+        else:
+            for fat_arch in selected:
+                mach_o_br = self.byte_range.add_subrange(fat_arch.offset, fat_arch.size)
+                macho = MachO(mach_o_br, validate, self.context)
+                mach_o_br.data = macho
+
+    @staticmethod
+    def select_archs(fat_archs, archs):
+        """
+        Return the fat archs whose names are in archs (all of them if archs is None). Raise ValueError if
+        none matches. fat_archs can also be any objects with an arch_name() method (e.g. MachOFile).
+        """
+        if archs is None:
+            return fat_archs
+        selected = [fat_arch for fat_arch in fat_archs if fat_arch.arch_name() in archs]
+        if len(selected) == 0:
+            raise ValueError('architecture %s not found. (Available: %s)' %
+                             (', '.join(archs), ', '.join([x.arch_name() for x in fat_archs])))
+        return selected
+
+    def _parse_archs_in_pool(self, fat_archs, bytes_, validate, jobs):
+        (bytes_class, bytes_args) = bytes_.open_args()
+        pool = multiprocessing.Pool(min(jobs, len(fat_archs)))
+        try:
+            results = pool.map(_parse_arch, [(bytes_class, bytes_args, fat_arch.offset, fat_arch.size, validate,
+                                              self.context) for fat_arch in fat_archs])
+        finally:
+            pool.close()
+            pool.join()
+        # Graft the parsed trees into this fat byte range
+        for (fat_arch, result) in zip(fat_archs, results):
             mach_o_br = self.byte_range.add_subrange(fat_arch.offset, fat_arch.size)
-            macho = MachO(mach_o_br)
+            (parsed_br, macho, index_counts) = cPickle.loads(result)
+            # Each worker indexes headers from the first index. Allocate the indices of this architecture
+            # in this context (as if it were parsed here) and move the headers to them.
+            shifts = dict()
+            for (cls, count) in index_counts.items():
+                shift = self.context.next_index(cls, count) - cls.FIRST_INDEX
+                if shift != 0:
+                    shifts[cls] = shift
+            if len(shifts) > 0:
+                self._shift_indices(parsed_br, shifts)
+            mach_o_br.graft(parsed_br)
             mach_o_br.data = macho
 
+    @staticmethod
+    def _shift_indices(byte_range, shifts):
+        """
+        Shift the indices of all IndexedHeader in a byte range tree by the shift of their classes. Virtual
+        children are not created. Their data factories shift the indices that they assign instead.
+        """
+        def shift(data):
+            delta = shifts.get(type(data))
+            if delta is not None and id(data) not in shifted:
+                assert isinstance(data, IndexedHeader)
+                data.shift_index(delta)
+                shifted.add(id(data))
+
+        shifted = set()
+        stack = [byte_range]
+        while len(stack) > 0:
+            br = stack.pop()
+            shift(br.data)
+            if isinstance(br.subranges, CompactSubranges) and isinstance(br.subranges._store, VirtualByteRangeStore):
+                store = br.subranges._store
+                store.data_factory.shift_indices(shifts)
+                for data in store.data.assigned_values():
+                    shift(data)
+            else:
+                stack.extend(br.subranges)
+
     def __repr__(self):
         out = '<Fat:\n'
         out += '  ' + str(self.fat_header) + '\n'
@@ -4,6 +4,7 @@ from utils.mapping import Mapping
 
 class CpuType(EnumField):
     CPU_ARCH_ABI64 = 0x01000000
+    CPU_ARCH_ABI64_32 = 0x02000000  # ILP32 on a 64-bit CPU
     CPU_TYPE_X86 = 7
     CPU_TYPE_ARM = 12
     CPU_TYPE_POWERPC = 18
@@ -17,6 +18,7 @@ class CpuType(EnumField):
         'CPU_TYPE_HPPA': 11,
         'CPU_TYPE_ARM': 12,
         'CPU_TYPE_ARM64': CPU_TYPE_ARM | CPU_ARCH_ABI64,
+        'CPU_TYPE_ARM64_32': CPU_TYPE_ARM | CPU_ARCH_ABI64_32,
         'CPU_TYPE_MC88000': 13,
         'CPU_TYPE_SPARC': 14,
         'CPU_TYPE_I860': 15,
@@ -41,13 +43,27 @@ class CpuSubType(Field):
     })
     ARM_SUBTYPES = Mapping({
         'CPU_SUBTYPE_ARM_ALL': 0,
+        'CPU_SUBTYPE_ARM_V4T': 5,
+        'CPU_SUBTYPE_ARM_V6': 6,
+        'CPU_SUBTYPE_ARM_V5TEJ': 7,
+        'CPU_SUBTYPE_ARM_XSCALE': 8,
         'CPU_SUBTYPE_ARM_V7': 9,
+        'CPU_SUBTYPE_ARM_V7F': 10,
         'CPU_SUBTYPE_ARM_V7S': 11,
+        'CPU_SUBTYPE_ARM_V7K': 12,
         'CPU_SUBTYPE_ARM_V8': 13,
+        'CPU_SUBTYPE_ARM_V6M': 14,
+        'CPU_SUBTYPE_ARM_V7M': 15,
+        'CPU_SUBTYPE_ARM_V7EM': 16,
     })
     ARM64_SUBTYPES = Mapping({
         'CPU_SUBTYPE_ARM64_ALL': 0,
         'CPU_SUBTYPE_ARM64_V8': 1,
+        'CPU_SUBTYPE_ARM64E': 2,
+    })
+    ARM64_32_SUBTYPES = Mapping({
+        'CPU_SUBTYPE_ARM64_32_ALL': 0,
+        'CPU_SUBTYPE_ARM64_32_V8': 1,
     })
     CPU_SUBTYPE_MASK = 0xff000000
     CPU_SUBTYPE_LIB64 = 0x80000000
@@ -63,7 +79,7 @@ class CpuSubType(Field):
     def _get_subtype_table(self, header):
         table = None  # not supported yet
         cpu_desc = self._get_cpu_type(header)
-        # Only support the popular types - x86, arm, arm64
+        # Only support the popular types - x86, arm, arm64, arm64_32
         if cpu_desc == 'CPU_TYPE_I386' or cpu_desc == 'CPU_TYPE_X86':
             table = self.X86_SUBTYPES
         elif cpu_desc == 'CPU_TYPE_X86_64':
@@ -72,6 +88,8 @@ class CpuSubType(Field):
             table = self.ARM_SUBTYPES
         elif cpu_desc == 'CPU_TYPE_ARM64':
             table = self.ARM64_SUBTYPES
+        elif cpu_desc == 'CPU_TYPE_ARM64_32':
+            table = self.ARM64_32_SUBTYPES
         return table
 
     def validate(self, header):
@@ -3,6 +3,32 @@ from cpu_type import CpuType, CpuSubType
 
 
 class FatArch(Header):
+    # Architecture names used by lipo(1) / -arch (as NXGetArchInfoFromCpuType() of <mach-o/arch.h> for the
+    # subtypes of <mach/machine.h>). Keyed by (cputype, cpusubtype)
+    ARCH_NAMES = {
+        (CpuType.CPU_TYPE_X86, 3): 'i386',
+        (CpuType.CPU_TYPE_X86 | CpuType.CPU_ARCH_ABI64, 3): 'x86_64',
+        (CpuType.CPU_TYPE_X86 | CpuType.CPU_ARCH_ABI64, 8): 'x86_64h',
+        (CpuType.CPU_TYPE_ARM, 0): 'arm',
+        (CpuType.CPU_TYPE_ARM, 5): 'armv4t',
+        (CpuType.CPU_TYPE_ARM, 6): 'armv6',
+        (CpuType.CPU_TYPE_ARM, 7): 'armv5',
+        (CpuType.CPU_TYPE_ARM, 8): 'xscale',
+        (CpuType.CPU_TYPE_ARM, 9): 'armv7',
+        (CpuType.CPU_TYPE_ARM, 10): 'armv7f',
+        (CpuType.CPU_TYPE_ARM, 11): 'armv7s',
+        (CpuType.CPU_TYPE_ARM, 12): 'armv7k',
+        (CpuType.CPU_TYPE_ARM, 14): 'armv6m',
+        (CpuType.CPU_TYPE_ARM, 15): 'armv7m',
+        (CpuType.CPU_TYPE_ARM, 16): 'armv7em',
+        (CpuType.CPU_TYPE_ARM | CpuType.CPU_ARCH_ABI64, 0): 'arm64',
+        (CpuType.CPU_TYPE_ARM | CpuType.CPU_ARCH_ABI64, 1): 'arm64v8',
+        (CpuType.CPU_TYPE_ARM | CpuType.CPU_ARCH_ABI64, 2): 'arm64e',
+        (CpuType.CPU_TYPE_ARM | CpuType.CPU_ARCH_ABI64_32, 1): 'arm64_32',
+        (CpuType.CPU_TYPE_POWERPC, 0): 'ppc',
+        (CpuType.CPU_TYPE_POWERPC | CpuType.CPU_ARCH_ABI64, 0): 'ppc64',
+    }
+
     ENDIAN = True  # big endian
     FIELDS = (CpuType('cputype', 'I'),
               CpuSubType('cpusubtype', 'cputype', 'I'),
@@ -17,3 +43,14 @@ class FatArch(Header):
         self.size = None
         self.align = None
         super(FatArch, self).__init__('fat_arch', bytes_, **kwargs)
+
+    def arch_name(self):
+        return self.get_arch_name(self.cputype, self.cpusubtype)
+
+    @classmethod
+    def get_arch_name(cls, cputype, cpusubtype):
+        cpusubtype &= ~CpuSubType.CPU_SUBTYPE_MASK
+        name = cls.ARCH_NAMES.get((cputype, cpusubtype))
+        if name is None:
+            name = '%d:%d' % (cputype, cpusubtype)
+        return name
@@ -17,7 +17,7 @@ class Section(IndexedHeader):
         Field('reserved2', 'I'),
     )
 
-    NEXT_INDEX = 1
+    FIRST_INDEX = 1
 
     def __init__(self, bytes_=None, **kwargs):
         self.sectname = None
@@ -33,10 +33,6 @@ class Section(IndexedHeader):
         self.reserved2 = None
         super(Section, self).__init__('section', bytes_, **kwargs)
 
-    @classmethod
-    def reset_index(cls):
-        cls.NEXT_INDEX = 1
-
 
 class Section64(IndexedHeader):
     ENDIAN = None
@@ -55,7 +51,7 @@ class Section64(IndexedHeader):
         Field('reserved3', 'I'),
     )
 
-    NEXT_INDEX = 1
+    FIRST_INDEX = 1
 
     def __init__(self, bytes_=None, **kwargs):
         self.sectname = None
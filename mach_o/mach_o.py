@@ -6,18 +6,37 @@ from non_headers.encrypted_block import EncryptedBlock
 
 from mach_o_parsers import LoadCommandParser, SectionParser, SegmentParser
 from utils.header import HeaderInvalidValueError
+from utils.byte_range_registry import ByteRangeRegistry
+from utils.parse_context import ParseContext
 from utils.progress_indicator import ProgressIndicator
 
 
 class MachO(object):
-    def __init__(self, mach_o_br):
+    def __init__(self, mach_o_br, validate=True, context=None):
+        """
+        If validate is False, field values of load commands, sections and symbols are not validated
+        (the mach header and generic load command headers always are). This is faster for binaries
+        known to be well-formed.
+
+        context is the ParseContext that counts header indices and receives progress messages. Default to
+        the current context. Pass a new ParseContext() to parse a binary independently of all others.
+        """
+        if context is None:
+            context = ParseContext.current()
+        self.validate = validate
+        self.context = context
         self.arch_width = None
         self.mach_header = None
         self.load_commands = list()
         self.segments = dict()
         self.linkedit_br = None
         self.encryption_info_commands = list()
+        self.registry = ByteRangeRegistry(mach_o_br)
+
+        with context:
+            self._parse(mach_o_br)
 
+    def _parse(self, mach_o_br):
         # Try to parse it as mach_header
         start = 0
         hdr_size = None
@@ -0,0 +1,345 @@
+import bisect
+
+from headers.fat_header import FatHeader
+from headers.fat_arch import FatArch
+from headers.mach_header import MachHeader, MachHeader64
+from headers.load_command import LoadCommand, LoadCommandCommand
+from headers.segment_command import SegmentCommand, SegmentCommand64
+from headers.section import Section, Section64
+from headers.symtab_command import SymtabCommand
+from headers.dysymtab_command import DysymtabCommand
+from headers.dyld_info_command import DyldInfoCommand
+from headers.indirect_symbol import IndirectSymbol
+from headers.dylib_command import DylibCommand
+from headers.encryption_info_command import EncryptionInfoCommand, EncryptionInfoCommand64
+from headers.lc_str import LcStr
+from headers.nlist import Nlist, Nlist64
+
+from non_headers.cstring import Cstring
+from non_headers.section_block import CstringSection
+from non_headers.symbol_table_block import IndirectSymbolTable
+from non_headers.dyld_info import RebaseTable, BindTable, ExportTrie
+
+from fat import Fat
+from mach_o_parsers import LoadCommandParser, SectionDescriptor, SymtabParser
+from utils.cached_property import cached_property
+from utils.header import HeaderError
+from utils.parse_context import ParseContext
+from utils.unescape import Unescape
+
+
+class parsed_property(cached_property):
+    """
+    parsed_property is a cached_property of MachOFile that is computed in the ParseContext of the MachOFile.
+    """
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        with obj.context:
+            return super(parsed_property, self).__get__(obj, cls)
+
+
+class MachOFile(object):
+    """
+    MachOFile is a lazy view of one Mach-O image in a Bytes (or a string). MachO parses the whole image
+    into a byte range tree when it is created. MachOFile instead decodes only the bytes that a property
+    needs when the property is first accessed, and caches the result. For example, header, load_commands,
+    segments and dylibs only read the mach header and the load command area no matter how large the
+    image is.
+
+    Objects are the same headers that MachO puts into the byte range tree. But they are not in any tree.
+    """
+    def __init__(self, bytes_, offset=0, size=None, validate=True, context=None):
+        """
+        :param bytes_: Bytes (or a string) of the file.
+        :param offset: Offset of the image in the file. It is non-zero for an architecture of a fat binary.
+        :param size: Size of the image. Default to the rest of the file.
+        :param validate: If False, field values of load commands, sections and symbols are not validated.
+        :param context: ParseContext that counts the indices of headers. Default to the current context.
+        """
+        if size is None:
+            size = len(bytes_) - offset
+        if context is None:
+            context = ParseContext.current()
+        self.bytes_ = bytes_
+        self.offset = offset
+        self.size = size
+        self.validate = validate
+        self.context = context
+
+    @classmethod
+    def load(cls, bytes_, validate=True, archs=None, context=None):
+        """
+        Return a list of MachOFile of all images in a file. A fat binary has one for each architecture
+        (or each architecture in archs if it is not None) and a thin binary has only one. Raise ValueError
+        if no architecture is in archs.
+        """
+        if MachHeader.is_valid_header(bytes_) or MachHeader64.is_valid_header(bytes_):
+            return Fat.select_archs([cls(bytes_, validate=validate, context=context)], archs)
+        if not FatHeader.is_valid_header(bytes_):
+            raise ValueError('no fat or mach header found')
+        hdr_size = FatHeader.get_size()
+        fat_header = FatHeader(bytes_[0:hdr_size])
+        fat_archs = FatArch.decode_array(bytes_[hdr_size:hdr_size + fat_header.nfat_arch * FatArch.get_size()],
+                                         0, fat_header.nfat_arch, validate)
+        fat_archs = sorted(Fat.select_archs(fat_archs, archs), key=lambda x: x.offset)
+        return [cls(bytes_, fat_arch.offset, fat_arch.size, validate, context) for fat_arch in fat_archs]
+
+    def _bytes(self, start, stop):
+        # start and stop are relative to the image
+        return self.bytes_[self.offset + start:self.offset + stop]
+
+    @parsed_property
+    def header(self):
+        """
+        The mach header (MachHeader or MachHeader64).
+        """
+        for cls in (MachHeader, MachHeader64):
+            try:
+                return cls(self._bytes(0, cls.get_size()))
+            except HeaderError:
+                pass
+        raise ValueError('mach_o: no valid mach header found')
+
+    @property
+    def arch_width(self):
+        if isinstance(self.header, MachHeader64):
+            return 64
+        return 32
+
+    def arch_name(self):
+        """
+        The architecture name (e.g. x86_64) as FatArch.arch_name() of the same image.
+        """
+        return FatArch.get_arch_name(self.header.cputype, self.header.cpusubtype)
+
+    @parsed_property
+    def _load_commands(self):
+        """
+        A list of 2-tuple of (offset, load command) of all load commands.
+        """
+        load_commands = list()
+        start = self.header.get_size()
+        lc_size = LoadCommand.get_size()
+        for idx in xrange(self.header.ncmds):
+            generic_lc = LoadCommand(self._bytes(start, start + lc_size))
+            cmd_class = LoadCommandParser.COMMANDS.get(LoadCommandCommand.get_desc(generic_lc.cmd), None)
+            if cmd_class is None:
+                lc = generic_lc  # unknown LC
+            else:
+                lc = cmd_class(self._bytes(start, start + cmd_class.get_size()), validate=self.validate)
+            load_commands.append((start, lc))
+            start += generic_lc.cmdsize
+        return load_commands
+
+    @parsed_property
+    def load_commands(self):
+        """
+        A list of all load commands. An unknown load command is a generic LoadCommand.
+        """
+        return [lc for (offset, lc) in self._load_commands]
+
+    @parsed_property
+    def segments(self):
+        """
+        A list of all segment commands.
+        """
+        return [lc for lc in self.load_commands if isinstance(lc, (SegmentCommand, SegmentCommand64))]
+
+    @parsed_property
+    def sections(self):
+        """
+        A list of all section headers of all segments.
+        """
+        sections = list()
+        for (offset, lc) in self._load_commands:
+            if isinstance(lc, SegmentCommand):
+                cls = Section
+            elif isinstance(lc, SegmentCommand64):
+                cls = Section64
+            else:
+                continue
+            start = offset + lc.get_size()
+            sections += cls.decode_array(self._bytes(start, start + lc.nsects * cls.get_size()), 0, lc.nsects,
+                                         self.validate)
+        return sections
+
+    @parsed_property
+    def dylibs(self):
+        """
+        A list of 2-tuple of (DylibCommand, LcStr) of all dylib commands.
+        """
+        dylibs = list()
+        for (offset, lc) in self._load_commands:
+            if isinstance(lc, DylibCommand):
+                lc_str = LcStr.find_str('dylib_name', self._bytes(offset + lc.dylib_name_offset, offset + lc.cmdsize))
+                dylibs.append((lc, lc_str))
+        return dylibs
+
+    @parsed_property
+    def libraries(self):
+        """
+        A list of the names of all dylibs that the image links against. Library ordinal N (e.g. in bind
+        information) refers to libraries[N - 1].
+        """
+        id_dylib = LoadCommandCommand.COMMANDS['LC_ID_DYLIB']
+        return [lc_str.value for (lc, lc_str) in self.dylibs if lc.cmd != id_dylib]
+
+    @parsed_property
+    def symbols(self):
+        """
+        The SymbolTable of LC_SYMTAB. None if there is no LC_SYMTAB.
+        """
+        for lc in self.load_commands:
+            if isinstance(lc, SymtabCommand):
+                break
+        else:
+            return None
+        if self.arch_width == 64:
+            nlist_class = Nlist64
+        else:
+            nlist_class = Nlist
+        nlist_bytes = self._bytes(lc.symoff, lc.symoff + lc.nsyms * nlist_class.get_size())
+        str_bytes = self._bytes(lc.stroff, lc.stroff + lc.strsize)
+        (sym_tab, sym_str_tab) = SymtabParser.decode_symbols(nlist_bytes, str_bytes, lc.nsyms, nlist_class,
+                                                             self.validate)
+        return sym_tab
+
+    @parsed_property
+    def indirect_symbols(self):
+        """
+        The IndirectSymbolTable of LC_DYSYMTAB. None if there is no LC_DYSYMTAB.
+        """
+        for lc in self.load_commands:
+            if isinstance(lc, DysymtabCommand):
+                break
+        else:
+            return None
+        return IndirectSymbolTable(lc.nindirectsyms,
+                                   self._bytes(lc.indirectsymoff,
+                                               lc.indirectsymoff + lc.nindirectsyms * IndirectSymbol.get_size()))
+
+    def section_slots(self, section):
+        """
+        Return a list of 3-tuple of (slot address, symbol index, symbol name) of all slots of a symbol stubs
+        (e.g. __stubs) or symbol pointers (e.g. __got, __la_symbol_ptr) section. See
+        IndirectSymbolTable.section_slots().
+        """
+        if self.indirect_symbols is None:
+            return list()
+        return self.indirect_symbols.section_slots(section, self.arch_width / 8, self.symbols)
+
+    @parsed_property
+    def _section_addresses(self):
+        sections = sorted([(section.addr, section) for section in self.sections], key=lambda x: x[0])
+        return [x[0] for x in sections], [x[1] for x in sections]
+
+    def section_at(self, address):
+        """
+        Return the section that contains a VM address. None if no section contains it.
+        """
+        (addresses, sections) = self._section_addresses
+        idx = bisect.bisect_right(addresses, address) - 1
+        if idx < 0 or address >= sections[idx].addr + sections[idx].size:
+            return None
+        return sections[idx]
+
+    @parsed_property
+    def dyld_info(self):
+        """
+        The LC_DYLD_INFO (or LC_DYLD_INFO_ONLY) command. None if there is none.
+        """
+        for lc in self.load_commands:
+            if isinstance(lc, DyldInfoCommand):
+                return lc
+        return None
+
+    def _dyld_info_bytes(self, kind):
+        if self.dyld_info is None:
+            return ''
+        offset = getattr(self.dyld_info, kind + '_off')
+        return self._bytes(offset, offset + getattr(self.dyld_info, kind + '_size'))
+
+    def iter_rebases(self):
+        """
+        A generator of the 3-tuples of RebaseTable of all rebase entries. It decodes the opcodes as entries
+        are consumed and keeps nothing.
+        """
+        return RebaseTable.decode_entries(self._dyld_info_bytes('rebase'), self.arch_width / 8)
+
+    def iter_binds(self, kind='bind'):
+        """
+        A generator of the 7-tuples of BindTable of all entries of the bind information. kind is 'bind',
+        'weak_bind' or 'lazy_bind'.
+        """
+        return BindTable.decode_entries(self._dyld_info_bytes(kind), self.arch_width / 8, kind == 'lazy_bind')
+
+    @parsed_property
+    def rebases(self):
+        """
+        The RebaseTable of the rebase information.
+        """
+        return RebaseTable.decode(self._dyld_info_bytes('rebase'), self.arch_width / 8)
+
+    def _bind_table(self, kind):
+        return BindTable.decode(self._dyld_info_bytes(kind), self.arch_width / 8, kind == 'lazy_bind',
+                                kind.replace('_', ' ') + ' entries')
+
+    @parsed_property
+    def binds(self):
+        """
+        The BindTable of the bind information.
+        """
+        return self._bind_table('bind')
+
+    @parsed_property
+    def weak_binds(self):
+        """
+        The BindTable of the weak bind information.
+        """
+        return self._bind_table('weak_bind')
+
+    @parsed_property
+    def lazy_binds(self):
+        """
+        The BindTable of the lazy bind information.
+        """
+        return self._bind_table('lazy_bind')
+
+    @parsed_property
+    def export_trie(self):
+        """
+        The ExportTrie of the export information. Its nodes are decoded as they are visited.
+        """
+        return ExportTrie(self._dyld_info_bytes('export'))
+
+    @property
+    def image_base(self):
+        """
+        The VM address of the mach header, i.e. the address of __TEXT. Export addresses are relative to it.
+        """
+        for segment in self.segments:
+            if segment.segname.rstrip('\x00') == '__TEXT':
+                return segment.vmaddr
+        return 0
+
+    @parsed_property
+    def cstrings(self):
+        """
+        A list of Cstring of all (unencrypted) C string sections.
+        """
+        cstrings = list()
+        for section in self.sections:
+            if not SectionDescriptor(section).is_cstring() or section.offset == 0 or \
+                    self.is_section_encrypted(section):
+                continue
+            data_section = CstringSection(self._bytes(section.offset, section.offset + section.size))
+            cstrings += [Cstring(Unescape.convert(string)) for (offset, string) in data_section.items()]
+        return cstrings
+
+    def is_section_encrypted(self, section):
+        for lc in self.load_commands:
+            if isinstance(lc, (EncryptionInfoCommand, EncryptionInfoCommand64)) and lc.is_encrypted() and \
+                    lc.covers(section):
+                return True
+        return False
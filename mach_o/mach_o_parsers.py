@@ -1,4 +1,5 @@
 from utils.byte_range_parser import ByteRangeParser
+from utils.compact_byte_range import VirtualByteRangeStore, ConstantColumn
 from utils.unescape import Unescape
 from utils.progress_indicator import ProgressIndicator
 from utils.header import NullTerminatedStringField
@@ -169,7 +170,7 @@ class LoadCommandParser(ByteRangeParser):
         if cmd_class is not None:
             self.hdr_size = cmd_class.get_size()
             assert callable(cmd_class)
-            lc = cmd_class(self.get_bytes(self.hdr_size))
+            lc = cmd_class(self.get_bytes(self.hdr_size), validate=self.mach_o.validate)
         if cmd_class is None or lc is None:
             # This is an unknown LC. We can only create a generic LC byte range and a unknown padding.
             hdr_size = LoadCommand.get_size()
@@ -183,17 +184,15 @@ class LoadCommandParser(ByteRangeParser):
             assert isinstance(lc, (SegmentCommand, SegmentCommand64))
             segment_desc = SegmentDescriptor(lc)
             self.mach_o.segments[segment_desc.name] = segment_desc
-            for idx in xrange(lc.nsects):
-                # ???? Should be possible to miss 32 and 64-bit sections, right? If yes, can move this loop outside
-                if cmd_desc == 'LC_SEGMENT':
-                    cls = Section
-                elif cmd_desc == 'LC_SEGMENT_64':
-                    cls = Section64
-                else:
-                    assert False
-                cls_size = cls.get_size()
-                assert callable(cls)
-                section = cls(self.get_bytes(cls_size))
+            if cmd_desc == 'LC_SEGMENT':
+                cls = Section
+            elif cmd_desc == 'LC_SEGMENT_64':
+                cls = Section64
+            else:
+                assert False
+            cls_size = cls.get_size()
+            sections = cls.decode_array(self.get_bytes(lc.nsects * cls_size), 0, lc.nsects, self.mach_o.validate)
+            for section in sections:
                 self.add_subrange(section, cls_size)
                 segment_desc.add_section(section)
             if lc.nsects > 0:
@@ -209,16 +208,16 @@ class LoadCommandParser(ByteRangeParser):
         elif cmd_desc in ('LC_DYLD_INFO', 'LC_DYLD_INFO_ONLY'):
             assert isinstance(lc, DyldInfoCommand)
             # Record the rebase, different types of bind and export sections
-            DyldInfoParser(self.byte_range, self.mach_o.arch_width).parse(lc)
+            DyldInfoParser(self.byte_range, self.mach_o).parse(lc)
         elif cmd_desc == 'LC_SYMTAB':
             assert isinstance(lc, SymtabCommand)
             SymtabParser(self.byte_range, self.mach_o).parse(lc)
         elif cmd_desc == 'LC_DYSYMTAB':
             assert isinstance(lc, DysymtabCommand)
-            DysymtabParser(self.byte_range, self.mach_o.arch_width).parse(lc)
+            DysymtabParser(self.byte_range, self.mach_o).parse(lc)
         elif cmd_desc in ('LC_FUNCTION_STARTS', 'LC_DATA_IN_CODE', 'LC_DYLIB_CODE_SIGN_DRS', 'LC_CODE_SIGNATURE'):
             assert isinstance(lc, LinkeditDataCommand)
-            LinkeditDataParser(self.byte_range, self.mach_o.arch_width).parse(lc)
+            LinkeditDataParser(self.byte_range, self.mach_o).parse(lc)
         elif cmd_desc == 'LC_PREBOUND_DYLIB':
             assert isinstance(lc, PreboundDylibCommand)
             self._add_lc_str('name', lc.name_offset)
@@ -264,13 +263,14 @@ class SectionParser(ByteRangeParser):
         # Get the segment and section names
         seg_name = NullTerminatedStringField.get_string(section.segname)
         sect_name = NullTerminatedStringField.get_string(section.sectname)
-        bytes_ = self.get_bytes()
+        # Generic sections do not parse their content. So, do not fetch their bytes. With a paged
+        # Bytes, this keeps large __text sections from being read only to be discarded.
         if seg_name == '__TEXT':
-            data_section = TextSection(sect_name, bytes_)
+            data_section = TextSection(sect_name, None)
         elif seg_name == '__DATA':
-            data_section = DataSection(sect_name, bytes_)
+            data_section = DataSection(sect_name, None)
         else:
-            data_section = SectionBlock(seg_name, sect_name, bytes_)
+            data_section = SectionBlock(seg_name, sect_name, None)
 
         # If the section is inside a encrypted region (specificed by LC_ENCRYPTION_INFO),
         # we cannot parse it because we don't have the decryption key. So, we just
@@ -290,20 +290,55 @@ class SectionParser(ByteRangeParser):
             # compute the offset from the first data section and the VM address.
             return
         elif section_desc.is_cstring():
-            data_section = CstringSection(bytes_)
-            cstring_br = self.add_subrange(data_section, section.size)
-            for (offset, string) in data_section.items():
-                unescaped_string = Unescape.convert(string)
-                cstring_br.add_subrange(offset, len(string) + 1, data=Cstring(unescaped_string))
+            data_section = CstringSection(self.get_bytes())
+            self._add_strings(self.add_subrange(data_section, section.size), data_section, Cstring)
         elif section_desc.is_objc_methname():
-            data_section = ObjCMethodNameSection(bytes_)
-            obj_methname_br = self.add_subrange(data_section, section.size)
-            for (offset, string) in data_section.items():
-                unescaped_string = Unescape.convert(string)
-                obj_methname_br.add_subrange(offset, len(string) + 1, data=ObjCMethodName(unescaped_string))
+            data_section = ObjCMethodNameSection(self.get_bytes())
+            self._add_strings(self.add_subrange(data_section, section.size), data_section, ObjCMethodName)
         else:
             self.add_subrange(data_section, section.size)
 
+    @staticmethod
+    def _add_strings(section_br, data_section, string_class):
+        # There can be hundreds of thousands of strings in a section. Expose them as virtual children
+        # backed by the offset and size arrays of the section. A string object is only created when
+        # its byte range is accessed. Its index is reserved now so that it does not depend on the
+        # order of access.
+        (offsets, sizes) = data_section.string_ranges()
+        factory = StringFactory(data_section, string_class, string_class.reserve_indices(len(offsets)))
+        VirtualByteRangeStore(section_br, offsets, sizes, factory, string_class)
+
+
+class StringFactory(object):
+    """
+    StringFactory creates the string object (e.g. Cstring) of a string in a NullTerminatedStringSection.
+    """
+    def __init__(self, data_section, string_class, first_index):
+        self.data_section = data_section
+        self.string_class = string_class
+        self.first_index = first_index
+
+    def __call__(self, idx):
+        return self.string_class(Unescape.convert(self.data_section.string(idx)), index=self.first_index + idx)
+
+    def shift_indices(self, shifts):
+        self.first_index += shifts.get(self.string_class, 0)
+
+
+class IndirectSymbolFactory(object):
+    """
+    IndirectSymbolFactory creates the IndirectSymbol header of an entry in an IndirectSymbolTable.
+    """
+    def __init__(self, indirect_sym_tab, first_index):
+        self.indirect_sym_tab = indirect_sym_tab
+        self.first_index = first_index
+
+    def __call__(self, idx):
+        return IndirectSymbol(index=self.first_index + idx, sym_idx=self.indirect_sym_tab.entries[idx])
+
+    def shift_indices(self, shifts):
+        self.first_index += shifts.get(IndirectSymbol, 0)
+
 
 class SegmentParser(ByteRangeParser):
     def __init__(self, mach_o_br):
@@ -367,67 +402,38 @@ class SymtabParser(LinkEditParser):
         self.nlist_size = self.nlist_class.get_size()
 
     @staticmethod
-    def _find_string(bytes_, start):
-        cur = start
-        while cur < len(bytes_) and bytes_[cur] != '\x00':
-            cur += 1
-        return bytes_[start:cur], cur - start + 1  # the 2nd value is total length that includes terminating NULL
+    def decode_symbols(nlist_bytes, str_bytes, nsyms, nlist_class, validate=True):
+        """
+        Decode nsyms nlist entries. Their names are looked up in the string table on demand.
+
+        :return: A 2-tuple of (SymbolTable, SymbolStringTable).
+        """
+        # There can be hundreds of thousands if not millions of symbols. Creating a Nlist and a ByteRange
+        # for each of them (and for each of their names) takes minutes and a lot of memory. (Each python
+        # object with attribute seems to consume at least 300B.) So, the whole nlist array is unpacked into
+        # columns at once and only the field values are saved into the symbol table. Nlist objects are
+        # created on demand by SymbolTable.nlist(). The string table is kept as a whole.
+        sym_tab = SymbolTable(nsyms, nlist_class)
+        sym_str_tab = SymbolStringTable(str_bytes)
+        sym_tab.add_columns(*nlist_class.decode_columns(nlist_bytes, 0, nsyms, validate))
+        sym_tab.correlate_string_table(sym_str_tab)
+        return sym_tab, sym_str_tab
 
     def parse(self, symtab_command):
         if symtab_command is None:
             return
         self.initialize(0, len(self.byte_range))
-        if ProgressIndicator.ENABLED:
-            progress = ProgressIndicator('parsing symbol table...', 4096)
-        else:
-            progress = None
+        ProgressIndicator.display('parsing symbol table\n')
 
-        # Add nlist entries and string table section.
-        sym_tab = SymbolTable(symtab_command.nsyms)
-        sym_str_tab = SymbolStringTable()
-        sym_br = self.add_section(symtab_command.symoff, symtab_command.nsyms * self.nlist_size, data=sym_tab)
-        self.add_section(symtab_command.stroff, symtab_command.strsize, data=sym_str_tab)
+        # Parse all nlist entries and add them and the string table section.
+        nlist_bytes = self.byte_range.bytes(symtab_command.symoff,
+                                            symtab_command.symoff + symtab_command.nsyms * self.nlist_size)
         str_bytes_ = self.byte_range.bytes(symtab_command.stroff,
                                            symtab_command.stroff + symtab_command.strsize)
-
-        # Parse all nlist entries
-        for idx in xrange(symtab_command.nsyms):
-            if progress is not None:
-                progress.click()
-            start = idx * self.nlist_size
-            stop = start + self.nlist_size
-            bytes_ = sym_br.bytes(start, stop)
-            nlist = self.nlist_class(bytes_)
-            # The original code was:
-            #
-            # sym_br.add_subrange(start, self.nlist_size, data=nlist)
-            #
-            # The problem is that for a real iOS app, there can be hundreds of thousands if not
-            # millions of symbols and these Nlist and BytesRange objects consume a lot of memory.
-            # (Each python object with attribute seems to consume at least 300B.)
-            #
-            # The solution is to deviate the framework and save the values of these nlist headers
-            # into a big list.
-            sym_tab.add(nlist)
-            if nlist.n_strx == 0:
-                # From nlist.h:
-                #
-                # Symbols with a index into the string table of zero (n_un.n_strx == 0) are
-                # defined to have a null, "", name.  Therefore all string indexes to non null
-                # names must not have a zero string index.  This is bit historical information
-                # that has never been well documented.
-                pass
-            else:
-                (sym_name, total_len) = self._find_string(str_bytes_, nlist.n_strx)
-                # Original code is:
-                #
-                # str_br.add_subrange(nlist.n_strx, total_len, data=SymtabString(nlist.n_strx, sym_name))
-                #
-                # Again, we avoid creating the byte range in order to reduce memory consumption.
-                sym_str_tab.add(nlist.n_strx, sym_name)
-        sym_tab.correlate_string_table(sym_str_tab)
-        if progress is not None:
-            progress.done()
+        (sym_tab, sym_str_tab) = self.decode_symbols(nlist_bytes, str_bytes_, symtab_command.nsyms,
+                                                     self.nlist_class, self.mach_o.validate)
+        self.add_section(symtab_command.symoff, symtab_command.nsyms * self.nlist_size, data=sym_tab)
+        self.add_section(symtab_command.stroff, symtab_command.strsize, data=sym_str_tab)
 
 
 class DysymtabParser(LinkEditParser):
@@ -441,16 +447,20 @@ class DysymtabParser(LinkEditParser):
         self.initialize(0, len(self.byte_range))
         self.add_section(dysymtab_command.extrefsymoff, dysymtab_command.nextrefsyms * 4,
                          data=ExtRefSymbolTable(dysymtab_command.nextrefsyms))
-        indirect_sym_size = 4
-        sym_br = self.add_section(dysymtab_command.indirectsymoff, dysymtab_command.nindirectsyms * indirect_sym_size,
-                                  data=IndirectSymbolTable(dysymtab_command.nindirectsyms))
-        # Parse all nlist entries
-        for idx in xrange(dysymtab_command.nindirectsyms):
-            start = idx * indirect_sym_size
-            stop = start + indirect_sym_size
-            bytes_ = sym_br.bytes(start, stop)
-            indirect_sym = IndirectSymbol(bytes_)
-            sym_br.add_subrange(start, indirect_sym_size, data=indirect_sym)
+        indirect_sym_size = IndirectSymbol.get_size()
+        nindirectsyms = dysymtab_command.nindirectsyms
+        indirect_sym_tab = IndirectSymbolTable(nindirectsyms,
+                                               self.byte_range.bytes(dysymtab_command.indirectsymoff,
+                                                                     dysymtab_command.indirectsymoff +
+                                                                     nindirectsyms * indirect_sym_size))
+        sym_br = self.add_section(dysymtab_command.indirectsymoff, nindirectsyms * indirect_sym_size,
+                                  data=indirect_sym_tab)
+        # Expose all indirect symbol entries as virtual children. IndirectSymbol headers are only created
+        # when they are accessed.
+        if sym_br is not None:
+            factory = IndirectSymbolFactory(indirect_sym_tab, IndirectSymbol.reserve_indices(nindirectsyms))
+            VirtualByteRangeStore(sym_br, xrange(0, nindirectsyms * indirect_sym_size, indirect_sym_size),
+                                  ConstantColumn(indirect_sym_size, nindirectsyms), factory, IndirectSymbol)
 
         # TODO - still need to parse table of content, module table, external and local relocation entries
 
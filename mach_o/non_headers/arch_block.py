@@ -0,0 +1,11 @@
+from utils.header import Header, NonEncodingField
+
+
+class UnparsedArchBlock(Header):
+    FIELDS = (
+        NonEncodingField('arch'),
+    )
+
+    def __init__(self, arch):
+        self.arch = None
+        super(UnparsedArchBlock, self).__init__('Mach-O: %s [not parsed]' % arch, arch=arch)
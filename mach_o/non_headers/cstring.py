@@ -7,15 +7,15 @@ class NullTerminatedString(ColorIndexedHeader):
         NonEncodingField('string'),
     )
 
-    def __init__(self, name, s):
-        super(NullTerminatedString, self).__init__(name, color='green', bold=False, string=s)
+    def __init__(self, name, s, **kwargs):
+        super(NullTerminatedString, self).__init__(name, color='green', bold=False, string=s, **kwargs)
 
 
 class Cstring(NullTerminatedString):
-    def __init__(self, s):
-        super(Cstring, self).__init__('cstring', s)
+    def __init__(self, s, **kwargs):
+        super(Cstring, self).__init__('cstring', s, **kwargs)
 
 
 class ObjCMethodName(NullTerminatedString):
-    def __init__(self, s):
-        super(ObjCMethodName, self).__init__('objc_methname', s)
+    def __init__(self, s, **kwargs):
+        super(ObjCMethodName, self).__init__('objc_methname', s, **kwargs)
@@ -0,0 +1,429 @@
+from array import array
+from utils.header import Header, NonEncodingField
+from utils.commafy import commafy
+from utils.leb128 import Leb128
+
+
+class DyldInfoTable(Header):
+    """
+    Base class of the decoded rebase and bind information of LC_DYLD_INFO. Entries are kept in typed
+    columns instead of one object per entry because large binaries have hundreds of thousands of them.
+    columns is a tuple of the columns in the order of the fields of an entry.
+
+    Opcode streams are decoded directly from the given bytes (e.g. a buffer of a memory-mapped file)
+    without copying them.
+    """
+    FIELDS = (
+        NonEncodingField('desc'),
+    )
+
+    MASK_64 = 0xffffffffffffffff  # segment offsets wrap around like the uint64_t of dyld
+
+    def __init__(self, entry_type, columns):
+        self.entry_type = entry_type
+        self.columns = columns
+        super(DyldInfoTable, self).__init__('', desc='')
+        self.update_desc()
+
+    def update_desc(self):
+        self.desc = '%s %s' % (commafy(self.num_entries()), self.entry_type)
+        self.name = 'DyldInfoTable: %s' % self.desc
+
+    def num_entries(self):
+        return len(self.columns[0])
+
+    def entry(self, idx):
+        return tuple([column[idx] for column in self.columns])
+
+    def entries(self):
+        for idx in xrange(self.num_entries()):
+            yield self.entry(idx)
+
+    def add(self, entry):
+        for (column, value) in zip(self.columns, entry):
+            column.append(value)
+
+
+class RebaseTable(DyldInfoTable):
+    """
+    RebaseTable holds 3-tuples of (segment index, segment offset, type) of all pointers that dyld slides
+    when the image is not loaded at its preferred address.
+    """
+    SEGMENT = 0
+    OFFSET = 1
+    TYPE = 2
+
+    REBASE_TYPE_POINTER = 1
+    REBASE_TYPE_TEXT_ABSOLUTE32 = 2
+    REBASE_TYPE_TEXT_PCREL32 = 3
+    TYPES = {
+        REBASE_TYPE_POINTER: 'pointer',
+        REBASE_TYPE_TEXT_ABSOLUTE32: 'text abs32',
+        REBASE_TYPE_TEXT_PCREL32: 'text rel32',
+    }
+
+    REBASE_OPCODE_MASK = 0xf0
+    REBASE_IMMEDIATE_MASK = 0x0f
+    REBASE_OPCODE_DONE = 0x00
+    REBASE_OPCODE_SET_TYPE_IMM = 0x10
+    REBASE_OPCODE_SET_SEGMENT_AND_OFFSET_ULEB = 0x20
+    REBASE_OPCODE_ADD_ADDR_ULEB = 0x30
+    REBASE_OPCODE_ADD_ADDR_IMM_SCALED = 0x40
+    REBASE_OPCODE_DO_REBASE_IMM_TIMES = 0x50
+    REBASE_OPCODE_DO_REBASE_ULEB_TIMES = 0x60
+    REBASE_OPCODE_DO_REBASE_ADD_ADDR_ULEB = 0x70
+    REBASE_OPCODE_DO_REBASE_ULEB_TIMES_SKIPPING_ULEB = 0x80
+
+    def __init__(self):
+        self.segment = array('B')
+        self.offset = Header.new_column('Q')
+        self.type = array('B')
+        super(RebaseTable, self).__init__('rebase entries', (self.segment, self.offset, self.type))
+
+    @classmethod
+    def decode(cls, bytes_, pointer_size):
+        table = cls()
+        for (segment, offset, type_) in cls.decode_entries(bytes_, pointer_size):
+            table.segment.append(segment)
+            table.offset.append(offset)
+            table.type.append(type_)
+        table.update_desc()
+        return table
+
+    @classmethod
+    def decode_entries(cls, bytes_, pointer_size):
+        """
+        A generator of the entries of a rebase opcode stream. Nothing is accumulated. So, it can be used
+        to stream rebase information of any size. An unknown opcode raises ValueError after all entries
+        before it are generated.
+        """
+        read_uleb128 = Leb128.read_uleb128
+        mask = cls.MASK_64
+        type_ = 0
+        segment = 0
+        offset = 0
+        pos = 0
+        end = len(bytes_)
+        while pos < end:
+            byte = ord(bytes_[pos])
+            pos += 1
+            opcode = byte & cls.REBASE_OPCODE_MASK
+            immediate = byte & cls.REBASE_IMMEDIATE_MASK
+            if opcode == cls.REBASE_OPCODE_DONE:
+                break
+            elif opcode == cls.REBASE_OPCODE_SET_TYPE_IMM:
+                type_ = immediate
+            elif opcode == cls.REBASE_OPCODE_SET_SEGMENT_AND_OFFSET_ULEB:
+                segment = immediate
+                (offset, pos) = read_uleb128(bytes_, pos)
+            elif opcode == cls.REBASE_OPCODE_ADD_ADDR_ULEB:
+                (delta, pos) = read_uleb128(bytes_, pos)
+                offset = (offset + delta) & mask
+            elif opcode == cls.REBASE_OPCODE_ADD_ADDR_IMM_SCALED:
+                offset = (offset + immediate * pointer_size) & mask
+            elif opcode == cls.REBASE_OPCODE_DO_REBASE_IMM_TIMES:
+                for idx in xrange(immediate):
+                    yield segment, offset, type_
+                    offset = (offset + pointer_size) & mask
+            elif opcode == cls.REBASE_OPCODE_DO_REBASE_ULEB_TIMES:
+                (count, pos) = read_uleb128(bytes_, pos)
+                for idx in xrange(count):
+                    yield segment, offset, type_
+                    offset = (offset + pointer_size) & mask
+            elif opcode == cls.REBASE_OPCODE_DO_REBASE_ADD_ADDR_ULEB:
+                yield segment, offset, type_
+                (delta, pos) = read_uleb128(bytes_, pos)
+                offset = (offset + delta + pointer_size) & mask
+            elif opcode == cls.REBASE_OPCODE_DO_REBASE_ULEB_TIMES_SKIPPING_ULEB:
+                (count, pos) = read_uleb128(bytes_, pos)
+                (skip, pos) = read_uleb128(bytes_, pos)
+                for idx in xrange(count):
+                    yield segment, offset, type_
+                    offset = (offset + skip + pointer_size) & mask
+            else:
+                raise ValueError('unknown rebase opcode 0x%x at offset %d' % (opcode, pos - 1))
+
+
+class BindTable(DyldInfoTable):
+    """
+    BindTable holds 7-tuples of (segment index, segment offset, type, library ordinal, symbol name, addend,
+    flags) of all pointers that dyld binds to symbols. It is used for the bind, weak bind and lazy bind
+    information. Symbol names are stored once and the symbol column holds indices of them.
+    """
+    SEGMENT = 0
+    OFFSET = 1
+    TYPE = 2
+    LIBRARY_ORDINAL = 3
+    SYMBOL = 4
+    ADDEND = 5
+    FLAGS = 6
+
+    BIND_TYPE_POINTER = 1
+    BIND_TYPE_TEXT_ABSOLUTE32 = 2
+    BIND_TYPE_TEXT_PCREL32 = 3
+    TYPES = {
+        BIND_TYPE_POINTER: 'pointer',
+        BIND_TYPE_TEXT_ABSOLUTE32: 'text abs32',
+        BIND_TYPE_TEXT_PCREL32: 'text rel32',
+    }
+
+    BIND_SPECIAL_DYLIB_SELF = 0
+    BIND_SPECIAL_DYLIB_MAIN_EXECUTABLE = -1
+    BIND_SPECIAL_DYLIB_FLAT_LOOKUP = -2
+    BIND_SPECIAL_DYLIB_WEAK_LOOKUP = -3
+    SPECIAL_DYLIBS = {
+        BIND_SPECIAL_DYLIB_SELF: 'this-image',
+        BIND_SPECIAL_DYLIB_MAIN_EXECUTABLE: 'main-executable',
+        BIND_SPECIAL_DYLIB_FLAT_LOOKUP: 'flat-namespace',
+        BIND_SPECIAL_DYLIB_WEAK_LOOKUP: 'weak',
+    }
+
+    BIND_SYMBOL_FLAGS_WEAK_IMPORT = 0x1
+    BIND_SYMBOL_FLAGS_NON_WEAK_DEFINITION = 0x8
+
+    BIND_OPCODE_MASK = 0xf0
+    BIND_IMMEDIATE_MASK = 0x0f
+    BIND_OPCODE_DONE = 0x00
+    BIND_OPCODE_SET_DYLIB_ORDINAL_IMM = 0x10
+    BIND_OPCODE_SET_DYLIB_ORDINAL_ULEB = 0x20
+    BIND_OPCODE_SET_DYLIB_SPECIAL_IMM = 0x30
+    BIND_OPCODE_SET_SYMBOL_TRAILING_FLAGS_IMM = 0x40
+    BIND_OPCODE_SET_TYPE_IMM = 0x50
+    BIND_OPCODE_SET_ADDEND_SLEB = 0x60
+    BIND_OPCODE_SET_SEGMENT_AND_OFFSET_ULEB = 0x70
+    BIND_OPCODE_ADD_ADDR_ULEB = 0x80
+    BIND_OPCODE_DO_BIND = 0x90
+    BIND_OPCODE_DO_BIND_ADD_ADDR_ULEB = 0xa0
+    BIND_OPCODE_DO_BIND_ADD_ADDR_IMM_SCALED = 0xb0
+    BIND_OPCODE_DO_BIND_ULEB_TIMES_SKIPPING_ULEB = 0xc0
+    BIND_OPCODE_THREADED = 0xd0  # binds through chained pointers in the segments (e.g. arm64e). Not decoded.
+
+    def __init__(self, entry_type='bind entries'):
+        self.segment = array('B')
+        self.offset = Header.new_column('Q')
+        self.type = array('B')
+        self.library_ordinal = array('i')
+        self.symbol = array('I')
+        self.addend = Header.new_column('q')
+        self.flags = array('B')
+        self.symbol_names = list()
+        self._symbol_indices = dict()
+        super(BindTable, self).__init__(entry_type, (self.segment, self.offset, self.type, self.library_ordinal,
+                                                     self.symbol, self.addend, self.flags))
+
+    def entry(self, idx):
+        entry = super(BindTable, self).entry(idx)
+        return entry[:self.SYMBOL] + (self.symbol_names[entry[self.SYMBOL]],) + entry[self.SYMBOL + 1:]
+
+    def add(self, entry):
+        name = entry[self.SYMBOL]
+        sym_idx = self._symbol_indices.get(name, None)
+        if sym_idx is None:
+            sym_idx = len(self.symbol_names)
+            self.symbol_names.append(name)
+            self._symbol_indices[name] = sym_idx
+        super(BindTable, self).add(entry[:self.SYMBOL] + (sym_idx,) + entry[self.SYMBOL + 1:])
+
+    @classmethod
+    def decode(cls, bytes_, pointer_size, lazy=False, entry_type='bind entries'):
+        table = cls(entry_type)
+        for entry in cls.decode_entries(bytes_, pointer_size, lazy):
+            table.add(entry)
+        table.update_desc()
+        return table
+
+    @classmethod
+    def decode_entries(cls, bytes_, pointer_size, lazy=False):
+        """
+        A generator of the entries of a bind opcode stream. Nothing is accumulated. So, it can be used to
+        stream bind information of any size.
+
+        In lazy bind information, BIND_OPCODE_DONE ends one lazily bound pointer instead of the stream.
+        Every pointer then starts from a clean state.
+
+        An unknown opcode or BIND_OPCODE_THREADED raises ValueError after all entries before it are
+        generated. Threaded binds are applied by walking the chained pointers in the segment data and the
+        opcode stream alone does not have their locations.
+        """
+        read_uleb128 = Leb128.read_uleb128
+        mask = cls.MASK_64
+        type_ = cls.BIND_TYPE_POINTER
+        segment = 0
+        offset = 0
+        ordinal = 0
+        symbol = None
+        addend = 0
+        flags = 0
+        pos = 0
+        end = len(bytes_)
+        while pos < end:
+            byte = ord(bytes_[pos])
+            pos += 1
+            opcode = byte & cls.BIND_OPCODE_MASK
+            immediate = byte & cls.BIND_IMMEDIATE_MASK
+            if opcode == cls.BIND_OPCODE_DONE:
+                if not lazy:
+                    break
+                type_ = cls.BIND_TYPE_POINTER
+                segment = offset = ordinal = addend = flags = 0
+                symbol = None
+            elif opcode == cls.BIND_OPCODE_SET_DYLIB_ORDINAL_IMM:
+                ordinal = immediate
+            elif opcode == cls.BIND_OPCODE_SET_DYLIB_ORDINAL_ULEB:
+                (ordinal, pos) = read_uleb128(bytes_, pos)
+            elif opcode == cls.BIND_OPCODE_SET_DYLIB_SPECIAL_IMM:
+                if immediate == 0:
+                    ordinal = 0
+                else:
+                    ordinal = immediate - 0x10  # sign extend
+            elif opcode == cls.BIND_OPCODE_SET_SYMBOL_TRAILING_FLAGS_IMM:
+                flags = immediate
+                (symbol, pos) = Leb128.read_cstring(bytes_, pos)
+            elif opcode == cls.BIND_OPCODE_SET_TYPE_IMM:
+                type_ = immediate
+            elif opcode == cls.BIND_OPCODE_SET_ADDEND_SLEB:
+                (addend, pos) = Leb128.read_sleb128(bytes_, pos)
+            elif opcode == cls.BIND_OPCODE_SET_SEGMENT_AND_OFFSET_ULEB:
+                segment = immediate
+                (offset, pos) = read_uleb128(bytes_, pos)
+            elif opcode == cls.BIND_OPCODE_ADD_ADDR_ULEB:
+                (delta, pos) = read_uleb128(bytes_, pos)
+                offset = (offset + delta) & mask
+            elif opcode == cls.BIND_OPCODE_DO_BIND:
+                yield segment, offset, type_, ordinal, symbol, addend, flags
+                offset = (offset + pointer_size) & mask
+            elif opcode == cls.BIND_OPCODE_DO_BIND_ADD_ADDR_ULEB:
+                yield segment, offset, type_, ordinal, symbol, addend, flags
+                (delta, pos) = read_uleb128(bytes_, pos)
+                offset = (offset + delta + pointer_size) & mask
+            elif opcode == cls.BIND_OPCODE_DO_BIND_ADD_ADDR_IMM_SCALED:
+                yield segment, offset, type_, ordinal, symbol, addend, flags
+                offset = (offset + (immediate + 1) * pointer_size) & mask
+            elif opcode == cls.BIND_OPCODE_DO_BIND_ULEB_TIMES_SKIPPING_ULEB:
+                (count, pos) = read_uleb128(bytes_, pos)
+                (skip, pos) = read_uleb128(bytes_, pos)
+                for idx in xrange(count):
+                    yield segment, offset, type_, ordinal, symbol, addend, flags
+                    offset = (offset + skip + pointer_size) & mask
+            elif opcode == cls.BIND_OPCODE_THREADED:
+                raise ValueError('threaded bind opcode 0x%x at offset %d is not supported' % (opcode, pos - 1))
+            else:
+                raise ValueError('unknown bind opcode 0x%x at offset %d' % (opcode, pos - 1))
+
+
+class ExportTrie(object):
+    """
+    ExportTrie reads the export information of LC_DYLD_INFO. It is a prefix trie of the names of all
+    exported symbols. Nodes are decoded directly from the bytes as they are visited and nothing is
+    expanded in advance. So, looking up a symbol only visits the nodes on the path of its name and
+    enumerating a prefix only visits the subtree below the prefix.
+
+    An export is a 5-tuple of (name, flags, address, other, imported name). address is relative to the
+    mach header. For a re-export, address is None, other is the library ordinal and imported name is
+    the name of the symbol in that library (None if it is the same name). For a stub and resolver, other
+    is the address of the resolver. Otherwise, other and imported name are None.
+    """
+    NAME = 0
+    FLAGS = 1
+    ADDRESS = 2
+    OTHER = 3
+    IMPORTED_NAME = 4
+
+    EXPORT_SYMBOL_FLAGS_KIND_MASK = 0x03
+    EXPORT_SYMBOL_FLAGS_KIND_REGULAR = 0x00
+    EXPORT_SYMBOL_FLAGS_KIND_THREAD_LOCAL = 0x01
+    EXPORT_SYMBOL_FLAGS_KIND_ABSOLUTE = 0x02
+    EXPORT_SYMBOL_FLAGS_WEAK_DEFINITION = 0x04
+    EXPORT_SYMBOL_FLAGS_REEXPORT = 0x08
+    EXPORT_SYMBOL_FLAGS_STUB_AND_RESOLVER = 0x10
+
+    def __init__(self, bytes_):
+        self.bytes = bytes_  # not copied. Only the visited nodes are read.
+
+    def _terminal(self, name, offset):
+        """
+        Return a 2-tuple of (export of the node at offset or None, offset of its children).
+        """
+        (size, pos) = Leb128.read_uleb128(self.bytes, offset)
+        children = pos + size
+        if size == 0:
+            return None, children
+        (flags, pos) = Leb128.read_uleb128(self.bytes, pos)
+        if flags & self.EXPORT_SYMBOL_FLAGS_REEXPORT:
+            (ordinal, pos) = Leb128.read_uleb128(self.bytes, pos)
+            (imported_name, pos) = Leb128.read_cstring(self.bytes, pos)
+            return (name, flags, None, ordinal, imported_name or None), children
+        (address, pos) = Leb128.read_uleb128(self.bytes, pos)
+        resolver = None
+        if flags & self.EXPORT_SYMBOL_FLAGS_STUB_AND_RESOLVER:
+            (resolver, pos) = Leb128.read_uleb128(self.bytes, pos)
+        return (name, flags, address, resolver, None), children
+
+    def _children(self, pos):
+        """
+        A generator of 2-tuples of (edge label, child node offset) of all children of a node.
+        """
+        if pos >= len(self.bytes):
+            raise ValueError('export trie node is truncated at offset %d' % pos)
+        count = ord(self.bytes[pos])
+        pos += 1
+        for idx in xrange(count):
+            (label, pos) = Leb128.read_cstring(self.bytes, pos)
+            (child, pos) = Leb128.read_uleb128(self.bytes, pos)
+            if len(label) == 0 or child >= len(self.bytes):
+                raise ValueError('invalid export trie edge at offset %d' % pos)
+            yield label, child
+
+    def lookup(self, name):
+        """
+        Return the export of a symbol. None if the symbol is not exported.
+        """
+        if len(self.bytes) == 0:
+            return None
+        offset = 0
+        matched = 0
+        while True:
+            (export, children) = self._terminal(name, offset)
+            if matched == len(name):
+                return export
+            for (label, child) in self._children(children):
+                if name.startswith(label, matched):
+                    matched += len(label)
+                    offset = child
+                    break
+            else:
+                return None
+
+    def exports(self, prefix=''):
+        """
+        A generator of the exports of all symbols whose names start with prefix, in the order of the trie.
+        Only the nodes on the path of the prefix and in the subtree below it are visited.
+        """
+        if len(self.bytes) == 0:
+            return
+        # Find the node where the prefix ends. It may end in the middle of an edge label.
+        offset = 0
+        name = ''
+        while len(name) < len(prefix):
+            (export, children) = self._terminal(name, offset)
+            rest = prefix[len(name):]
+            for (label, child) in self._children(children):
+                if label.startswith(rest) or rest.startswith(label):
+                    name += label
+                    offset = child
+                    break
+            else:
+                return
+
+        # Walk the subtree depth-first. A node that is visited twice means the trie has a loop.
+        visited = set()
+        stack = [(name, offset)]
+        while len(stack) > 0:
+            (name, offset) = stack.pop()
+            if offset in visited:
+                raise ValueError('export trie has a loop at offset %d' % offset)
+            visited.add(offset)
+            (export, children) = self._terminal(name, offset)
+            if export is not None:
+                yield export
+            stack += reversed([(name + label, child) for (label, child) in self._children(children)])
@@ -1,3 +1,8 @@
+from array import array
+try:
+    import numpy
+except ImportError:
+    numpy = None  # optional. Without it, string offsets are summed one string at a time.
 from utils.header import Header, NonEncodingField, NullTerminatedStringField
 
 
@@ -35,52 +40,77 @@ class TextSection(SectionBlock):
 
 
 class NullTerminatedStringSection(TextSection):
+    """
+    NullTerminatedStringSection keeps the bytes of a section of NULL terminated strings and the offset
+    and the size (including the terminating NULL) of each string in two parallel arrays. A string is
+    sliced out of the bytes when it is accessed.
+    """
     def __init__(self, sect_name, bytes_):
         self.name = None
-        self._strings = dict()
-        self._indices = list()
+        self._bytes = ''
+        self._offsets = array('L')
+        self._sizes = array('L')
         super(NullTerminatedStringSection, self).__init__(sect_name, bytes_)
 
     def parse_bytes(self, bytes_):
         """
-        Extract all NULL terminated strings from the given bytes. Record all their offsets.
+        Extract all NULL terminated strings from the given bytes. Record all their offsets and lengths.
+        Bytes after the last NULL are not a string.
         """
-        s = ''
-        offset = 0
-        for idx in xrange(len(bytes_)):
-            if bytes_[idx] == '\x00':
-                self._strings[offset] = s
-                self._indices.append(offset)
-                s = ''
-                offset = idx + 1
-            else:
-                s += bytes_[idx]
+        self._bytes = str(bytes_)  # a buffer cannot be split
+        self._offsets = array('L')
+        self._sizes = array('L')
+        if numpy is not None:
+            # A string starts after the previous NULL and ends at its own NULL.
+            nuls = numpy.flatnonzero(numpy.frombuffer(self._bytes, dtype=numpy.uint8) == 0)
+            offsets = numpy.zeros_like(nuls)
+            offsets[1:] = nuls[:-1] + 1
+            self.extend_column(self._offsets, offsets)
+            self.extend_column(self._sizes, nuls + 1 - offsets)
+        else:
+            # The last piece is either empty or not NULL terminated.
+            self._sizes = array('L', [len(s) + 1 for s in self._bytes.split('\x00')[:-1]])
+            offsets = self._offsets
+            offset = 0
+            for size in self._sizes:
+                offsets.append(offset)
+                offset += size
+
+    def string(self, index):
+        offset = self._offsets[index]
+        return self._bytes[offset:offset + self._sizes[index] - 1]
+
+    def string_ranges(self):
+        """
+        Return a 2-tuple of arrays of the offsets and the sizes (including the terminating NULL) of all strings.
+        """
+        return self._offsets, self._sizes
 
     def search(self, pattern):
         results = list()
-        for (offset, string) in self._strings:
+        for idx in xrange(self.num_strings()):
+            string = self.string(idx)
             if pattern in string:
                 results.append(string)
         return results
 
     def num_strings(self):
-        return len(self._strings)
+        return len(self._offsets)
 
     def item(self, index):
-        offset = self._indices[index]
-        return offset, self._strings[offset]
+        return self._offsets[index], self.string(index)
 
     def items(self):
         """
-        Return a list of 2-tuple of (offset, string). Offsets are relative to the beginning of the section
+        Generate 2-tuple of (offset, string) of all strings. Offsets are relative to the beginning of the section
         """
-        # TODO - should create an iterator out of this function
-        return sorted(self._strings.items(), lambda x, y: cmp(x[0], y[0]))
+        for idx in xrange(self.num_strings()):
+            yield self.item(idx)
 
     def filter(self, pattern):
         indices = list()
-        for (idx, offset) in enumerate(self._indices):
-            if pattern in self._strings[offset]:
+        for idx in xrange(self.num_strings()):
+            if pattern in self.string(idx):
                 indices.append(idx)
         return indices
 
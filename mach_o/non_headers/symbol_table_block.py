@@ -1,5 +1,13 @@
+import bisect
+from array import array
+try:
+    import numpy
+except ImportError:
+    numpy = None  # optional. Without it, filter() bisects one symbol at a time.
 from utils.header import Header, NonEncodingField
 from utils.commafy import commafy
+from mach_o.headers.nlist import Nlist64
+from mach_o.headers.indirect_symbol import IndirectSymbol, IndirectSymbolIndex
 
 
 class SymbolTableBase(Header):
@@ -16,6 +24,15 @@ class SymbolTableBase(Header):
 
 
 class SymbolTable(SymbolTableBase):
+    """
+    SymbolTable keeps the field values of all nlist entries in typed columns (n_strx, n_type, n_sect,
+    n_desc, n_value) instead of one object per symbol. Columns are arrays which can be wrapped by NumPy
+    (numpy.frombuffer()) without a copy. Names are not stored. They are looked up in the string table
+    by n_strx when they are accessed.
+
+    symbols is a read-only sequence of 7-tuples of (index, n_strx, n_type, n_sect, n_desc, n_value, name)
+    for compatibility. The tuple of a symbol is created when it is accessed.
+    """
     SYM_INDEX = 0
     N_STRX = 1
     N_TYPE = 2
@@ -24,47 +41,257 @@ class SymbolTable(SymbolTableBase):
     N_VALUE = 5
     SYM_NAME = 6
 
-    def __init__(self, num_symbols):
+    def __init__(self, num_symbols, nlist_class=Nlist64):
         super(SymbolTable, self).__init__('symbol entries', num_symbols)
-        self.symbols = list()
+        self.nlist_class = nlist_class
+        (self.n_strx, self.n_type, self.n_sect, self.n_desc, self.n_value) = \
+            [nlist_class.new_column(field.format) for field in nlist_class.FIELDS]
+        self.string_table = None
+
+    def _columns(self):
+        return self.n_strx, self.n_type, self.n_sect, self.n_desc, self.n_value
+
+    def num_symbols(self):
+        return len(self.n_strx)
+
+    @property
+    def symbols(self):
+        return SymbolTuples(self)
+
+    def symbol(self, sym_idx):
+        """
+        Return the 7-tuple of a symbol.
+        """
+        return (sym_idx, self.n_strx[sym_idx], self.n_type[sym_idx], self.n_sect[sym_idx], self.n_desc[sym_idx],
+                self.n_value[sym_idx], self.symbol_name(sym_idx))
+
+    def symbol_name(self, sym_idx):
+        """
+        Return the name of a symbol. None if it has no name.
+        """
+        n_strx = self.n_strx[sym_idx]
+        if n_strx == 0 or self.string_table is None:
+            # From nlist.h:
+            #
+            # Symbols with a index into the string table of zero (n_un.n_strx == 0) are
+            # defined to have a null, "", name.  Therefore all string indexes to non null
+            # names must not have a zero string index.  This is bit historical information
+            # that has never been well documented.
+            return None
+        return self.string_table.string(n_strx)
 
     def add(self, nlist):
-        idx = len(self.symbols)
-        self.symbols.append((idx, nlist.n_strx, nlist.n_type, nlist.n_sect, nlist.n_desc, nlist.n_value, None))
+        for (column, field) in zip(self._columns(), self.nlist_class.FIELDS):
+            column.append(getattr(nlist, field.name))
+
+    def add_columns(self, n_strx, n_type, n_sect, n_desc, n_value):
+        """
+        Add symbols from columns of nlist field values (e.g. from Nlist.decode_columns()).
+        """
+        for (column, values) in zip(self._columns(), (n_strx, n_type, n_sect, n_desc, n_value)):
+            self.nlist_class.extend_column(column, values)
+
+    def nlist(self, sym_idx):
+        """
+        Create the nlist header of a symbol.
+        """
+        return self.nlist_class.from_values(tuple([column[sym_idx] for column in self._columns()]))
 
     def correlate_string_table(self, sym_str_tab):
         assert isinstance(sym_str_tab, SymbolStringTable)
-        for idx in xrange(len(self.symbols)):
-            n_strx = self.symbols[idx][self.N_STRX]
-            if n_strx == 0:
-                continue
-            sym_name = sym_str_tab.symbol_strings.get(n_strx, None)
-            if sym_name is not None:
-                self.symbols[idx] = self.symbols[idx][:self.SYM_NAME] + (sym_name,)
+        self.string_table = sym_str_tab
 
     def filter(self, pattern=None):
-        if pattern is None:
-            return range(len(self.symbols))
+        """
+        Return the indices of all symbols whose names contain pattern (all symbols if it is None).
 
+        Names are not sliced out of the string table. Instead, the pattern is searched in the whole string
+        table once. That gives the ranges of offsets of names that contain it. Then, the n_strx column
+        is matched against the ranges (by NumPy at once if it is installed).
+        """
+        if pattern is None:
+            return range(self.num_symbols())
+        if self.string_table is None or self.num_symbols() == 0:
+            return list()
+        if len(pattern) == 0:
+            (starts, stops) = (array('L', [1]), array('L', [max(self.n_strx)]))  # all named symbols
+        else:
+            (starts, stops) = self.string_table.match_ranges(pattern)
+        if len(starts) == 0:
+            return list()
+        if numpy is not None:
+            n_strx = numpy.frombuffer(self.n_strx, self.n_strx.typecode)
+            starts = numpy.frombuffer(starts, starts.typecode)
+            stops = numpy.frombuffer(stops, stops.typecode)
+            idx = numpy.searchsorted(starts, n_strx, 'right') - 1
+            matched = (idx >= 0) & (n_strx <= stops[numpy.maximum(idx, 0)]) & (n_strx != 0)
+            return numpy.flatnonzero(matched).tolist()
         indices = list()
-        for (sym_idx, (index, n_strx, n_type, n_sect, n_desc, n_value, symbol_name)) in enumerate(self.symbols):
-            if pattern in symbol_name:
+        for (sym_idx, n_strx) in enumerate(self.n_strx):
+            idx = bisect.bisect_right(starts, n_strx) - 1
+            if idx >= 0 and n_strx <= stops[idx] and n_strx != 0:
                 indices.append(sym_idx)
         return indices
 
 
+class SymbolTuples(object):
+    """
+    SymbolTuples is a read-only list of 7-tuples of all symbols of a SymbolTable.
+    """
+    def __init__(self, symbol_table):
+        self._symbol_table = symbol_table
+
+    def __len__(self):
+        return self._symbol_table.num_symbols()
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[x] for x in xrange(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('index out of range')
+        return self._symbol_table.symbol(idx)
+
+    def __iter__(self):
+        for idx in xrange(len(self)):
+            yield self._symbol_table.symbol(idx)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+
 class SymbolStringTable(SymbolTableBase):
-    def __init__(self):
+    """
+    SymbolStringTable keeps the whole string table as one string. A symbol name is sliced out of it by
+    its offset (n_strx) when it is needed. The end of a name is found by a NUL search.
+    """
+    def __init__(self, bytes_=''):
         super(SymbolStringTable, self).__init__('string table')
-        self.symbol_strings = dict()
+        self.bytes = str(bytes_)  # a buffer (e.g. of a memory-mapped file) cannot be searched or pickled
+
+    def match_ranges(self, pattern):
+        """
+        Return a 2-tuple of arrays (starts, stops) of sorted, disjoint ranges of offsets. The string at an
+        offset contains pattern if and only if starts[i] <= offset <= stops[i] for some i.
+        """
+        starts = array('L')
+        stops = array('L')
+        if '\x00' in pattern:
+            return starts, stops
+        pos = self.bytes.find(pattern)
+        while pos >= 0:
+            # Any string that starts after the previous NUL and at or before pos contains the pattern at pos.
+            start = self.bytes.rfind('\x00', 0, pos) + 1
+            if len(stops) > 0 and start <= stops[-1]:
+                stops[-1] = pos  # another match in the same string
+            else:
+                starts.append(start)
+                stops.append(pos)
+            pos = self.bytes.find(pattern, pos + 1)
+        return starts, stops
 
-    def add(self, n_strx, s):
-        self.symbol_strings[n_strx] = s
+    def string(self, offset):
+        """
+        Return the NUL terminated string that starts at offset.
+        """
+        end = self.bytes.find('\x00', offset)
+        if end < 0:
+            end = len(self.bytes)
+        return self.bytes[offset:end]
 
 
 class IndirectSymbolTable(SymbolTableBase):
-    def __init__(self, num_indirect_symbols):
+    """
+    IndirectSymbolTable keeps all indirect symbol entries in one array('I'). An entry is an index into the
+    symbol table or INDIRECT_SYMBOL_LOCAL / INDIRECT_SYMBOL_ABS (possibly both) for a symbol that is local
+    or absolute. symbol_index() and flags() split the two.
+
+    Symbol stubs and symbol pointer sections have one slot per entry starting at the entry given by their
+    reserved1. section_slots() maps each slot of such section to its symbol.
+    """
+    INDIRECT_SYMBOL_LOCAL = IndirectSymbolIndex.INDIRECT_SYMBOL_LOCAL
+    INDIRECT_SYMBOL_ABS = IndirectSymbolIndex.INDIRECT_SYMBOL_ABS
+    INDIRECT_SYMBOL_FLAGS = INDIRECT_SYMBOL_LOCAL | INDIRECT_SYMBOL_ABS
+
+    # Section types (in the flags of a section) with indirect symbol slots. From mach-o/loader.h
+    SECTION_TYPE = 0x000000ff
+    S_NON_LAZY_SYMBOL_POINTERS = 0x6  # e.g. __got, __nl_symbol_ptr
+    S_LAZY_SYMBOL_POINTERS = 0x7  # e.g. __la_symbol_ptr
+    S_SYMBOL_STUBS = 0x8  # e.g. __stubs. reserved2 is the size of a stub.
+    S_LAZY_DYLIB_SYMBOL_POINTERS = 0x10
+    S_THREAD_LOCAL_VARIABLE_POINTERS = 0x14
+    POINTER_SECTION_TYPES = (S_NON_LAZY_SYMBOL_POINTERS, S_LAZY_SYMBOL_POINTERS, S_LAZY_DYLIB_SYMBOL_POINTERS,
+                             S_THREAD_LOCAL_VARIABLE_POINTERS)
+
+    def __init__(self, num_indirect_symbols, bytes_=None):
         super(IndirectSymbolTable, self).__init__('indirect symbols', num_indirect_symbols)
+        self.entries = array('I')
+        assert self.entries.itemsize == IndirectSymbol.get_size()
+        if bytes_ is not None:
+            # Entries are native 32-bit integers (like IndirectSymbol). So, they can be copied as a whole.
+            self.entries.fromstring(str(bytes_))
+
+    def num_entries(self):
+        return len(self.entries)
+
+    def flags(self, idx):
+        return self.entries[idx] & self.INDIRECT_SYMBOL_FLAGS
+
+    def symbol_index(self, idx):
+        """
+        Return the symbol table index of an entry. None if it is a local or an absolute symbol.
+        """
+        entry = self.entries[idx]
+        if entry & self.INDIRECT_SYMBOL_FLAGS:
+            return None
+        return entry
+
+    def is_local(self, idx):
+        return (self.entries[idx] & self.INDIRECT_SYMBOL_LOCAL) != 0
+
+    def is_abs(self, idx):
+        return (self.entries[idx] & self.INDIRECT_SYMBOL_ABS) != 0
+
+    @classmethod
+    def slot_size(cls, section, pointer_size):
+        """
+        Return the size of a slot of a section. None if the section has no indirect symbol slot.
+        """
+        section_type = section.flags & cls.SECTION_TYPE
+        if section_type == cls.S_SYMBOL_STUBS:
+            return section.reserved2
+        if section_type in cls.POINTER_SECTION_TYPES:
+            return pointer_size
+        return None
+
+    def section_slots(self, section, pointer_size, symbol_table=None):
+        """
+        Return a list of 3-tuple of (slot address, symbol index, symbol name) of all slots of a symbol stubs
+        or symbol pointers section. The symbol index is None for a local or an absolute symbol. The symbol
+        name is None if symbol_table is not given or the symbol has no name. Raise ValueError if the slots
+        run past the end of the indirect symbol table.
+
+        :param pointer_size: 4 or 8 bytes for a 32-bit or 64-bit Mach-O.
+        """
+        slot_size = self.slot_size(section, pointer_size)
+        if not slot_size:
+            return list()
+        num_slots = section.size / slot_size
+        if section.reserved1 + num_slots > self.num_entries():
+            raise ValueError('section %s: %d slots from indirect symbol %d run past the end of the table (%d entries)'
+                             % (section.sectname.rstrip('\x00'), num_slots, section.reserved1, self.num_entries()))
+        slots = list()
+        for slot in xrange(num_slots):
+            sym_idx = self.symbol_index(section.reserved1 + slot)
+            name = None
+            if sym_idx is not None and symbol_table is not None:
+                name = symbol_table.symbol_name(sym_idx)
+            slots.append((section.addr + slot * slot_size, sym_idx, name))
+        return slots
 
 
 class ExtRefSymbolTable(SymbolTableBase):
@@ -0,0 +1,188 @@
+import cPickle
+import errno
+import hashlib
+import os
+import tempfile
+
+from headers.fat_header import FatHeader
+from headers.fat_arch import FatArch
+from headers.mach_header import MachHeader, MachHeader64
+from headers.load_command import LoadCommand, LoadCommandCommand
+from headers.uuid_command import UuidCommand
+from utils.header import HeaderError
+from utils.progress_indicator import ProgressIndicator
+
+
+class ParseCache(object):
+    """
+    ParseCache stores parsed byte range trees (with their Mach-O / fat objects, symbol tables and string
+    sections) in a directory so that a binary does not need to be parsed again when it is opened again.
+
+    An entry is keyed by the LC_UUID of each Mach-O slice, the file size and the modification time. (If
+    a slice has no LC_UUID, e.g. an object file, the path of the file is also used.) Finding the UUIDs only
+    reads the headers and the load commands. Entries are pickled. The total size of the cache is capped by
+    evicting the least recently used entries.
+
+    The version of entries is a hash of the source of the packages of all pickled classes. So, entries
+    saved by any other code are not used.
+
+    Loading an entry unpickles it, which can run arbitrary code. Only use a cache directory that no one
+    else can write to.
+    """
+    PACKAGES = ('mach_o', 'utils')  # packages of all pickled classes
+    SUFFIX = '.pickle'
+    MAX_SIZE = 1024 * 1024 * 1024
+    _version = None
+
+    def __init__(self, cache_dir, max_size=None):
+        if max_size is None:
+            max_size = self.MAX_SIZE
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    @classmethod
+    def version(cls):
+        """
+        Return the SHA-1 of the paths and contents of all source files of PACKAGES.
+        """
+        if cls._version is None:
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            digest = hashlib.sha1()
+            for package in cls.PACKAGES:
+                for (dir_path, dir_names, file_names) in os.walk(os.path.join(root, package)):
+                    dir_names.sort()  # walk in the same order everywhere
+                    for name in sorted(file_names):
+                        if not name.endswith('.py'):
+                            continue
+                        path = os.path.join(dir_path, name)
+                        digest.update(os.path.relpath(path, root) + '\x00')
+                        with open(path, 'rb') as f:
+                            digest.update(f.read())
+            cls._version = digest.hexdigest()
+        return cls._version
+
+    @staticmethod
+    def _find_uuid(bytes_, offset):
+        """
+        Return the UUID of the Mach-O at the given offset. Return None if it has no LC_UUID.
+        """
+        mach_header = None
+        for cls in (MachHeader, MachHeader64):
+            try:
+                mach_header = cls(bytes_[offset:offset + cls.get_size()])
+                offset += cls.get_size()
+                break
+            except HeaderError:
+                pass
+        if mach_header is None:
+            return None
+        lc_size = LoadCommand.get_size()
+        for idx in xrange(mach_header.ncmds):
+            lc = LoadCommand(bytes_[offset:offset + lc_size])
+            if lc.cmd == LoadCommandCommand.COMMANDS['LC_UUID']:
+                return UuidCommand(bytes_[offset:offset + UuidCommand.get_size()]).uuid
+            offset += lc.cmdsize
+        return None
+
+    @classmethod
+    def get_key(cls, file_path, bytes_, validate=True, archs=None):
+        stat = os.stat(file_path)
+        if FatHeader.is_valid_header(bytes_):
+            fat_header = FatHeader(bytes_[0:FatHeader.get_size()])
+            fat_archs = FatArch.decode_array(bytes_[FatHeader.get_size():FatHeader.get_size() +
+                                                    fat_header.nfat_arch * FatArch.get_size()], 0, fat_header.nfat_arch)
+            offsets = [fat_arch.offset for fat_arch in fat_archs]
+        else:
+            offsets = [0]
+        uuids = [cls._find_uuid(bytes_, offset) for offset in offsets]
+
+        key = [cls.version(), str(stat.st_size), repr(stat.st_mtime), str(validate)]
+        if archs is not None:
+            key.append(','.join(sorted(archs)))
+        for uuid in uuids:
+            if uuid is None:
+                key.append(os.path.realpath(file_path))
+                break
+        key += [uuid.encode('hex') for uuid in uuids if uuid is not None]
+        return hashlib.sha1(':'.join(key)).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.SUFFIX)
+
+    def load(self, key):
+        """
+        Return the cached byte range of a key. Return None if there is no valid entry. An entry of another
+        version or one that cannot be unpickled (e.g. it references a class that was renamed) is removed.
+        """
+        path = self._path(key)
+        try:
+            f = open(path, 'rb')
+        except IOError:
+            return None
+        try:
+            with f:
+                unpickler = cPickle.Unpickler(f)
+                # The version is pickled by itself before the tree. So, an entry of another version is
+                # skipped without unpickling its classes.
+                if unpickler.load() != self.version():
+                    self._remove(path)
+                    return None
+                byte_range = unpickler.load()
+        except Exception:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path, None)  # mark it as the most recently used entry
+        except OSError:
+            pass  # e.g. removed by a concurrent process
+        ProgressIndicator.display('loaded parse cache %s\n', path)
+        return byte_range
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # e.g. removed by a concurrent process
+
+    def save(self, key, byte_range):
+        # Write to a temporary file first so that a concurrent reader never sees a partial entry.
+        (fd, tmp_path) = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickler = cPickle.Pickler(f, 2)
+                pickler.dump(self.version())
+                pickler.dump(byte_range)
+            os.rename(tmp_path, self._path(key))
+        except:
+            os.remove(tmp_path)
+            raise
+        ProgressIndicator.display('saved parse cache %s\n', self._path(key))
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the total size of the cache is within max_size.
+        """
+        # Another process may remove or replace an entry at any time. Such an entry is skipped.
+        entries = list()
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        entries.sort()
+        for (mtime, size, name) in entries:
+            if total <= self.max_size:
+                break
+            self._remove(os.path.join(self.cache_dir, name))
+            total -= size
@@ -1,11 +1,13 @@
 #!/usr/bin/env python
 from mach_o.mach_o import MachO
 from mach_o.fat import Fat
+from mach_o.mach_o_file import MachOFile
 from mach_o.headers.fat_header import FatHeader
 from mach_o.headers.mach_header import MachHeader, MachHeader64
-from utils.bytes import Bytes
+from mach_o.parse_cache import ParseCache
+from utils.bytes import Bytes, MappedBytes, PagedBytes
 from utils.byte_range import ByteRange
-from utils.ansi_text import AnsiText
+from utils.parse_context import ParseContext
 from utils.progress_indicator import ProgressIndicator
 from ui.command_line import CommandLine
 from ui.gui.gui import Gui
@@ -30,6 +32,25 @@ def main():
     group.add_argument('-g', '--gui', action='store_true', help='run in graphical mode')
     parser.add_argument('-v', '--verbose', action='store_true', default=False, help='verbose logs')
 
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--mmap', action='store_true', default=False,
+                       help='memory-map the file instead of reading it into memory')
+    group.add_argument('--paged', action='store_true', default=False,
+                       help='read the file in pages through a bounded page cache')
+    parser.add_argument('--no-validate', dest='validate', action='store_false', default=True,
+                        help='do not validate header fields (faster for known-good binaries)')
+    parser.add_argument('--page-cache-size', type=int, default=PagedBytes.MAX_PAGES, metavar='PAGES',
+                        help='maximum number of %dKB pages cached with --paged' % (PagedBytes.PAGE_SIZE / 1024))
+
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='parse architectures of a fat binary in N processes')
+    parser.add_argument('-a', '--arch', action='append', metavar='ARCH',
+                        help='only parse the given architecture (e.g. arm64). Can be repeated.')
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help='cache parsed binaries in DIR and reuse them if the binaries are unchanged')
+    parser.add_argument('--cache-size', type=int, default=ParseCache.MAX_SIZE / (1024 * 1024), metavar='MB',
+                        help='maximum size of the parse cache')
+
     parser.add_argument('file', nargs='?', help='binary file to be analyzed')
 
     # Add all supported commands as option flags
@@ -41,44 +62,76 @@ def main():
     else:
         options = parser.parse_args()
 
-    ProgressIndicator.ENABLED = options.verbose
-
     if options.gui:
-        AnsiText.ENABLE_COLOR = False
-        root = Tk.Tk()
-        gui = Gui(root)
-        if options.file is not None:
-            gui.load_file(options.file)
-        try:
-            root.mainloop()
-        except KeyboardInterrupt:
-            print '\nGoodBye!'
-        root.destroy()
+        with ParseContext(verbose=options.verbose, color=False):
+            run_gui(options)
+    else:
+        with ParseContext(verbose=options.verbose) as context:
+            run_command_line(options, context)
+
+
+def run_gui(options):
+    root = Tk.Tk()
+    gui = Gui(root)
+    if options.file is not None:
+        gui.load_file(options.file)
+    try:
+        root.mainloop()
+    except KeyboardInterrupt:
+        print '\nGoodBye!'
+    root.destroy()
+
+
+def run_command_line(options, context):
+    # Read and parse the file
+    if options.mmap:
+        bytes_ = MappedBytes(options.file)
+    elif options.paged:
+        bytes_ = PagedBytes(options.file, max_pages=options.page_cache_size)
     else:
-        # Read and parse the file
         bytes_ = Bytes(options.file)
-        byte_range = ByteRange(0, len(bytes_), data=bytes_)
-
-        # Determine if the first header is a fat header, mach header or neither
-        if MachHeader.is_valid_header(bytes_.bytes) or MachHeader64.is_valid_header(bytes_.bytes):
-            mach_o = MachO(byte_range)
-            byte_range.data = mach_o
-        elif FatHeader.is_valid_header(bytes_.bytes):
-            fat = Fat(byte_range)
-            byte_range.data = fat
-        else:
-            print 'ERROR: Cannot find neither fat nor mach header in the beginning of the binary.'
-            sys.exit(1)
-
-        cli = CommandLine(byte_range)
-        cli.parse_options(options)
-        while options.interactive:
-            try:
-                line = raw_input('>> ')
-                cli.run(line)
-            except (EOFError, KeyboardInterrupt):
-                options.interactive = False
-                print '\nGoodbye!'
+    # Determine if the first header is a fat header, mach header or neither
+    is_mach_o = MachHeader.is_valid_header(bytes_) or MachHeader64.is_valid_header(bytes_)
+    if not is_mach_o and not FatHeader.is_valid_header(bytes_):
+        print 'ERROR: Cannot find neither fat nor mach header in the beginning of the binary.'
+        sys.exit(1)
+    try:
+        # Lazily decoded headers have their own indices so that they do not shift the ones in the tree
+        mach_o_files = MachOFile.load(bytes_, options.validate, options.arch, ParseContext(options.verbose))
+    except ValueError as e:
+        print 'ERROR: %s' % e
+        sys.exit(1)
+
+    # Only parse the whole file if some command needs the byte range tree
+    byte_range = None
+    if options.interactive or CommandLine.needs_byte_range(options):
+        cache = None
+        cache_key = None
+        if options.cache_dir is not None:
+            cache = ParseCache(options.cache_dir, options.cache_size * 1024 * 1024)
+            cache_key = cache.get_key(options.file, bytes_, options.validate, options.arch)
+            byte_range = cache.load(cache_key)
+
+        if byte_range is None:
+            byte_range = ByteRange(0, len(bytes_), data=bytes_)
+            if is_mach_o:
+                byte_range.data = MachO(byte_range, options.validate, context)
+            else:
+                byte_range.data = Fat(byte_range, options.validate, options.jobs, options.arch, context)
+            if cache is not None:
+                cache.save(cache_key, byte_range)
+    if isinstance(bytes_, PagedBytes):
+        ProgressIndicator.display('page cache: %d hits, %d misses\n', bytes_.hits, bytes_.misses)
+
+    cli = CommandLine(byte_range, mach_o_files)
+    cli.parse_options(options)
+    while options.interactive:
+        try:
+            line = raw_input('>> ')
+            cli.run(line)
+        except (EOFError, KeyboardInterrupt):
+            options.interactive = False
+            print '\nGoodbye!'
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,67 @@
+import contextlib
+import os
+import struct
+import sys
+import tempfile
+import unittest
+from StringIO import StringIO
+from utils.byte_range import ByteRange
+from utils.progress_indicator import ProgressIndicator
+from mach_o.mach_o import MachO
+
+
+class ParseTestCase(unittest.TestCase):
+    """
+    Base class of tests that parse binaries. Progress messages are disabled while a test runs.
+    """
+    def setUp(self):
+        self.enabled = ProgressIndicator.ENABLED
+        ProgressIndicator.ENABLED = False
+
+    def tearDown(self):
+        ProgressIndicator.ENABLED = self.enabled
+
+
+def parse_mach_o(bytes_, context=None):
+    """
+    Return the byte range tree of a thin Mach-O.
+    """
+    byte_range = ByteRange(0, len(bytes_), data=bytes_)
+    byte_range.data = MachO(byte_range, context=context)
+    return byte_range
+
+
+def make_fat_file(archs, align):
+    """
+    Write a fat binary to a temporary file and return its path. archs is a list of (cputype, cpusubtype,
+    path of a thin binary). Slices are aligned to 2^align. The caller removes the file.
+    """
+    (fd, file_path) = tempfile.mkstemp()
+    page_size = 1 << align
+    content = struct.pack('>II', 0xcafebabe, len(archs))
+    slices = ''
+    offset = page_size
+    for (cpu_type, cpu_subtype, path) in archs:
+        with open(path, 'rb') as f:
+            slice_ = f.read()
+        slice_ += '\x00' * (-len(slice_) % page_size)
+        content += struct.pack('>IIIII', cpu_type, cpu_subtype, offset, len(slice_), align)
+        slices += slice_
+        offset += len(slice_)
+    content += '\x00' * (page_size - len(content)) + slices
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    return file_path
+
+
+@contextlib.contextmanager
+def captured_stdout():
+    """
+    Redirect stdout to a StringIO (e.g. to check the output of CommandLine) and yield it.
+    """
+    stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        yield sys.stdout
+    finally:
+        sys.stdout = stdout
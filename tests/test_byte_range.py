@@ -117,3 +117,113 @@ class TestBytesRange(unittest.TestCase):
 
         # Add a subrange that goes beyond the parent byte range
         self.assertRaises(ValueError, lambda: br.add_subrange(90, 11))
+
+    def test_insert_subrange(self):
+        br = ByteRange(0, 100)
+        br1 = br.add_subrange(10, 10, data='a')
+        br2 = br.add_subrange(20, 10, data='b')
+        br21 = br2.add_subrange(5, 5, data='c')
+        br3 = br.add_subrange(40, 10, data='d')
+
+        # Group the first 2 subranges
+        group = br.insert_subrange(5, 30, data='group')
+        self.check_subranges(br, (5, 35), (40, 50))
+        self.check_subranges(group, (5, 15), (15, 25))
+
+        # Existing subranges are moved (not copied) beneath the new subrange
+        self.assertTrue(group.subranges[0] is br1)
+        self.assertTrue(group.subranges[1] is br2)
+        self.assertTrue(br1.parent is group)
+        self.assertEqual('b', br2.data)
+        self.assertEqual((10, 20), br1.abs_range())
+        self.assertEqual((25, 30), br21.abs_range())
+        self.assertTrue(br.subranges[1] is br3)
+
+        # A new subrange cannot cut through an existing subrange
+        self.assertRaises(ValueError, lambda: br.insert_subrange(0, 10))
+        self.assertRaises(ValueError, lambda: br.insert_subrange(45, 10))
+        self.assertRaises(ValueError, lambda: br.insert_subrange(30, 20))
+
+        # Group nothing
+        br.insert_subrange(60, 10)
+        self.check_subranges(br, (5, 35), (40, 50), (60, 70))
+
+    def test_zero_length_subranges(self):
+        br = ByteRange(0, 100)
+        br.add_subrange(0, 50)
+        br.add_subrange(0, 0)
+        br.add_subrange(50, 0)
+        self.check_subranges(br, (0, 0), (0, 50), (50, 50))
+
+        # Zero-length subranges at the start of the new subrange are not grouped
+        br.insert_subrange(0, 100)
+        self.check_subranges(br, (0, 0), (0, 100))
+        self.check_subranges(br.subranges[1], (0, 50), (50, 50))
+
+    def test_abs_start(self):
+        br = ByteRange(0, 100, data='root')
+        br1 = br.add_subrange(10, 50)
+        br11 = br1.add_subrange(20, 20)
+        br111 = br11.add_subrange(5, 5)
+        self.assertEqual(35, br111.abs_start())
+        self.assertEqual((35, 40), br111.abs_range())
+
+        # Re-parenting does not change absolute offsets
+        br1.insert_subrange(15, 30)
+        self.assertEqual(5, br11.start)
+        self.assertEqual(30, br11.abs_start())
+        self.assertEqual(35, br111.abs_start())
+        self.assertEqual('root', br111._root.data)
+
+    def test_walk(self):
+        br = ByteRange(0, 100, data='root')
+        br1 = br.add_subrange(10, 50, data='1')
+        br1.add_subrange(0, 20, data='11')
+        br1.add_subrange(20, 20, data='12').add_subrange(5, 5, data='121')
+        br.add_subrange(60, 40, data='2')
+
+        self.assertEqual([('root', 0, 100, 0), ('1', 10, 60, 1), ('11', 10, 30, 2), ('12', 30, 50, 2),
+                          ('121', 35, 40, 3), ('2', 60, 100, 1)],
+                         [(x.data, start, stop, level) for (x, start, stop, level) in br.walk()])
+        self.assertEqual(['11', '121', '2'], [x[0].data for x in br.leaves()])
+
+        # Prune the subtree of '12'
+        self.assertEqual(['root', '1', '11', '12', '2'],
+                         [x[0].data for x in br.walk(prune=lambda x: x.data == '12')])
+        self.assertEqual(['11', '2'], [x[0].data for x in br.leaves(prune=lambda x: x.data == '12')])
+
+        # Walk a subtree. Offsets are still absolute and levels are relative.
+        self.assertEqual([('1', 10, 0), ('11', 10, 1), ('12', 30, 1), ('121', 35, 2)],
+                         [(x.data, start, level) for (x, start, stop, level) in br1.walk()])
+
+        # iterate() and iterate_leaves() are built on top of walk()
+        self.assertEqual(['1', '11', '12', '121'], br1.iterate(lambda x, start, stop, level: x.data))
+        self.assertEqual([(0, 20, 1), (25, 30, 2)],
+                         br1.iterate_leaves(lambda x, start, stop, level: (start, stop, level)))
+
+    def test_add_subranges(self):
+        br = ByteRange(0, 100)
+        br.add_subrange(10, 10)
+        br.add_subrange(30, 0)
+        br.add_subrange(50, 10)
+        added = br.add_subranges([(0, 10, 'a'), (20, 10, 'b'), (30, 0, 'c'), (30, 20, 'd'), (60, 0, 'e')])
+        self.assertEqual(['a', 'b', 'c', 'd', 'e'], [x.data for x in added])
+        self.check_subranges(br, (0, 10), (10, 20), (20, 30), (30, 30), (30, 30), (30, 50), (50, 60), (60, 60))
+        self.assertEqual('c', br.subranges[4].data)
+        self.assertEqual(7, br.subrange_index(added[-1]))
+
+        # Nothing is added if any of the new subranges overlaps
+        self.assertRaises(ValueError, br.add_subranges, [(60, 10, None), (55, 10, None)])
+        self.assertRaises(ValueError, br.add_subranges, [(60, 10, None), (65, 10, None)])
+        self.assertRaises(ValueError, br.add_subranges, [(90, 20, None)])
+        self.assertEqual(8, len(br.subranges))
+
+    def test_scan_gap(self):
+        br = ByteRange(0, 100)
+        br.add_subrange(10, 10)
+        br.add_subrange(20, 0)
+        br.add_subrange(40, 10)
+        br.scan_gap(lambda start, stop: '%d-%d' % (start, stop))
+        self.check_subranges(br, (0, 10), (10, 20), (20, 20), (20, 40), (40, 50), (50, 100))
+        self.assertEqual(['0-10', None, None, '20-40', None, '50-100'], [x.data for x in br.subranges])
+        self.assertTrue(br.does_partition())
@@ -0,0 +1,101 @@
+import unittest
+from array import array
+from utils.byte_range import ByteRange
+from utils.byte_range_index import ByteRangeIndex
+from utils.compact_byte_range import CompactByteRangeStore, VirtualByteRangeStore
+
+
+class TestByteRangeIndex(unittest.TestCase):
+    def setUp(self):
+        # 0-1000
+        #   100-400
+        #     150-200
+        #     200-200 (empty)
+        #   500-600
+        #   600-1000
+        #     900-1000
+        self.root = ByteRange(0, 1000, data='root')
+        self.a = self.root.add_subrange(100, 300, data='a')
+        self.a1 = self.a.add_subrange(50, 50, data='a1')
+        self.a2 = self.a.add_subrange(100, 0, data='a2')
+        self.b = self.root.add_subrange(500, 100, data='b')
+        self.c = self.root.add_subrange(600, 400, data='c')
+        self.c1 = self.c.add_subrange(300, 100, data='c1')
+        self.index = ByteRangeIndex(self.root)
+
+    def check_path(self, offset, *expected):
+        self.assertEqual(list(expected), [br.data for br in self.index.path(offset)])
+
+    def test_find(self):
+        self.assertIs(self.root, self.index.find(0))
+        self.assertIs(self.a, self.index.find(100))
+        self.assertIs(self.a1, self.index.find(150))
+        self.assertIs(self.a1, self.index.find(199))
+        self.assertIs(self.a, self.index.find(200))
+        self.assertIs(self.root, self.index.find(400))
+        self.assertIs(self.b, self.index.find(599))
+        self.assertIs(self.c, self.index.find(600))
+        self.assertIs(self.c1, self.index.find(999))
+        self.assertIsNone(self.index.find(1000))
+        self.assertIsNone(self.index.find(-1))
+
+    def test_path(self):
+        self.check_path(0, 'root')
+        self.check_path(160, 'root', 'a', 'a1')
+        self.check_path(950, 'root', 'c', 'c1')
+        self.check_path(2000)
+
+    def test_overlaps(self):
+        self.assertEqual(['a', 'a1'], [br.data for br in self.index.overlaps(120, 210)])
+        self.assertEqual(['a1', 'a', 'root', 'b'], [br.data for br in self.index.overlaps(199, 501)])
+        self.assertEqual(['c', 'c1'], [br.data for br in self.index.overlaps(600, 2000)])
+        self.assertEqual([], list(self.index.overlaps(1000, 2000)))
+
+    def test_subrange_index(self):
+        self.assertEqual(1, self.root.subrange_index(self.b))
+        self.assertEqual(1, self.a.subrange_index(self.a2))
+        self.assertRaises(ValueError, self.root.subrange_index, self.c1)
+
+
+class TestByteRangeIndexCompact(unittest.TestCase):
+    def setUp(self):
+        # 0-30
+        #   10-26 (compact store)
+        #     10-14, 14-18, 18-26
+        #       20-22, 22-24
+        self.root = ByteRange(0, 30, data='root')
+        self.owner = self.root.add_subrange(10, 16, data='owner')
+        self.store = CompactByteRangeStore(self.owner)
+        self.store.add_children(CompactByteRangeStore.OWNER, [0, 4, 8], [4, 4, 8], ['a', 'b', 'c'])
+        self.store.add_children(2, [2, 4], [2, 2], ['c1', 'c2'])
+        self.index = ByteRangeIndex(self.root)
+
+    def test_lazy(self):
+        self.assertEqual(3, len(self.index))  # root, the store and root again
+        self.assertEqual(0, len(self.store._views))
+
+    def test_find(self):
+        self.assertEqual(['root', 'a', 'b', 'c', 'c', 'c1', 'c2', 'c', 'root'],
+                         [self.index.find(x).data for x in (0, 10, 17, 18, 19, 20, 23, 24, 26)])
+        self.assertEqual(['root', 'owner', 'c', 'c2'], [br.data for br in self.index.path(22)])
+
+    def test_overlaps(self):
+        self.assertEqual(['b', 'c', 'c1'], [br.data for br in self.index.overlaps(17, 21)])
+        self.assertEqual(['c2', 'c', 'root'], [br.data for br in self.index.overlaps(23, 28)])
+        self.assertEqual(['root', 'a', 'b', 'c', 'c1', 'c2'], [br.data for br in self.index.overlaps(0, 20 + 3)])
+
+    def test_virtual(self):
+        root = ByteRange(0, 8)
+        owner = root.add_subrange(0, 8)
+        created = list()
+
+        def factory(idx):
+            created.append(idx)
+            return str(idx)
+        store = VirtualByteRangeStore(owner, array('L', [0, 2, 4]), array('L', [2, 2, 2]), factory, str)
+        index = ByteRangeIndex(root)
+        self.assertEqual([], created)
+        self.assertEqual('1', index.find(3).data)
+        self.assertIs(owner, index.find(7))
+        self.assertEqual([1], created)
+        self.assertEqual(0, len(store._views))
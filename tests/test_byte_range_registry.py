@@ -0,0 +1,51 @@
+import unittest
+from utils.byte_range import ByteRange
+from utils.byte_range_registry import ByteRangeRegistry
+
+
+class Base(object):
+    pass
+
+
+class Derived(Base):
+    pass
+
+
+class TestByteRangeRegistry(unittest.TestCase):
+    def test_registry(self):
+        root = ByteRange(0, 100)
+        registry = ByteRangeRegistry(root)
+        self.assertIs(registry, root.registry)
+
+        br1 = root.add_subrange(50, 50, data=Base())
+        br2 = root.add_subrange(0, 50)
+        br21 = br2.add_subrange(10, 10, data=Derived())
+        br2.data = Base()
+        root.add_subrange(50, 0, data='not registered in Base')
+        self.assertRaises(ValueError, root.add_subrange, 40, 20, Base())  # overlapping ranges are not registered
+
+        self.assertEqual([br2, br21, br1], registry.find(Base))
+        self.assertEqual([br21], registry.find(Derived))
+        self.assertEqual([br2, br21, br1], root.find(Base))
+        self.assertEqual([br21], br2.find(Derived))  # br2 has no registry of its own
+
+        # Replacing the data of a range
+        br1.data = Derived()
+        self.assertEqual([br21, br1], registry.find(Derived))
+        br21.data = None
+        self.assertEqual([br2, br1], registry.find(Base))
+
+    def test_nested_registries(self):
+        root = ByteRange(0, 100)
+        outer = ByteRangeRegistry(root)
+        br1 = root.add_subrange(0, 50)
+        br2 = root.add_subrange(50, 50)
+        inner1 = ByteRangeRegistry(br1)
+        inner2 = ByteRangeRegistry(br2)
+        br11 = br1.add_subrange(0, 10, data=Base())
+        br21 = br2.add_subrange(0, 10, data=Base())
+        br21.insert_subrange(0, 10, data=Derived())
+
+        self.assertEqual([br11], inner1.find(Base))
+        self.assertEqual([br2.subranges[0], br21], inner2.find(Base))
+        self.assertEqual([br11, br2.subranges[0], br21], outer.find(Base))
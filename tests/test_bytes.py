@@ -0,0 +1,52 @@
+import unittest
+from utils.bytes import Bytes, MappedBytes, PagedBytes
+from mach_o.headers.mach_header import MachHeader64
+
+
+class TestBytes(unittest.TestCase):
+    FILE = './binaries/executable.x86_64'
+
+    def setUp(self):
+        with open(self.FILE, 'rb') as f:
+            self.expected = f.read()
+
+    def check_bytes(self, bytes_):
+        self.assertEqual(len(self.expected), len(bytes_))
+        self.assertEqual(self.expected[0:32], str(bytes_.range(0, 32)))
+        self.assertEqual(self.expected[1000:1024], str(bytes_.range(1000, 1024)))
+        self.assertEqual(self.expected[-10:], str(bytes_.range(len(bytes_) - 10, len(bytes_) + 10)))
+        self.assertEqual('', str(bytes_.range(10, 5)))
+
+    def test_bytes(self):
+        self.check_bytes(Bytes(self.FILE))
+
+    def test_mapped_bytes(self):
+        bytes_ = MappedBytes(self.FILE)
+        self.check_bytes(bytes_)
+
+        # Headers can be decoded directly from the mapping
+        mach_header = MachHeader64(bytes_.range(0, MachHeader64.get_size()))
+        self.assertEqual(MachHeader64.MH_MAGIC64, mach_header.magic)
+        self.assertEqual(16, mach_header.ncmds)
+        bytes_.close()
+
+    def test_paged_bytes(self):
+        bytes_ = PagedBytes(self.FILE, page_size=256, max_pages=4)
+        self.check_bytes(bytes_)
+
+        # A range spanning multiple pages
+        self.assertEqual(self.expected[100:1100], bytes_.range(100, 1100))
+        self.assertEqual(self.expected[:32], bytes_[:32])
+        self.assertEqual(self.expected[-1], bytes_[-1])
+
+        # The cache never grows beyond its limit
+        self.assertTrue(bytes_.num_cached_pages() <= 4)
+
+        # Reading the same page again is a hit
+        hits = bytes_.hits
+        misses = bytes_.misses
+        bytes_.range(5000, 5001)
+        bytes_.range(5002, 5003)
+        self.assertEqual(misses + 1, bytes_.misses)
+        self.assertEqual(hits + 1, bytes_.hits)
+        bytes_.close()
@@ -0,0 +1,128 @@
+import unittest
+from array import array
+from utils.bytes import Bytes
+from utils.byte_range import ByteRange
+from utils.byte_range_registry import ByteRangeRegistry
+from utils.compact_byte_range import CompactByteRangeStore, CompactByteRange, VirtualByteRangeStore
+
+
+class FakeBytes(Bytes):
+    def __init__(self, s):
+        self.bytes = s
+
+
+class TestCompactByteRange(unittest.TestCase):
+    def setUp(self):
+        self.root = ByteRange(0, 26, data=FakeBytes('abcdefghijklmnopqrstuvwxyz'))
+        self.registry = ByteRangeRegistry(self.root)
+        self.owner = self.root.add_subrange(10, 16, data='owner')
+        self.store = CompactByteRangeStore(self.owner)
+        self.store.add_children(CompactByteRangeStore.OWNER, [0, 4, 8], [4, 4, 8], ['a', 'b', 'c'])
+        self.store.add_children(2, [2, 4], [2, 2], [u'c1', u'c2'])
+
+    def test_tree(self):
+        self.assertEqual(5, len(self.store))
+        self.assertEqual(3, len(self.owner.subranges))
+        c = self.owner.subranges[2]
+        self.assertIsInstance(c, CompactByteRange)
+        self.assertIs(c, self.owner.subranges[-1])
+        self.assertEqual(['a', 'b', 'c'], [x.data for x in self.owner.subranges])
+        self.assertEqual((8, 16), (c.start, c.stop))
+        self.assertEqual((18, 26), c.abs_range())
+        self.assertEqual(2, self.owner.subrange_index(c))
+
+        c2 = c.subranges[1]
+        self.assertIs(c, c2.parent)
+        self.assertIs(self.owner, c.parent)
+        self.assertEqual((22, 24), c2.abs_range())
+        self.assertEqual('wx', c2.bytes())
+        self.assertEqual(3, c2.depth())
+
+        c2.data = 'new c2'
+        self.assertEqual('new c2', self.store.data[4])
+
+    def test_walk(self):
+        self.assertEqual([('owner', 10, 1), ('a', 10, 2), ('b', 14, 2), ('c', 18, 2), (u'c1', 20, 3), (u'c2', 22, 3)],
+                         [(br.data, start, level) for (br, start, stop, level) in self.root.walk() if level > 0])
+        self.assertEqual(['a', 'b', u'c1', u'c2'], [br.data for (br, start, stop, level) in self.owner.leaves()])
+
+    def test_registry(self):
+        self.assertEqual([u'c1', u'c2'], [br.data for br in self.root.find(unicode)])
+        self.assertEqual(['owner', 'a', 'b', 'c'], [br.data for br in self.root.find(str)])
+
+    def test_read_only(self):
+        c = self.owner.subranges[2]
+        self.assertRaises(ValueError, c.add_subrange, 0, 1)
+        self.assertRaises(ValueError, c.insert_subrange, 0, 1)
+        self.assertRaises(ValueError, self.owner.add_subrange, 16, 0)
+        self.assertRaises(ValueError, self.owner.insert_subrange, 0, 8)
+        self.assertRaises(ValueError, self.store.add_children, 2, [0], [1])
+        self.assertRaises(ValueError, self.store.add_children, 0, [0, 1], [2, 2])  # overlapped
+
+    def test_insert_beneath_owner(self):
+        # Grouping the owner does not move any compact byte range
+        self.root.insert_subrange(5, 21, data='group')
+        c2 = self.owner.subranges[2].subranges[1]
+        self.assertEqual(5, self.owner.start)
+        self.assertEqual((22, 24), c2.abs_range())
+        self.assertEqual(['group', 'owner', 'c', u'c2'],
+                         [br.data for br in self.root.find(object) if br.abs_start() <= 22 < br.abs_end()])
+
+
+class Letter(object):
+    def __init__(self, letter):
+        self.letter = letter
+
+
+class LetterFactory(object):
+    def __init__(self):
+        self.created = list()
+
+    def __call__(self, idx):
+        self.created.append(idx)
+        return Letter('abcde'[idx])
+
+
+class TestVirtualByteRange(unittest.TestCase):
+    def setUp(self):
+        self.root = ByteRange(0, 26, data=FakeBytes('abcdefghijklmnopqrstuvwxyz'))
+        self.registry = ByteRangeRegistry(self.root)
+        self.owner = self.root.add_subrange(10, 16, data='owner')
+        self.starts = array('L', [0, 2, 6, 7, 12])
+        self.factory = LetterFactory()
+        VirtualByteRangeStore(self.owner, self.starts, array('L', [2, 4, 1, 5, 4]), self.factory, Letter)
+
+    def test_lazy(self):
+        self.assertEqual(5, len(self.owner.subranges))
+        self.assertEqual([], self.factory.created)
+        br = self.owner.subranges[3]
+        self.assertEqual((17, 22), br.abs_range())
+        self.assertEqual('rstuv', br.bytes())
+        self.assertIs(self.owner, br.parent)
+        self.assertEqual(0, len(br.subranges))
+        self.assertEqual([], self.factory.created)
+        self.assertEqual('d', br.data.letter)
+        self.assertIs(br.data, self.owner.subranges[3].data)
+        self.assertEqual([3], self.factory.created)
+
+        # Data is not kept once no view of its node is referenced
+        del br
+        self.assertEqual('d', self.owner.subranges[3].data.letter)
+        self.assertEqual([3, 3], self.factory.created)
+        self.assertEqual(0, len(self.owner.subranges._store.data._values))
+
+        # Assigned data is kept
+        letter = Letter('x')
+        self.owner.subranges[4].data = letter
+        self.assertIs(letter, self.owner.subranges[4].data)
+
+    def test_walk_and_find(self):
+        leaves = [br.data.letter for (br, start, stop, level) in self.root.leaves()]
+        self.assertEqual(['a', 'b', 'c', 'd', 'e'], leaves)
+        self.assertEqual([self.owner.subranges[1]], [br for br in self.root.find(Letter) if br.data.letter == 'b'])
+        self.assertEqual(set(range(5)), set(self.factory.created))
+
+    def test_read_only(self):
+        self.assertRaises(ValueError, self.owner.subranges[0].add_subrange, 0, 1)
+        self.assertRaises(ValueError, VirtualByteRangeStore, self.owner, self.starts, self.starts, self.factory,
+                          Letter)
@@ -0,0 +1,188 @@
+import unittest
+from utils.bytes import Bytes
+from mach_o.mach_o_file import MachOFile
+from mach_o.non_headers.dyld_info import RebaseTable, BindTable, ExportTrie
+from ui.command_line import CommandLine
+from fixtures import captured_stdout
+
+
+class TestRebaseTable(unittest.TestCase):
+    STREAM = ''.join([
+        '\x11',  # REBASE_OPCODE_SET_TYPE_IMM(REBASE_TYPE_POINTER)
+        '\x22\x10',  # REBASE_OPCODE_SET_SEGMENT_AND_OFFSET_ULEB(2, 0x10)
+        '\x52',  # REBASE_OPCODE_DO_REBASE_IMM_TIMES(2)
+        '\x30\x80\x01',  # REBASE_OPCODE_ADD_ADDR_ULEB(0x80)
+        '\x41',  # REBASE_OPCODE_ADD_ADDR_IMM_SCALED(1)
+        '\x60\x01',  # REBASE_OPCODE_DO_REBASE_ULEB_TIMES(1)
+        '\x70\x08',  # REBASE_OPCODE_DO_REBASE_ADD_ADDR_ULEB(8)
+        '\x80\x02\x08',  # REBASE_OPCODE_DO_REBASE_ULEB_TIMES_SKIPPING_ULEB(2, 8)
+        '\x12',  # REBASE_OPCODE_SET_TYPE_IMM(REBASE_TYPE_TEXT_ABSOLUTE32)
+        '\x20\x00\x51',  # segment 0, offset 0, REBASE_OPCODE_DO_REBASE_IMM_TIMES(1)
+        '\x00',  # REBASE_OPCODE_DONE
+        '\x51',  # not decoded
+    ])
+
+    def test_decode_entries(self):
+        self.assertEqual([(2, 0x10, 1), (2, 0x18, 1), (2, 0xa8, 1), (2, 0xb0, 1), (2, 0xc0, 1), (2, 0xd0, 1),
+                          (0, 0, 2)],
+                         list(RebaseTable.decode_entries(self.STREAM, 8)))
+        self.assertRaises(ValueError, list, RebaseTable.decode_entries('\x90', 8))
+
+    def test_decode(self):
+        table = RebaseTable.decode(buffer(self.STREAM), 8)
+        self.assertEqual(7, table.num_entries())
+        self.assertEqual('7 rebase entries', table.desc)
+        self.assertEqual((2, 0xb0, 1), table.entry(3))
+        self.assertEqual(list(RebaseTable.decode_entries(self.STREAM, 8)), list(table.entries()))
+
+
+class TestBindTable(unittest.TestCase):
+    STREAM = ''.join([
+        '\x11',  # BIND_OPCODE_SET_DYLIB_ORDINAL_IMM(1)
+        '\x40dyld_stub_binder\x00',  # BIND_OPCODE_SET_SYMBOL_TRAILING_FLAGS_IMM(0)
+        '\x51',  # BIND_OPCODE_SET_TYPE_IMM(BIND_TYPE_POINTER)
+        '\x72\x00',  # BIND_OPCODE_SET_SEGMENT_AND_OFFSET_ULEB(2, 0)
+        '\x90',  # BIND_OPCODE_DO_BIND
+        '\x3e',  # BIND_OPCODE_SET_DYLIB_SPECIAL_IMM(BIND_SPECIAL_DYLIB_FLAT_LOOKUP)
+        '\x41_foo\x00',  # BIND_OPCODE_SET_SYMBOL_TRAILING_FLAGS_IMM(BIND_SYMBOL_FLAGS_WEAK_IMPORT)
+        '\x60\x7c',  # BIND_OPCODE_SET_ADDEND_SLEB(-4)
+        '\xa0\x08',  # BIND_OPCODE_DO_BIND_ADD_ADDR_ULEB(8)
+        '\xb1',  # BIND_OPCODE_DO_BIND_ADD_ADDR_IMM_SCALED(1)
+        '\x20\x82\x01',  # BIND_OPCODE_SET_DYLIB_ORDINAL_ULEB(130)
+        '\x80\x08',  # BIND_OPCODE_ADD_ADDR_ULEB(8)
+        '\xc0\x02\x00',  # BIND_OPCODE_DO_BIND_ULEB_TIMES_SKIPPING_ULEB(2, 0)
+        '\x00',  # BIND_OPCODE_DONE
+    ])
+
+    THREADED_STREAM = ''.join([
+        '\x11\x40_printf\x00\x72\x10\x90',  # BIND_OPCODE_DO_BIND of _printf
+        '\xd0\x00\x01',  # BIND_OPCODE_THREADED(BIND_SUBOPCODE_THREADED_SET_BIND_ORDINAL_TABLE_SIZE_ULEB(1))
+        '\xd1',  # BIND_OPCODE_THREADED(BIND_SUBOPCODE_THREADED_APPLY)
+    ])
+
+    def test_decode_entries(self):
+        self.assertEqual([(2, 0x00, 1, 1, 'dyld_stub_binder', 0, 0),
+                          (2, 0x08, 1, -2, '_foo', -4, 1),
+                          (2, 0x18, 1, -2, '_foo', -4, 1),
+                          (2, 0x30, 1, 130, '_foo', -4, 1),
+                          (2, 0x38, 1, 130, '_foo', -4, 1)],
+                         list(BindTable.decode_entries(self.STREAM, 8)))
+
+    def test_lazy(self):
+        stream = '\x72\x10\x11\x40_printf\x00\x90\x00' + '\x72\x18\x12\x40_puts\x00\x90\x00'
+        entries = [(2, 0x10, 1, 1, '_printf', 0, 0), (2, 0x18, 1, 2, '_puts', 0, 0)]
+        self.assertEqual(entries[0:1], list(BindTable.decode_entries(stream, 8)))
+        self.assertEqual(entries, list(BindTable.decode_entries(stream, 8, lazy=True)))
+
+    def test_decode(self):
+        table = BindTable.decode(self.STREAM, 8)
+        self.assertEqual('5 bind entries', table.desc)
+        self.assertEqual(['dyld_stub_binder', '_foo'], table.symbol_names)
+        self.assertEqual([0, 1, 1, 1, 1], list(table.symbol))
+        self.assertEqual((2, 0x30, 1, 130, '_foo', -4, 1), table.entry(3))
+        self.assertEqual(list(BindTable.decode_entries(self.STREAM, 8)), list(table.entries()))
+
+    def test_buffer(self):
+        self.assertEqual(list(BindTable.decode_entries(self.STREAM, 8)),
+                         list(BindTable.decode_entries(buffer(self.STREAM), 8)))
+
+    def test_threaded(self):
+        entries = BindTable.decode_entries(self.THREADED_STREAM, 8)
+        self.assertEqual((2, 0x10, 1, 1, '_printf', 0, 0), next(entries))
+        self.assertRaises(ValueError, next, entries)
+
+
+class TestExportTrie(unittest.TestCase):
+    # (terminal info, [(edge label, child node)]) of each node. All offsets fit in one ULEB128 byte.
+    NODES = [
+        ('', [('_f', 1), ('_bar', 4)]),
+        ('', [('oo', 2), ('un', 3)]),
+        ('\x00\x10', [('2', 5)]),  # _foo
+        ('\x08\x01_fun_impl\x00', []),  # _fun, re-exported from library 1
+        ('\x14\x20\x30', []),  # _bar, a weak definition with a resolver
+        ('\x01\x40', []),  # _foo2, thread local
+    ]
+
+    @classmethod
+    def build(cls, nodes):
+        sizes = [2 + len(info) + sum([len(label) + 2 for (label, child) in children]) for (info, children) in nodes]
+        offsets = [sum(sizes[0:idx]) for idx in xrange(len(nodes))]
+        bytes_ = ''
+        for (info, children) in nodes:
+            bytes_ += chr(len(info)) + info + chr(len(children))
+            bytes_ += ''.join([label + '\x00' + chr(offsets[child]) for (label, child) in children])
+        return bytes_
+
+    def setUp(self):
+        self.trie = ExportTrie(self.build(self.NODES))
+
+    def test_lookup(self):
+        self.assertEqual(('_foo', 0, 0x10, None, None), self.trie.lookup('_foo'))
+        self.assertEqual(('_foo2', 1, 0x40, None, None), self.trie.lookup('_foo2'))
+        self.assertEqual(('_fun', 0x08, None, 1, '_fun_impl'), self.trie.lookup('_fun'))
+        self.assertEqual(('_bar', 0x14, 0x20, 0x30, None), self.trie.lookup('_bar'))
+        for name in ('', '_f', '_fo', '_foo3', '_baz', 'x'):
+            self.assertIsNone(self.trie.lookup(name))
+        self.assertIsNone(ExportTrie('').lookup('_foo'))
+
+    def names(self, prefix):
+        return [export[ExportTrie.NAME] for export in self.trie.exports(prefix)]
+
+    def test_exports(self):
+        names = self.names
+        self.assertEqual(['_foo', '_foo2', '_fun', '_bar'], names(''))
+        self.assertEqual(['_foo', '_foo2', '_fun'], names('_f'))
+        self.assertEqual(['_foo', '_foo2'], names('_fo'))
+        self.assertEqual(['_foo2'], names('_foo2'))
+        self.assertEqual([], names('_x'))
+        self.assertEqual([], list(ExportTrie('').exports()))
+
+        trie = ExportTrie(buffer(self.build(self.NODES)))
+        self.assertEqual(list(self.trie.exports()), list(trie.exports()))
+        self.assertEqual(('_fun', 0x08, None, 1, '_fun_impl'), trie.lookup('_fun'))
+
+    def test_invalid(self):
+        trie = ExportTrie(self.build([('', [('a', 0)])]))
+        self.assertRaises(ValueError, list, trie.exports())
+        self.assertIsNone(trie.lookup('aaa'))
+        self.assertRaises(ValueError, ExportTrie('\x00\x01a\x00\x7f').lookup, 'a')
+
+
+class TestMachOFileDyldInfo(unittest.TestCase):
+    def test_executable(self):
+        mach_o_file = MachOFile.load(Bytes('./binaries/executable.x86_64'))[0]
+        self.assertEqual([(2, 0x10, RebaseTable.REBASE_TYPE_POINTER)], list(mach_o_file.iter_rebases()))
+        self.assertEqual([(2, 0x0, 1, 1, 'dyld_stub_binder', 0, 0)], list(mach_o_file.binds.entries()))
+        self.assertEqual([(2, 0x10, 1, 1, '_printf', 0, 0)], list(mach_o_file.iter_binds('lazy_bind')))
+        self.assertEqual(0, mach_o_file.weak_binds.num_entries())
+        self.assertEqual(['/usr/lib/libSystem.B.dylib'], mach_o_file.libraries)
+        self.assertEqual('__la_symbol_ptr', mach_o_file.section_at(0x100001010).sectname.rstrip('\x00'))
+        self.assertIsNone(mach_o_file.section_at(0))
+        self.assertEqual(0x100000000, mach_o_file.image_base)
+        self.assertEqual(('_main', 0, 0xf30, None, None), mach_o_file.export_trie.lookup('_main'))
+        self.assertEqual(['__mh_execute_header', '_main'], [x[0] for x in mach_o_file.export_trie.exports()])
+
+    def test_commands(self):
+        cli = CommandLine(None, MachOFile.load(Bytes('./binaries/executable.x86_64')))
+        self.assertEqual(['exports', 'export-prefix'], [cmd.command for cmd in cli.run('export')])
+        with captured_stdout() as stdout:
+            self.assertIsNone(cli.run('exports'))
+            self.assertIsNone(cli.run('export-prefix _m'))
+        self.assertEqual(2, stdout.getvalue().count('_main'))
+        self.assertEqual(1, stdout.getvalue().count('__mh_execute_header'))
+
+    def test_threaded_binds(self):
+        mach_o_file = MachOFile.load(Bytes('./binaries/executable.x86_64'))[0]
+        mach_o_file._dyld_info_bytes = lambda kind: TestBindTable.THREADED_STREAM
+        with captured_stdout() as stdout:
+            CommandLine(None, [mach_o_file]).run('bind')
+        lines = stdout.getvalue().splitlines()
+        self.assertIn('_printf', lines[-2])
+        self.assertEqual('ERROR: threaded bind opcode 0xd0 at offset 13 is not supported', lines[-1])
+
+    def test_object(self):
+        mach_o_file = MachOFile.load(Bytes('./binaries/object.o.x86_64'))[0]
+        self.assertIsNone(mach_o_file.dyld_info)
+        self.assertEqual([], list(mach_o_file.iter_rebases()))
+        self.assertEqual(0, mach_o_file.lazy_binds.num_entries())
+        self.assertIsNone(mach_o_file.export_trie.lookup('_main'))
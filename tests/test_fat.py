@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import struct
+from utils.bytes import Bytes, MappedBytes, PagedBytes
+from utils.byte_range import ByteRange
+from utils.header import Header
+from utils.parse_context import ParseContext
+from mach_o.fat import Fat
+from mach_o.headers.fat_arch import FatArch
+from mach_o.mach_o import MachO
+from mach_o.headers.mach_header import MachHeader, MachHeader64
+from mach_o.non_headers.cstring import Cstring
+from mach_o.non_headers.arch_block import UnparsedArchBlock
+from fixtures import ParseTestCase, make_fat_file
+
+
+class TestFat(ParseTestCase):
+    ARCHS = ((7, 3, './binaries/executable.i386'),
+             (0x01000007, 3, './binaries/executable.x86_64'))
+    ALIGN = 12
+
+    def setUp(self):
+        super(TestFat, self).setUp()
+        self.file_path = make_fat_file(self.ARCHS, self.ALIGN)
+
+    def tearDown(self):
+        super(TestFat, self).tearDown()
+        os.remove(self.file_path)
+
+    def parse(self, jobs=1, archs=None, bytes_class=Bytes):
+        bytes_ = bytes_class(self.file_path)
+        byte_range = ByteRange(0, len(bytes_), data=bytes_)
+        byte_range.data = Fat(byte_range, jobs=jobs, archs=archs, context=ParseContext())
+        return byte_range
+
+    @staticmethod
+    def dump(byte_range):
+        return [(start, stop, level, type(br.data), str(br.data) if isinstance(br.data, Header) else None)
+                for (br, start, stop, level) in byte_range.walk()]
+
+    def test_parallel(self):
+        serial = self.parse(1)
+        parallel = self.parse(2)
+        self.assertEqual(self.dump(serial), self.dump(parallel))
+        self.assertEqual(self.dump(serial), self.dump(self.parse(2, bytes_class=PagedBytes)))
+
+        mach_o_brs = parallel.find(MachO)
+        self.assertEqual(2, len(mach_o_brs))
+        for mach_o_br in mach_o_brs:
+            self.assertIs(parallel, mach_o_br.root())
+            self.assertIs(mach_o_br, mach_o_br.data.registry.byte_range)
+            self.assertEqual(1, len(mach_o_br.find((MachHeader, MachHeader64))))
+            for (br, start, stop, level) in mach_o_br.walk():
+                self.assertIs(parallel, br.root())
+        self.assertEqual([x.data.string for x in serial.find(Cstring)],
+                         [x.data.string for x in parallel.find(Cstring)])
+
+    def test_worker_bytes(self):
+        pool_args = list()
+
+        class Pool(object):
+            # Run workers in this process and record what they are given
+            def __init__(self, processes):
+                pass
+
+            def map(self, func, args):
+                pool_args.extend(args)
+                return map(func, args)
+
+            def close(self):
+                pass
+
+            def join(self):
+                pass
+
+        multiprocessing_pool = multiprocessing.Pool
+        multiprocessing.Pool = Pool
+        try:
+            self.parse(2)
+            self.parse(2, bytes_class=PagedBytes)
+        finally:
+            multiprocessing.Pool = multiprocessing_pool
+        self.assertEqual([MappedBytes, MappedBytes, PagedBytes, PagedBytes], [args[0] for args in pool_args])
+
+    def test_archs(self):
+        byte_range = self.parse(archs=['x86_64'])
+        self.assertEqual(['i386', 'x86_64'], [x.arch_name() for x in byte_range.data.archs])
+        self.assertEqual(['i386'], [x.data.arch for x in byte_range.find(UnparsedArchBlock)])
+        self.assertEqual([MachHeader64], [type(x.data) for x in byte_range.find((MachHeader, MachHeader64))])
+        self.assertEqual([UnparsedArchBlock, MachO], [type(x.data) for x in byte_range.subranges[3:]])
+
+        with self.assertRaises(ValueError) as context:
+            self.parse(archs=['arm64'])
+        self.assertEqual('architecture arm64 not found. (Available: i386, x86_64)', str(context.exception))
+        self.assertEqual('arm64e', FatArch.get_arch_name(0x0100000c, 0x80000002))
+
+    def test_arch_names(self):
+        # (cputype, cpusubtype, name) of <mach/machine.h>
+        for (cpu_type, cpu_subtype, name) in ((0x0100000c, 0, 'arm64'), (0x0100000c, 1, 'arm64v8'),
+                                              (0x0200000c, 1, 'arm64_32'), (12, 12, 'armv7k'), (12, 9, 'armv7'),
+                                              (0x01000007, 8, 'x86_64h'), (0x0200000c, 0, '33554444:0')):
+            fat_arch = FatArch(struct.pack('>IIIII', cpu_type, cpu_subtype, 0x1000, 0x1000, 12))
+            self.assertEqual(name, fat_arch.arch_name())
+            self.assertEqual([fat_arch], Fat.select_archs([fat_arch], [name]))
@@ -1,5 +1,6 @@
 import unittest
 import time
+import struct
 from utils.header import *
 
 
@@ -88,3 +89,89 @@ class TestFields(unittest.TestCase):
         self.value = 'abcdef\0\0'
         self.assertTrue(string_field.validate(self))
         self.assertEqual('abcdef', string_field.display(self))
+
+
+class Record(Header):
+    ENDIAN = True
+    FIELDS = (
+        Field('a', 'I'),
+        MagicField('b', 'H', {1: 'ONE', 2: 'TWO'}),
+    )
+
+    def __init__(self, bytes_=None, **kwargs):
+        self.a = None
+        self.b = None
+        super(Record, self).__init__('record', bytes_, **kwargs)
+
+
+class AlignedRecord(Header):
+    ENDIAN = None  # native alignment prevents packing records back-to-back in one format
+    FIELDS = Record.FIELDS
+
+    def __init__(self, bytes_=None, **kwargs):
+        self.a = None
+        self.b = None
+        super(AlignedRecord, self).__init__('aligned_record', bytes_, **kwargs)
+
+
+class TestHeaderArray(unittest.TestCase):
+    def check_decode_array(self, cls, pack_fmt):
+        num_records = cls.ARRAY_CHUNK_SIZE + 3  # exercise both the chunked and remaining records
+        bytes_ = '\xff' * 5
+        for idx in xrange(num_records):
+            bytes_ += struct.pack(pack_fmt, idx, 1 + (idx % 2))
+        records = cls.decode_array(buffer(bytes_), 5, num_records)
+        self.assertEqual(num_records, len(records))
+        for (idx, record) in enumerate(records):
+            self.assertEqual(idx, record.a)
+            self.assertEqual(1 + (idx % 2), record.b)
+
+        # Not enough bytes for the requested number of records
+        self.assertRaises(HeaderSizeError, lambda: cls.decode_array(bytes_, 6, num_records))
+
+        # Invalid values are still rejected
+        self.assertRaises(HeaderInvalidValueError, lambda: cls.decode_array(bytes_, 0, 1))
+
+    def test_decode_array(self):
+        self.check_decode_array(Record, '>IH')
+
+    def test_decode_aligned_array(self):
+        self.check_decode_array(AlignedRecord, '=IH')
+        self.assertEqual(1, AlignedRecord.get_array_parser()[1])
+
+    def test_values_setter(self):
+        # Field values are stored in slots
+        self.assertEqual(('a', 'b'), Record.__slots__)
+
+        record = Record(struct.pack('>IH', 7, 2))
+        self.assertEqual(7, record.a)
+        self.assertEqual(2, record.b)
+        self.assertEqual('<record: a=7, b=TWO>', str(record))
+        self.assertTrue('VALUES_SETTERS' in Record.__dict__)
+        self.assertRaises(HeaderInvalidValueError, lambda: Record(struct.pack('>IH', 7, 3)))
+
+    def test_skip_validation(self):
+        record = Record(struct.pack('>IH', 7, 3), validate=False)
+        self.assertEqual(3, record.b)
+        records = Record.decode_array(struct.pack('>IH', 1, 3) * 2, 0, 2, validate=False)
+        self.assertEqual([3, 3], [x.b for x in records])
+
+    def check_decode_columns(self, cls, pack_fmt):
+        num_records = cls.ARRAY_CHUNK_SIZE + 3  # exercise both the chunked and remaining records
+        bytes_ = '\xff' * 5
+        for idx in xrange(num_records):
+            bytes_ += struct.pack(pack_fmt, idx, 1 + (idx % 2))
+        (a, b) = cls.decode_columns(buffer(bytes_), 5, num_records)
+        self.assertEqual(range(num_records), list(a))
+        self.assertEqual([1 + (idx % 2) for idx in xrange(num_records)], list(b))
+        record = cls.from_values((a[3], b[3]))
+        self.assertEqual((3, 2), (record.a, record.b))
+
+        self.assertRaises(HeaderSizeError, lambda: cls.decode_columns(bytes_, 6, num_records))
+        self.assertRaises(HeaderInvalidValueError, lambda: cls.decode_columns(bytes_, 0, 1))
+        self.assertEqual(([0xffffffff], [0]), tuple([list(x) for x in
+                                                           cls.decode_columns(bytes_, 1, 1, validate=False)]))
+
+    def test_decode_columns(self):
+        self.check_decode_columns(Record, '>IH')
+        self.check_decode_columns(AlignedRecord, '=IH')
@@ -0,0 +1,31 @@
+import unittest
+from utils.leb128 import Leb128
+
+
+class TestLeb128(unittest.TestCase):
+    def test_uleb128(self):
+        self.assertEqual((2, 1), Leb128.read_uleb128('\x02', 0))
+        self.assertEqual((127, 2), Leb128.read_uleb128('\x00\x7f', 1))
+        self.assertEqual((128, 2), Leb128.read_uleb128('\x80\x01', 0))
+        self.assertEqual((624485, 3), Leb128.read_uleb128('\xe5\x8e\x26', 0))
+        self.assertEqual((0xffffffffffffffff, 10), Leb128.read_uleb128('\xff' * 9 + '\x01', 0))
+        self.assertRaises(ValueError, Leb128.read_uleb128, '\x80\x80', 0)
+        self.assertRaises(ValueError, Leb128.read_uleb128, '', 0)
+
+    def test_sleb128(self):
+        self.assertEqual((2, 1), Leb128.read_sleb128('\x02', 0))
+        self.assertEqual((-2, 1), Leb128.read_sleb128('\x7e', 0))
+        self.assertEqual((127, 2), Leb128.read_sleb128('\xff\x00', 0))
+        self.assertEqual((-128, 2), Leb128.read_sleb128('\x80\x7f', 0))
+        self.assertEqual((-123456, 3), Leb128.read_sleb128('\xc0\xbb\x78', 0))
+        self.assertRaises(ValueError, Leb128.read_sleb128, '\xff', 0)
+
+    def test_cstring(self):
+        self.assertEqual(('_main', 7), Leb128.read_cstring('\x40_main\x00\x90', 1))
+        self.assertRaises(ValueError, Leb128.read_cstring, '_main', 0)
+
+        bytes_ = buffer('\x40' + 'x' * 100 + '\x00\x90')
+        self.assertEqual(('x' * 100, 102), Leb128.read_cstring(bytes_, 1))
+        self.assertEqual(('', 102), Leb128.read_cstring(bytes_, 101))
+        self.assertRaises(ValueError, Leb128.read_cstring, buffer('x' * 100), 10)
+        self.assertEqual((624485, 3), Leb128.read_uleb128(buffer('\xe5\x8e\x26'), 0))
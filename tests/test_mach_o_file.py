@@ -0,0 +1,82 @@
+from utils.bytes import Bytes
+from utils.parse_context import ParseContext
+from mach_o.mach_o_file import MachOFile
+from mach_o.headers.mach_header import MachHeader, MachHeader64
+from mach_o.headers.load_command import LoadCommandHeader
+from mach_o.headers.segment_command import SegmentCommand, SegmentCommand64
+from mach_o.headers.section import Section, Section64
+from mach_o.headers.dylib_command import DylibCommand
+from mach_o.headers.lc_str import LcStr
+from mach_o.non_headers.cstring import Cstring
+from mach_o.non_headers.symbol_table_block import SymbolTable
+from fixtures import ParseTestCase, parse_mach_o
+
+
+class TestMachOFile(ParseTestCase):
+    FILES = ('./binaries/executable.x86_64', './binaries/executable.i386', './binaries/object.o.x86_64')
+
+    @staticmethod
+    def fields(headers):
+        return [hdr.get_fields_repr() for hdr in headers]
+
+    def find_fields(self, byte_range, cls):
+        return self.fields([br.data for br in byte_range.find(cls)])
+
+    def test_lazy(self):
+        mach_o_file = MachOFile.load(Bytes(self.FILES[0]))[0]
+        self.assertNotIn('load_commands', mach_o_file.__dict__)
+        load_commands = mach_o_file.load_commands
+        self.assertIs(load_commands, mach_o_file.load_commands)
+        self.assertNotIn('symbols', mach_o_file.__dict__)
+        self.assertNotIn('cstrings', mach_o_file.__dict__)
+
+    def test_properties(self):
+        for file_path in self.FILES:
+            bytes_ = Bytes(file_path)
+            byte_range = parse_mach_o(bytes_)
+            mach_o_files = MachOFile.load(bytes_)
+            self.assertEqual(1, len(mach_o_files))
+            mach_o_file = mach_o_files[0]
+
+            self.assertEqual(self.find_fields(byte_range, (MachHeader, MachHeader64)),
+                             self.fields([mach_o_file.header]))
+            self.assertEqual(self.find_fields(byte_range, LoadCommandHeader),
+                             self.fields(mach_o_file.load_commands))
+            self.assertEqual(self.find_fields(byte_range, (SegmentCommand, SegmentCommand64)),
+                             self.fields(mach_o_file.segments))
+            self.assertEqual(self.find_fields(byte_range, (Section, Section64)),
+                             self.fields(mach_o_file.sections))
+            self.assertEqual(self.find_fields(byte_range, DylibCommand),
+                             self.fields([x[0] for x in mach_o_file.dylibs]))
+            self.assertEqual([br.data.value for br in byte_range.find(LcStr) if br.data.desc == 'dylib_name'],
+                             [x[1].value for x in mach_o_file.dylibs])
+            self.assertEqual([br.data.string for br in byte_range.find(Cstring)],
+                             [x.string for x in mach_o_file.cstrings])
+            self.assertEqual([br.data.symbols for br in byte_range.find(SymbolTable)],
+                             [mach_o_file.symbols.symbols])
+
+    def test_not_mach_o(self):
+        self.assertRaises(ValueError, MachOFile.load, '\x00' * 4096)
+
+    def test_archs(self):
+        bytes_ = Bytes(self.FILES[1])
+        self.assertEqual(['i386'], [x.arch_name() for x in MachOFile.load(bytes_, archs=['i386', 'x86_64'])])
+        with self.assertRaises(ValueError) as context:
+            MachOFile.load(bytes_, archs=['x86_64'])
+        self.assertEqual('architecture x86_64 not found. (Available: i386)', str(context.exception))
+
+    def test_section_slots(self):
+        mach_o_file = MachOFile.load(Bytes(self.FILES[0]))[0]
+        slots = dict([(x.sectname.rstrip('\x00'), mach_o_file.section_slots(x)) for x in mach_o_file.sections])
+        self.assertEqual([(0x100000f64, 2, '_printf')], slots['__stubs'])
+        self.assertEqual([(0x100001000, 3, 'dyld_stub_binder'), (0x100001008, None, None)], slots['__nl_symbol_ptr'])
+        self.assertEqual([(0x100001010, 2, '_printf')], slots['__la_symbol_ptr'])
+        self.assertEqual([], slots['__text'])
+
+    def test_context(self):
+        names = list()
+        for x in xrange(2):
+            byte_range = parse_mach_o(Bytes(self.FILES[0]), ParseContext())
+            names.append([br.data.name for br in byte_range.find(Section64)])
+        self.assertEqual(['section_64[1]', 'section_64[2]'], names[0][0:2])
+        self.assertEqual(names[0], names[1])
@@ -0,0 +1,98 @@
+import cPickle
+import os
+import shutil
+import tempfile
+from utils.bytes import Bytes
+from mach_o.headers.uuid_command import UuidCommand
+from mach_o.parse_cache import ParseCache
+from fixtures import ParseTestCase, parse_mach_o
+
+
+class TestParseCache(ParseTestCase):
+    FILE = './binaries/executable.x86_64'
+
+    def setUp(self):
+        super(TestParseCache, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.bytes = Bytes(self.FILE)
+
+    def tearDown(self):
+        super(TestParseCache, self).tearDown()
+        shutil.rmtree(self.cache_dir)
+
+    def parse(self):
+        return parse_mach_o(self.bytes)
+
+    @staticmethod
+    def dump(byte_range):
+        return [(start, stop, level, str(br.data)) for (br, start, stop, level) in byte_range.walk() if level > 0]
+
+    def test_key(self):
+        key = ParseCache.get_key(self.FILE, self.bytes)
+        self.assertEqual(key, ParseCache.get_key(self.FILE, self.bytes))
+        self.assertNotEqual(key, ParseCache.get_key(self.FILE, self.bytes, validate=False))
+        self.assertNotEqual(key, ParseCache.get_key(self.FILE, self.bytes, archs=['x86_64']))
+        self.assertEqual('90f021b00e48351f8d1794d301caafe4', ParseCache._find_uuid(self.bytes, 0).encode('hex'))
+
+    def test_load_save(self):
+        cache = ParseCache(self.cache_dir)
+        key = ParseCache.get_key(self.FILE, self.bytes)
+        self.assertIsNone(cache.load(key))
+
+        byte_range = self.parse()
+        cache.save(key, byte_range)
+        cached = cache.load(key)
+        self.assertEqual(self.dump(byte_range), self.dump(cached))
+        self.assertEqual(1, len(cached.find(UuidCommand)))
+        self.assertEqual(byte_range.data.mach_header.ncmds, cached.data.mach_header.ncmds)
+
+    def test_evict(self):
+        cache = ParseCache(self.cache_dir)
+        byte_range = self.parse()
+        cache.save('a', byte_range)
+        size = os.path.getsize(os.path.join(self.cache_dir, 'a' + ParseCache.SUFFIX))
+
+        # Make 'a' the least recently used entry
+        os.utime(os.path.join(self.cache_dir, 'a' + ParseCache.SUFFIX), (0, 0))
+        cache.max_size = 2 * size
+        cache.save('b', byte_range)
+        cache.save('c', byte_range)
+        self.assertIsNone(cache.load('a'))
+        self.assertIsNotNone(cache.load('b'))
+        self.assertIsNotNone(cache.load('c'))
+
+    def test_evict_removed(self):
+        cache = ParseCache(self.cache_dir)
+        cache.save('a', self.parse())
+        cache.max_size = 0
+
+        # Another process removes an entry after it is listed
+        listdir = os.listdir
+        os.listdir = lambda path: listdir(path) + ['b' + ParseCache.SUFFIX]
+        try:
+            cache.evict()
+        finally:
+            os.listdir = listdir
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_version(self):
+        version = ParseCache.version()
+        self.assertEqual(40, len(version))
+        ParseCache._version = None
+        self.assertEqual(version, ParseCache.version())
+
+    def test_invalid_entries(self):
+        cache = ParseCache(self.cache_dir)
+        path = os.path.join(self.cache_dir, 'a' + ParseCache.SUFFIX)
+
+        # An entry of an older version is not unpickled. (It has a class that does not exist.)
+        with open(path, 'wb') as f:
+            f.write(cPickle.dumps('0' * 40, 2) + 'c__main__\nNoSuchClass\n.')
+        self.assertIsNone(cache.load('a'))
+        self.assertFalse(os.path.exists(path))
+
+        # A corrupt entry of the current version
+        with open(path, 'wb') as f:
+            f.write(cPickle.dumps(ParseCache.version(), 2) + 'cmach_o.mach_o\nNoSuchClass\n.')
+        self.assertIsNone(cache.load('a'))
+        self.assertFalse(os.path.exists(path))
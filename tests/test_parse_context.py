@@ -0,0 +1,71 @@
+import cPickle
+import threading
+import unittest
+from StringIO import StringIO
+from utils.header import IndexedHeader, Field
+from utils.parse_context import ParseContext
+from utils.progress_indicator import ProgressIndicator
+
+
+class Item(IndexedHeader):
+    ENDIAN = True
+    FIELDS = (
+        Field('value', 'I'),
+    )
+
+    def __init__(self, bytes_=None, **kwargs):
+        self.value = None
+        super(Item, self).__init__('item', bytes_, **kwargs)
+
+
+class OneBasedItem(Item):
+    FIRST_INDEX = 1
+
+
+class TestParseContext(unittest.TestCase):
+    def test_indices(self):
+        context1 = ParseContext()
+        context2 = ParseContext()
+        with context1:
+            self.assertEqual([0, 1], [Item().index for x in xrange(2)])
+            with context2:
+                self.assertEqual(0, Item().index)
+                self.assertEqual(1, OneBasedItem().index)
+            self.assertEqual(2, Item.reserve_indices(3))
+            self.assertEqual(5, Item().index)
+            self.assertIs(context1, ParseContext.current())
+            IndexedHeader.reset_indices()
+            self.assertEqual(0, Item().index)
+        self.assertEqual(1, context2.next_index(Item))
+        self.assertIs(ParseContext.DEFAULT, ParseContext.current())
+
+    def test_threads(self):
+        results = dict()
+
+        def parse(name):
+            with ParseContext():
+                results[name] = [Item().index for x in xrange(1000)]
+
+        threads = [threading.Thread(target=parse, args=(x,)) for x in xrange(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for x in xrange(4):
+            self.assertEqual(range(1000), results[x])
+
+    def test_progress(self):
+        stream = StringIO()
+        with ParseContext(verbose=True, stream=stream) as context:
+            ProgressIndicator.display('parsing %s\n', 'x')
+        ProgressIndicator.display('quiet\n', context=ParseContext(verbose=False, stream=stream))
+        self.assertEqual('parsing x\n', stream.getvalue())
+        self.assertEqual(['parsing x\n'], [event for (timestamp, event) in context.records])
+
+    def test_pickle(self):
+        context = ParseContext(verbose=False, color=True, stream=StringIO())
+        context.next_index(Item, 10)
+        context.record('event')
+        context = cPickle.loads(cPickle.dumps(context, 2))
+        self.assertEqual((False, True, None, []), (context.verbose, context.color, context.stream, context.records))
+        self.assertEqual(0, context.next_index(Item))
@@ -0,0 +1,29 @@
+import unittest
+import mach_o.non_headers.section_block as section_block
+from mach_o.non_headers.section_block import CstringSection
+
+
+class TestNullTerminatedStringSection(unittest.TestCase):
+    def check_strings(self):
+        section = CstringSection(buffer('abc\x00\x00hello\x00x'))
+        self.assertEqual('CstringSection: 3 strings', section.name)
+        self.assertEqual(3, section.num_strings())
+        self.assertEqual([(0, 'abc'), (4, ''), (5, 'hello')], list(section.items()))
+        self.assertEqual((5, 'hello'), section.item(2))
+        self.assertEqual('', section.string(1))
+        self.assertEqual(([0, 4, 5], [4, 1, 6]), tuple(list(x) for x in section.string_ranges()))
+        self.assertEqual([0, 2], section.filter('a') + section.filter('l'))
+        self.assertEqual(['hello'], section.search('ll'))
+
+        section = CstringSection('')
+        self.assertEqual(0, section.num_strings())
+        self.assertEqual([], list(section.items()))
+
+    def test_strings(self):
+        self.check_strings()
+        numpy = section_block.numpy
+        section_block.numpy = None
+        try:
+            self.check_strings()
+        finally:
+            section_block.numpy = numpy
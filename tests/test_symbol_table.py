@@ -0,0 +1,135 @@
+import struct
+import unittest
+from array import array
+from mach_o.headers.nlist import Nlist, Nlist64
+import utils.header
+import mach_o.non_headers.symbol_table_block as symbol_table_block
+from mach_o.non_headers.symbol_table_block import SymbolTable, SymbolStringTable, IndirectSymbolTable
+
+
+def make_symbol_table():
+    """
+    Return a SymbolTable of _main, an unnamed symbol and _printf.
+    """
+    sym_tab = SymbolTable(3, Nlist)
+    bytes_ = struct.pack('IBBhI', 1, 0x0f, 1, 0, 0x1000)
+    bytes_ += struct.pack('IBBhI', 0, 0x01, 0, 0, 0)
+    bytes_ += struct.pack('IBBhI', 7, 0x01, 0, 1, 0)
+    sym_tab.add_columns(*Nlist.decode_columns(bytes_, 0, 3))
+    sym_tab.correlate_string_table(SymbolStringTable(' _main\x00_printf\x00'))
+    return sym_tab
+
+
+class TestSymbolTable(unittest.TestCase):
+    def setUp(self):
+        self.sym_tab = make_symbol_table()
+
+    def test_columns(self):
+        self.assertEqual(3, self.sym_tab.num_symbols())
+        self.assertTrue(isinstance(self.sym_tab.n_value, array))
+        self.assertEqual([1, 0, 7], list(self.sym_tab.n_strx))
+        self.assertEqual(['_main', None, '_printf'], [self.sym_tab.symbol_name(x) for x in xrange(3)])
+
+    def test_symbols(self):
+        symbols = self.sym_tab.symbols
+        self.assertEqual(3, len(symbols))
+        self.assertEqual((0, 1, 0x0f, 1, 0, 0x1000, '_main'), symbols[0])
+        self.assertEqual((2, 7, 0x01, 0, 1, 0, '_printf'), symbols[-1])
+        self.assertEqual([None, '_printf'], [x[SymbolTable.SYM_NAME] for x in symbols[1:]])
+        self.assertRaises(IndexError, lambda: symbols[3])
+
+        nlist = self.sym_tab.nlist(0)
+        self.assertTrue(isinstance(nlist, Nlist))
+        self.assertEqual((1, 0x1000), (nlist.n_strx, nlist.n_value))
+
+    def test_add(self):
+        sym_tab = SymbolTable(1)
+        sym_tab.add(Nlist64.from_values((1, 0x0f, 1, 0, 0x100000f30)))
+        self.assertEqual([(0, 1, 0x0f, 1, 0, 0x100000f30, None)], list(sym_tab.symbols))
+
+    def check_filter(self):
+        self.assertEqual([0, 1, 2], self.sym_tab.filter())
+        self.assertEqual([0, 2], self.sym_tab.filter('_'))
+        self.assertEqual([2], self.sym_tab.filter('printf'))
+        self.assertEqual([0, 2], self.sym_tab.filter(''))
+        self.assertEqual([], self.sym_tab.filter('_main\x00'))
+
+        # Names that share a suffix and a name with the pattern more than once
+        sym_tab = SymbolTable(5, Nlist)
+        for n_strx in (2, 1, 0, 8, 13):
+            sym_tab.add(Nlist.from_values((n_strx, 0x01, 0, 0, 0)))
+        sym_tab.correlate_string_table(SymbolStringTable(' _main\x00_a_b_c\x00'))
+        self.assertEqual([1, 3], sym_tab.filter('_'))
+        self.assertEqual([0, 1], sym_tab.filter('main'))
+        self.assertEqual([3], sym_tab.filter('c'))
+        self.assertEqual([], sym_tab.filter('x'))
+
+    def test_filter(self):
+        self.check_filter()
+        numpy = symbol_table_block.numpy
+        symbol_table_block.numpy = None
+        try:
+            self.check_filter()
+        finally:
+            symbol_table_block.numpy = numpy
+
+    @unittest.skipIf(utils.header.numpy is None, 'NumPy is not installed')
+    def test_numpy_columns(self):
+        bytes_ = struct.pack('<IBBHQ', 1, 0x0f, 1, 0, 0x100000f30) * 4
+        columns = Nlist64.decode_columns(bytes_, 0, 4)
+        self.assertTrue(isinstance(columns[4], utils.header.numpy.ndarray))
+        sym_tab = SymbolTable(4)
+        sym_tab.add_columns(*columns)
+        self.assertTrue(isinstance(sym_tab.n_value, array))
+        self.assertEqual([(1, 0x0f, 1, 0, 0x100000f30)] * 4,
+                         zip(sym_tab.n_strx, sym_tab.n_type, sym_tab.n_sect, sym_tab.n_desc, sym_tab.n_value))
+
+
+class TestSymbolStringTable(unittest.TestCase):
+    def test_string(self):
+        sym_str_tab = SymbolStringTable(buffer(' _main\x00_printf\x00x'))
+        self.assertEqual('_main', sym_str_tab.string(1))
+        self.assertEqual('main', sym_str_tab.string(2))  # names can share a suffix
+        self.assertEqual('_printf', sym_str_tab.string(7))
+        self.assertEqual('', sym_str_tab.string(6))
+        self.assertEqual('x', sym_str_tab.string(15))  # not terminated
+        self.assertEqual('', sym_str_tab.string(16))
+
+
+class FakeSection(object):
+    def __init__(self, addr, size, flags, reserved1, reserved2=0):
+        self.sectname = '__fake\x00\x00'
+        self.addr = addr
+        self.size = size
+        self.flags = flags
+        self.reserved1 = reserved1
+        self.reserved2 = reserved2
+
+
+class TestIndirectSymbolTable(unittest.TestCase):
+    def setUp(self):
+        entries = (2, IndirectSymbolTable.INDIRECT_SYMBOL_LOCAL, 0,
+                   IndirectSymbolTable.INDIRECT_SYMBOL_LOCAL | IndirectSymbolTable.INDIRECT_SYMBOL_ABS)
+        self.table = IndirectSymbolTable(len(entries), buffer(struct.pack('4I', *entries)))
+
+    def test_entries(self):
+        self.assertEqual(4, self.table.num_entries())
+        self.assertEqual([2, None, 0, None], [self.table.symbol_index(x) for x in xrange(4)])
+        self.assertEqual([False, True, False, True], [self.table.is_local(x) for x in xrange(4)])
+        self.assertEqual([False, False, False, True], [self.table.is_abs(x) for x in xrange(4)])
+        self.assertEqual(0, self.table.flags(0))
+
+    def test_section_slots(self):
+        sym_tab = make_symbol_table()
+        stubs = FakeSection(0x1000, 12, 0x80000408, 0, 6)
+        self.assertEqual([(0x1000, 2, '_printf'), (0x1006, None, None)],
+                         self.table.section_slots(stubs, 8, sym_tab))
+        got = FakeSection(0x2000, 16, IndirectSymbolTable.S_NON_LAZY_SYMBOL_POINTERS, 2)
+        self.assertEqual([(0x2000, 0, '_main'), (0x2008, None, None)], self.table.section_slots(got, 8, sym_tab))
+        self.assertEqual([(0x2000, 2, None), (0x2004, None, None), (0x2008, 0, None), (0x200c, None, None)],
+                         self.table.section_slots(FakeSection(0x2000, 16, 0x7, 0), 4))
+        self.assertEqual([], self.table.section_slots(FakeSection(0x3000, 16, 0x80000400, 0), 8))
+
+        with self.assertRaises(ValueError) as context:
+            self.table.section_slots(FakeSection(0x2000, 24, IndirectSymbolTable.S_LAZY_SYMBOL_POINTERS, 2), 8)
+        self.assertIn('__fake', str(context.exception))
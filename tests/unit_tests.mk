@@ -4,7 +4,13 @@ UTILS_TESTS := \
 	test_range \
 	test_byte_range \
 	test_commafy \
-	test_mapping
+	test_mapping \
+	test_bytes \
+	test_byte_range_index \
+	test_byte_range_registry \
+	test_compact_byte_range \
+	test_parse_context \
+	test_leb128
 
 MACH_O_TESTS := \
 	test_fat_header \
@@ -12,7 +18,13 @@ MACH_O_TESTS := \
 	test_load_command \
 	test_segment_command \
 	test_symtab_command \
-	test_dysymtab_command 
+	test_dysymtab_command \
+	test_fat \
+	test_parse_cache \
+	test_mach_o_file \
+	test_symbol_table \
+	test_section_block \
+	test_dyld_info
 	
 
 ALL_TESTS := $(UTILS_TESTS) $(MACH_O_TESTS)
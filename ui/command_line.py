@@ -1,26 +1,31 @@
 from utils.header import Header
-from mach_o.headers.mach_header import MachHeader, MachHeader64
-from mach_o.headers.load_command import LoadCommandHeader
 from mach_o.non_headers.cstring import Cstring
 from mach_o.headers.dylib_command import DylibCommand
+from mach_o.non_headers.dyld_info import RebaseTable, BindTable, ExportTrie
+from utils.byte_range_index import ByteRangeIndex
 
 
 class Command(object):
-    def __init__(self, command, action, desc, flag=None):
+    def __init__(self, command, action, desc, flag=None, arg=None, lazy=False):
         self.command = command
         self.action = action
         self.desc = desc
         self.flag = flag
         if self.flag is None:
             self.flag = '-' + self.command[0]
+        self.arg = arg  # name of the argument if the command takes one
+        self.lazy = lazy  # True if the command only needs MachOFile and not the parsed byte range tree
 
     def match(self, line):
-        return self.command.startswith(line.strip())
+        tokens = line.split()
+        if len(tokens) == 0:
+            return True
+        return self.command.startswith(tokens[0])
 
     def _get_tokens(self, line):
         tokens = line.split()
         if len(tokens) > 0:
-            assert tokens[0].startswith(self.command)
+            assert self.command.startswith(tokens[0])
         return tokens
 
     def getattr(self):
@@ -37,24 +42,45 @@ class Command(object):
 
 class CommandLine(object):
     COMMANDS = (
+        Command('bind', 'print_binds', 'print all bind information of dyld info', '', lazy=True),
         Command('cstring', 'print_cstring', 'print all C strings', '-c'),
+        Command('exports', 'print_exports', 'print all exported symbols in the export trie', '', lazy=True),
+        Command('export-prefix', 'print_exports', 'print all exported symbols that start with a prefix', '',
+                'PREFIX', lazy=True),
         Command('fat-header', 'print_fat_header', 'print the fat header', '-f'),
-        Command('load-command', 'print_load_commands', 'print all load commands', '-l'),
-        Command('mach-header', 'print_mach_header', 'print all mach headers', '-m'),
+        Command('lazy-bind', 'print_lazy_binds', 'print all lazy bind information of dyld info', '', lazy=True),
+        Command('load-command', 'print_load_commands', 'print all load commands', '-l', lazy=True),
+        Command('mach-header', 'print_mach_header', 'print all mach headers', '-m', lazy=True),
         Command('raw', 'print_full', 'print the complete structure of the file', '-R'),
-        Command('shared-library', 'print_shared_libraries', 'print all shared libraries used', '-L'),
-        Command('shared-library-table', 'print_shared_libraries_table', 'print all shared libraries used', ''),
+        Command('rebase', 'print_rebases', 'print all rebase information of dyld info', '', lazy=True),
+        Command('shared-library', 'print_shared_libraries', 'print all shared libraries used', '-L', lazy=True),
+        Command('shared-library-table', 'print_shared_libraries_table', 'print all shared libraries used', '',
+                lazy=True),
+        Command('weak-bind', 'print_weak_binds', 'print all weak bind information of dyld info', '', lazy=True),
+        Command('what-is', 'print_what_is', 'print all byte ranges that contain a file offset', '', 'OFFSET'),
     )
 
-    def __init__(self, byte_range):
+    def __init__(self, byte_range, mach_o_files):
+        """
+        :param byte_range: The parsed byte range tree of the file. It can be None if only lazy commands are run.
+        :param mach_o_files: A list of MachOFile of all (selected) images in the file.
+        """
         self.byte_range = byte_range
+        self.mach_o_files = mach_o_files
+        self._index = None
 
     def run(self, line):
-        # find all commands that match
+        # find all commands that match. A complete command name (e.g. shared-library) is not ambiguous even
+        # if it is a prefix of others.
         matches = list()
         for cmd in self.COMMANDS:
             if cmd.match(line):
                 matches.append(cmd)
+        tokens = line.split()
+        if len(tokens) > 0:
+            exact_matches = [cmd for cmd in matches if cmd.command == tokens[0]]
+            if len(exact_matches) > 0:
+                matches = exact_matches
         num_matches = len(matches)
         if num_matches != 1:
             return matches
@@ -67,23 +93,65 @@ class CommandLine(object):
         for cmd in cls.COMMANDS:
             if cmd.flag is None:
                 continue
-            if len(cmd.flag) > 0:
+            if cmd.arg is not None:
+                flags = ('--' + cmd.command,)
+                if len(cmd.flag) > 0:
+                    flags = (cmd.flag,) + flags
+                parser.add_argument(*flags, metavar=cmd.arg, help=cmd.desc)
+            elif len(cmd.flag) > 0:
                 parser.add_argument(cmd.flag, '--' + cmd.command, action='store_true', help=cmd.desc)
             else:
                 parser.add_argument('--' + cmd.command, action='store_true', help=cmd.desc)
 
+    @classmethod
+    def needs_byte_range(cls, options):
+        """
+        Return True if any command given in the options needs the parsed byte range tree.
+        """
+        for cmd in cls.COMMANDS:
+            attr = getattr(options, cmd.getattr())
+            if (attr is True or (cmd.arg is not None and attr is not None)) and not cmd.lazy:
+                return True
+        return False
+
     def parse_options(self, options):
         for cmd in self.COMMANDS:
             attr = getattr(options, cmd.getattr())
             if attr is True:
                 cmd.run(cmd.command, self)
+            elif cmd.arg is not None and attr is not None:
+                cmd.run(cmd.command + ' ' + attr, self)
 
     def print_full(self):
-        def format_element(br, start, stop, level):
+        for (br, start, stop, level) in self.byte_range.walk():
             if level == 0:
-                return ''
-            return '%s%d-%d: %s' % (' ' * (level - 1), start, stop, str(br.data))
-        print '\n'.join(self.byte_range.iterate(format_element))
+                continue
+            print '%s%d-%d: %s' % (' ' * (level - 1), start, stop, str(br.data))
+
+    def find_data(self, cls):
+        """
+        Return the data of all byte ranges that are instances of cls in the order of the byte ranges.
+        """
+        return [br.data for br in self.byte_range.find(cls)]
+
+    def get_index(self):
+        if self._index is None:
+            self._index = ByteRangeIndex(self.byte_range)
+        return self._index
+
+    def print_what_is(self, offset):
+        try:
+            offset = int(offset, 0)
+        except ValueError:
+            print 'ERROR: invalid offset %s' % offset
+            return
+        path = self.get_index().path(offset)
+        if len(path) == 0:
+            print 'ERROR: offset %d is outside of the file' % offset
+            return
+        for (level, br) in enumerate(path[1:]):
+            (start, stop) = br.abs_range()
+            print '%s%d-%d: %s' % (' ' * level, start, stop, str(br.data))
 
     @staticmethod
     def format_header(hdr, trailing_lf=True):
@@ -94,64 +162,26 @@ class CommandLine(object):
             output += '\n'
         return output
 
-    @staticmethod
-    def _list_remove_all(str_list, pattern):
-        return filter(lambda x: x != pattern, str_list)
-
-    @staticmethod
-    def _list_remove_empty(str_list):
-        return CommandLine._list_remove_all(str_list, '')
-
-    @staticmethod
-    def _list_remove_none(list_):
-        return CommandLine._list_remove_all(list_, None)
-
     def print_mach_header(self):
-        def format_mach_header(br, start, stop, level):
-            assert start is not None and stop is not None and level is not None  # get rid of pycharm warning
-            if not isinstance(br.data, (MachHeader, MachHeader64)):
-                return ''
-            return self.format_header(br.data)
-        lines = self.byte_range.iterate(format_mach_header)
-        lines = self._list_remove_empty(lines)
-        print '\n'.join(lines)
+        for mach_o_file in self.mach_o_files:
+            print self.format_header(mach_o_file.header)
 
     def print_load_commands(self):
-        def format_load_command(br, start, stop, level):
-            assert start is not None and stop is not None and level is not None  # get rid of pycharm warning
-            if not isinstance(br.data, LoadCommandHeader):
-                return ''
-            return self.format_header(br.data)
-        lines = self.byte_range.iterate(format_load_command)
-        lines = self._list_remove_empty(lines)
-        print '\n'.join(lines)
-        print '\n%d load commands' % len(lines)
+        count = 0
+        for mach_o_file in self.mach_o_files:
+            for load_command in mach_o_file.load_commands:
+                print self.format_header(load_command)
+                count += 1
+        print '\n%d load commands' % count
 
     def print_cstring(self):
-        def format_cstring(br, start, stop, level):
-            assert start is not None and stop is not None and level is not None  # get rid of pycharm warning
-            if not isinstance(br.data, Cstring):
-                return ''
-            return br.data.string
-        lines = self.byte_range.iterate(format_cstring)
-        lines = self._list_remove_empty(lines)
-        n = 1
-        for line in lines:
-            print '%d: %s' % (n, line)
-            n += 1
+        for (n, cstring) in enumerate(self.find_data(Cstring), 1):
+            print '%d: %s' % (n, cstring.string)
 
     def _get_shared_libraries(self):
-        def filter_dylib_command(br, start, stop, level):
-            assert start is not None and stop is not None and level is not None  # get rid of pycharm warning
-            if not isinstance(br.data, DylibCommand):
-                return None
-            parent_br = br.parent
-            assert parent_br is not None
-            assert len(parent_br.subranges) in (2, 3)  # 3rd subrange is for optional alignment padding
-            return br.data, parent_br.subranges[1].data
-        subranges = self.byte_range.iterate(filter_dylib_command)
-        dylib_commands = self._list_remove_none(subranges)
-        return dylib_commands
+        for mach_o_file in self.mach_o_files:
+            for (dylib_command, lc_str) in mach_o_file.dylibs:
+                yield dylib_command, lc_str
 
     def print_shared_libraries(self):
         for (dylib_command, lc_str) in self._get_shared_libraries():
@@ -169,5 +199,98 @@ class CommandLine(object):
                 lc_str.value
             )
 
+    @staticmethod
+    def _segment_location(mach_o_file, segment, offset):
+        """
+        Return a 3-tuple of (segment name, section name, VM address) of an offset in a segment (by index).
+        """
+        segments = mach_o_file.segments
+        if segment >= len(segments):
+            return '?', '?', offset
+        address = segments[segment].vmaddr + offset
+        section = mach_o_file.section_at(address)
+        if section is None:
+            sect_name = '?'
+        else:
+            sect_name = section.sectname.rstrip('\x00')
+        return segments[segment].segname.rstrip('\x00'), sect_name, address
+
+    @staticmethod
+    def _library_name(mach_o_file, ordinal):
+        if ordinal <= 0:
+            return BindTable.SPECIAL_DYLIBS.get(ordinal, str(ordinal))
+        libraries = mach_o_file.libraries
+        if ordinal > len(libraries):
+            return 'ordinal %d' % ordinal
+        # Like dyldinfo, only show the leaf name without extension (e.g. libSystem for libSystem.B.dylib)
+        return libraries[ordinal - 1].rsplit('/', 1)[-1].split('.', 1)[0]
+
+    def print_rebases(self):
+        # Entries are printed as they are decoded. So, a binary with a lot of them does not build a table.
+        print 'rebase information:'
+        print 'segment section          address     type'
+        for mach_o_file in self.mach_o_files:
+            try:
+                for (segment, offset, type_) in mach_o_file.iter_rebases():
+                    (seg_name, sect_name, address) = self._segment_location(mach_o_file, segment, offset)
+                    print '%-7s %-16s 0x%08X  %s' % (seg_name, sect_name, address,
+                                                    RebaseTable.TYPES.get(type_, str(type_)))
+            except ValueError as e:
+                # e.g. an opcode of a newer format. Entries before it are already printed.
+                print 'ERROR: %s' % e
+
+    def _print_binds(self, kind):
+        print '%s information:' % kind.replace('_', ' ')
+        print 'segment section          address     type       addend dylib            symbol'
+        for mach_o_file in self.mach_o_files:
+            try:
+                for (segment, offset, type_, ordinal, symbol, addend, flags) in mach_o_file.iter_binds(kind):
+                    (seg_name, sect_name, address) = self._segment_location(mach_o_file, segment, offset)
+                    if flags & BindTable.BIND_SYMBOL_FLAGS_WEAK_IMPORT:
+                        symbol += ' (weak import)'
+                    print '%-7s %-16s 0x%08X  %-10s %6d %-16s %s' % (
+                        seg_name, sect_name, address, BindTable.TYPES.get(type_, str(type_)), addend,
+                        self._library_name(mach_o_file, ordinal), symbol)
+            except ValueError as e:
+                # e.g. BIND_OPCODE_THREADED of arm64e. Entries before it are already printed.
+                print 'ERROR: %s' % e
+
+    def print_binds(self):
+        self._print_binds('bind')
+
+    def print_weak_binds(self):
+        self._print_binds('weak_bind')
+
+    def print_lazy_binds(self):
+        self._print_binds('lazy_bind')
+
+    def _format_export(self, mach_o_file, export):
+        (name, flags, address, other, imported_name) = export
+        kind = flags & ExportTrie.EXPORT_SYMBOL_FLAGS_KIND_MASK
+        notes = list()
+        if flags & ExportTrie.EXPORT_SYMBOL_FLAGS_REEXPORT:
+            if imported_name is None:
+                imported_name = name
+            notes.append('[re-export] (%s from %s)' % (imported_name, self._library_name(mach_o_file, other)))
+            return '            %s %s' % (name, ' '.join(notes))
+        if kind != ExportTrie.EXPORT_SYMBOL_FLAGS_KIND_ABSOLUTE:
+            address += mach_o_file.image_base
+        if flags & ExportTrie.EXPORT_SYMBOL_FLAGS_WEAK_DEFINITION:
+            notes.append('[weak_def]')
+        if kind == ExportTrie.EXPORT_SYMBOL_FLAGS_KIND_THREAD_LOCAL:
+            notes.append('[per-thread]')
+        elif kind == ExportTrie.EXPORT_SYMBOL_FLAGS_KIND_ABSOLUTE:
+            notes.append('[absolute]')
+        if flags & ExportTrie.EXPORT_SYMBOL_FLAGS_STUB_AND_RESOLVER:
+            notes.append('[resolver=0x%08X]' % (other + mach_o_file.image_base))
+        return ' '.join(['0x%08X  %s' % (address, name)] + notes)
+
+    def print_exports(self, prefix=''):
+        # Only the subtree of the prefix is walked and exports are printed as they are found.
+        print 'export information (from trie):'
+        for mach_o_file in self.mach_o_files:
+            for export in mach_o_file.export_trie.exports(prefix):
+                print self._format_export(mach_o_file, export)
+
     def print_symbol_table(self):
         pass
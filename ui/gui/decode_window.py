@@ -4,6 +4,7 @@ import ttk
 import string
 
 from utils.header import Header
+from utils.byte_range_index import ByteRangeIndex
 from utils.progress_indicator import ProgressIndicator
 from tree_table import TreeTable
 from window_tab import WindowTab
@@ -37,11 +38,13 @@ class DecodeWindow(WindowTab):
 
         # A byte table at the bottom
         self.bytes_table = BytesView(self.outer_panedwindow)
+        self.bytes_table.click_callback = self.byte_clicked
         self.bytes_table.configure(width=300, height=100, padding=5)
         self.outer_panedwindow.add(self.bytes_table)
 
     def clear(self):
         self.byte_range = None
+        self.byte_range_index = None
         self.byte_range_tree.clear()
         self.header_table.clear()
         self.bytes_table.clear()
@@ -50,9 +53,10 @@ class DecodeWindow(WindowTab):
         self.clear()
         self.byte_range = byte_range
         if self.byte_range is not None:
+            self.byte_range_index = ByteRangeIndex(self.byte_range)
             self._add_subtree('', self.byte_range)
         if bytes_ is not None:
-            self.bytes_table.add_bytes(bytes_.bytes)
+            self.bytes_table.add_bytes(bytes_)
 
     def _add_subtree(self, parent_id, br):
         def get_values(sr):
@@ -103,6 +107,23 @@ class DecodeWindow(WindowTab):
         start = br.abs_start()
         self.bytes_table.mark_bytes(start + offset, start + offset + size)
 
+    def byte_clicked(self, offset):
+        if self.byte_range_index is None:
+            return
+        nodes = self.byte_range_index.path(offset)
+        if len(nodes) < 2:
+            return  # the root is not shown in the tree
+        # Convert the list of nodes to a tree item id. Populate each level of the tree on the way down
+        # because the tree view only adds rows when a node is opened.
+        item_id = ''
+        for (parent, child) in zip(nodes[:-1], nodes[1:]):
+            self._add_subtree(item_id, parent)
+            if len(item_id) > 0:
+                self.byte_range_tree.tree.item(item_id, open=True)
+            item_id += '.%d' % parent.subrange_index(child)
+        self.byte_range_tree.tree.selection_set(item_id)
+        self.byte_range_tree.tree.see(item_id)
+
     def block_opened(self, path):
         br = self.byte_range
         parent_id = ''
@@ -162,6 +183,8 @@ class BytesView(LightScrollableWidget):
             self.widget.tag_configure(self.MARK_TAG_NAME, background='#d0f0d8')
 
         self.index_base = 1
+        self.click_callback = None
+        self.widget.bind('<Button-1>', self._clicked)
         self.bytes = None
         self.base_offset = None
         self.end_offset = None
@@ -247,6 +270,21 @@ class BytesView(LightScrollableWidget):
         self.set_rows(self._offset_to_row_roundup(self.end_offset))
         self._show(0, self.widget_rows())
 
+    def _clicked(self, event):
+        if self.bytes is None or self._widget_start is None or not callable(self.click_callback):
+            return
+        (line, col) = [int(x) for x in self.widget.index('@%d,%d' % (event.x, event.y)).split('.')]
+        if 20 <= col < 20 + 3 * self.BYTES_PER_ROW:
+            byte = (col - 20) / 3  # hex columns
+        elif 71 <= col < 71 + self.BYTES_PER_ROW:
+            byte = col - 71  # character columns
+        else:
+            return
+        row = line - self.index_base + self._widget_start
+        offset = row * self.BYTES_PER_ROW + byte
+        if offset < self.end_offset:
+            self.click_callback(self.base_offset + offset)
+
     def show_row(self, data_row, view_row):
         line = self._format_row(data_row)
         self.widget.insert('%d.0' % view_row, line)
@@ -75,10 +75,10 @@ class Gui(object):
         IndexedHeader.reset_indices()
 
         # Determine if the first header is a fat header, mach header or neither
-        if MachHeader.is_valid_header(bytes_.bytes) or MachHeader64.is_valid_header(bytes_.bytes):
+        if MachHeader.is_valid_header(bytes_) or MachHeader64.is_valid_header(bytes_):
             mach_o = MachO(byte_range)
             byte_range.data = mach_o
-        elif FatHeader.is_valid_header(bytes_.bytes):
+        elif FatHeader.is_valid_header(bytes_):
             fat = Fat(byte_range)
             byte_range.data = fat
         else:
@@ -67,13 +67,13 @@ class StringWindow(WindowTab):
     def load(self, byte_range, bytes_):
         assert isinstance(byte_range, ByteRange)
         self.clear_states()
-        byte_range.iterate(self._parse)
+        for br in byte_range.find((MachHeader, MachHeader64, SegmentBlock, CstringSection, ObjCMethodNameSection)):
+            self._parse(br)
         self._current_segemnt = None
         self.byte_range = byte_range
         self.display()
 
-    def _parse(self, br, start, stop, level):
-        assert start is not None and stop is not None and level is not None
+    def _parse(self, br):
         if isinstance(br.data, (MachHeader, MachHeader64)):
             mach_o_hdr = br.data
             cpu_type = mach_o_hdr.FIELDS[1].display(mach_o_hdr)
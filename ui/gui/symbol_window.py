@@ -63,12 +63,12 @@ class SymbolWindow(WindowTab):
 
     def load(self, byte_range, bytes_):
         assert isinstance(byte_range, ByteRange)
-        byte_range.iterate(self._parse)
+        for br in byte_range.find((MachHeader, MachHeader64, SymbolTable, Section, Section64)):
+            self._parse(br)
         self.byte_range = byte_range
         self.display()
 
-    def _parse(self, br, start, stop, level):
-        assert start is not None and stop is not None and level is not None  # get rid of pycharm warnings
+    def _parse(self, br):
         if isinstance(br.data, (MachHeader, MachHeader64)):
             mach_o_hdr = br.data
             cpu_type = mach_o_hdr.FIELDS[1].display(mach_o_hdr)
@@ -1,5 +1,8 @@
+from parse_context import ParseContext
+
+
 class AnsiText(object):
-    ENABLE_COLOR = True
+    ENABLE_COLOR = True  # default for contexts that do not set color
 
     COLORS = {'black': 30,
               'red': 31,
@@ -34,10 +37,17 @@ class AnsiText(object):
                 raise TypeError('underline must be a bool')
             self.underline = value
 
+    @classmethod
+    def is_color_enabled(cls):
+        color = ParseContext.current().color
+        if color is None:
+            return cls.ENABLE_COLOR
+        return color
+
     def __repr__(self):
         esc = '\x1b['
         output = str(self.text)
-        if not self.ENABLE_COLOR:
+        if not self.is_color_enabled():
             return output
         ansi_codes = list()
         if self.bold:
@@ -1,3 +1,4 @@
+import bisect
 from range import Range
 from bytes import Bytes
 
@@ -9,8 +10,28 @@ class ByteRange(Range):
             assert offset == 0
         super(ByteRange, self).__init__(offset, length)
         self.subranges = list()
+        self._starts = list()  # start offsets of all subranges for bisecting
         self.parent = parent
+        self.registry = None if parent is None else parent.registry
         self.data = data
+        # The absolute start and the root are cached when a range is attached. Moving subranges under a
+        # new parent (insert_subrange()) does not change their absolute positions nor their root.
+        if parent is None:
+            self._abs_start = offset
+            self._root = self
+        else:
+            self._abs_start = parent._abs_start + offset
+            self._root = parent._root
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+        if data is not None and self.registry is not None:
+            self.registry.add(self)
 
     def __repr__(self):
         out = '<BytesRange:%d-%d' % (self.start, self.stop)
@@ -24,76 +45,173 @@ class ByteRange(Range):
                     separator = ','
         return out
 
+    def _fits(self, idx, subrange):
+        """
+        Return True if subrange can be inserted at index idx of subranges without overlapping its neighbors.
+        """
+        if idx > 0 and self.subranges[idx - 1].stop > subrange.start:
+            return False
+        if idx < len(self.subranges) and subrange.stop > self.subranges[idx].start:
+            return False
+        return True
+
     def add_subrange(self, offset, length, data=None):
         if offset < 0 or length < 0 or (offset + length > self.stop):
             raise ValueError()
-        new_subrange = ByteRange(offset, offset + length, data, self)
+        new_subrange = ByteRange(offset, offset + length, parent=self)
 
-        if len(self.subranges) == 0 or new_subrange > self.subranges[-1]:
-            # Add new subrange to the end
-            self.subranges.append(new_subrange)
-        elif new_subrange < self.subranges[0]:
-            self.subranges.insert(0, new_subrange)
-        else:
-            left_idx = 0
-            right_idx = len(self.subranges) - 1
-
-            while right_idx - left_idx > 1:
-                mid_idx = (left_idx + right_idx) / 2
-                mid = self.subranges[mid_idx].start
-                if mid < new_subrange.start:
-                    left_idx = mid_idx
-                elif mid > new_subrange.start:
-                    right_idx = mid_idx
-                else:
-                    raise ValueError('New range overlaps with an existing range.')
-            if (self.subranges[left_idx] < new_subrange) and (new_subrange < self.subranges[right_idx]):
-                self.subranges.insert(right_idx, new_subrange)
-            else:
+        # Subranges are sorted by their start offsets. (Zero-length subranges precede any other subrange
+        # that starts at the same offset.) So, only the 2 neighbors at the insertion point need to be checked.
+        idx = bisect.bisect_right(self._starts, offset)
+        if not self._fits(idx, new_subrange):
+            idx = bisect.bisect_left(self._starts, offset)
+            if not self._fits(idx, new_subrange):
                 raise ValueError('New range overlaps with an existing range.')
+        self.subranges.insert(idx, new_subrange)
+        self._starts.insert(idx, offset)
+        new_subrange.data = data  # only register the new subrange after it is successfully added
 
         return new_subrange
 
+    def add_subranges(self, subranges):
+        """
+        Add many subranges at once. subranges is a list of (offset, length, data) sorted by offset. They
+        are merged with the existing subranges in one pass instead of being inserted one by one. The
+        order of the result is the same as adding them with add_subrange(). Either all or none of them
+        are added.
+        """
+        if not isinstance(self.subranges, list):
+            raise ValueError('cannot add a subrange to a compact byte range')
+        new_subranges = list()
+        for (offset, length, data) in subranges:
+            if offset < 0 or length < 0 or (offset + length > self.stop):
+                raise ValueError()
+            new_subranges.append(ByteRange(offset, offset + length, parent=self))
+
+        merged = list()
+        old_subranges = self.subranges
+        idx = 0
+        for new_sr in new_subranges:
+            # Existing subranges that start before the new subrange and zero-length subranges that start at
+            # the same offset go in front of it.
+            while idx < len(old_subranges) and (old_subranges[idx].start < new_sr.start or
+                                                old_subranges[idx].start == new_sr.start == old_subranges[idx].stop):
+                merged.append(old_subranges[idx])
+                idx += 1
+            if len(merged) > 0 and merged[-1].stop > new_sr.start:
+                raise ValueError('New range overlaps with an existing range.')
+            if idx < len(old_subranges) and new_sr.stop > old_subranges[idx].start:
+                raise ValueError('New range overlaps with an existing range.')
+            merged.append(new_sr)
+        merged += old_subranges[idx:]
+
+        self.subranges = merged
+        self._starts = [sr.start for sr in merged]
+        # Only register the new subranges after they are successfully added
+        for (new_sr, (offset, length, data)) in zip(new_subranges, subranges):
+            new_sr.data = data
+        return new_subranges
+
     def insert_subrange(self, offset, length, data=None):
         """
         Unlike add_subrange() which appends a new subrange on top of current range, this method
         inserts a subrange between this byte range and existing subranges that are covered by
         this new subrange. It can be used for grouping for example.
         """
+        # Find all subranges covered by the new subrange. They are contiguous in subranges. Zero-length
+        # subranges at the start of the new subrange are not covered.
+        stop = offset + length
+        lo = bisect.bisect_left(self._starts, offset)
+        hi = bisect.bisect_left(self._starts, stop, lo)
+        while lo < hi and self.subranges[lo].stop <= offset:
+            lo += 1
+
         # Make sure that there is no subrange that spans the boundary (start and / or stop).
-        subsubranges = list()
-        tmp_range = Range(offset, offset + length)
-        for sr in self.subranges:
-            if sr < tmp_range:
-                continue
-            if sr > tmp_range:
-                break  # we have gone past anything that may overlap. no need to continue
-            if sr in tmp_range:
-                subsubranges.append(sr)
-            else:
-                raise ValueError('subrange %d-%d spans boundary' % (sr.start, sr.stop))
+        if lo > 0 and self.subranges[lo - 1].stop > offset:
+            sr = self.subranges[lo - 1]
+            raise ValueError('subrange %d-%d spans boundary' % (sr.start, sr.stop))
+        if hi > lo and self.subranges[hi - 1].stop > stop:
+            sr = self.subranges[hi - 1]
+            raise ValueError('subrange %d-%d spans boundary' % (sr.start, sr.stop))
 
         # Remove all subranges that belong to the new subrange
-        for ssr in subsubranges:
-            self.subranges.remove(ssr)
+        subsubranges = self.subranges[lo:hi]
+        del self.subranges[lo:hi]
+        del self._starts[lo:hi]
 
         # Add the new subrange
         new_sr = self.add_subrange(offset, length, data)
 
-        # Put all the removed subranges back
+        # Move all the removed subranges beneath the new subrange. Their absolute starts stay the same.
         for ssr in subsubranges:
-            new_ssr = new_sr.add_subrange(ssr.start - offset, len(ssr), data=ssr.data)
-            new_ssr.subranges = ssr.subranges
+            ssr.start -= offset
+            ssr.stop -= offset
+            ssr.parent = new_sr
+        new_sr.subranges = subsubranges
+        new_sr._starts = [ssr.start for ssr in subsubranges]
 
         return new_sr
 
+    def graft(self, byte_range):
+        """
+        Move all subranges of another byte range that covers the same absolute range beneath this byte
+        range. This byte range must not have any subrange. It is used to attach a subtree that is parsed
+        elsewhere (e.g. in another process). If the other byte range has its own registry, the registry
+        moves along.
+        """
+        if self.abs_range() != byte_range.abs_range():
+            raise ValueError('cannot graft a byte range of a different range')
+        if len(self.subranges) > 0 or not isinstance(byte_range.subranges, list):
+            raise ValueError('cannot graft into a byte range with subranges or from a compact byte range')
+        registry = byte_range.registry
+        owns_registry = registry is not None and registry.byte_range is byte_range
+        if owns_registry:
+            registry.attach(self)
+
+        self.subranges = byte_range.subranges
+        self._starts = byte_range._starts
+        byte_range.subranges = list()
+        byte_range._starts = list()
+        for sr in self.subranges:
+            sr.parent = self
+        # Absolute starts are unchanged. Only the root (and the registry if it is not moved) need updating.
+        stack = list(self.subranges)
+        while len(stack) > 0:
+            br = stack.pop()
+            br._root = self._root
+            if not owns_registry:
+                br.registry = self.registry
+                if br.registry is not None and br.data is not None:
+                    br.registry.add(br)
+            if isinstance(br.subranges, list):
+                stack.extend(br.subranges)
+            elif not owns_registry and self.registry is not None:
+                self.registry.add_store(br.subranges._store)
+
+    def subrange_index(self, subrange):
+        """
+        Return the index of a subrange in subranges.
+        """
+        idx = bisect.bisect_left(self._starts, subrange.start)
+        while idx < len(self.subranges):
+            if self.subranges[idx] is subrange:
+                return idx
+            idx += 1
+        raise ValueError('not a subrange')
+
     def abs_start(self):
-        start = self.start
+        return self._abs_start
+
+    def root(self):
+        return self._root
+
+    def depth(self):
+        depth = 0
         parent = self.parent
         while parent is not None:
-            start += parent.start
+            depth += 1
             parent = parent.parent
-        return start
+        return depth
 
     def abs_end(self):
         return self.abs_start() + len(self)
@@ -129,9 +247,7 @@ class ByteRange(Range):
         assert (start is None) or isinstance(start, int)
         assert (stop is None) or isinstance(stop, int)
 
-        br = self
-        while br.parent is not None:
-            br = br.parent
+        br = self._root
         if br.data is None:
             return None
         assert isinstance(br.data, Bytes)
@@ -143,37 +259,76 @@ class ByteRange(Range):
             return self.start
         return self.subranges[-1].stop
 
+    def walk(self, prune=None, leaves_only=False):
+        """
+        Generate (byte range, absolute start, absolute stop, level) for this range and all its descendants
+        in pre-order. Level is relative to this range. The walk is not recursive and only keeps one iterator
+        per level. So, it can stop early (e.g. break out of a for-loop) without visiting the rest of the tree.
+
+        :param prune: An optional callable. If it returns True for a range, its descendants are skipped.
+        :param leaves_only: If True, only generate ranges that have no subranges.
+        """
+        if len(self.subranges) == 0 or not leaves_only:
+            yield self, self._abs_start, self._abs_start + len(self), 0
+        if len(self.subranges) == 0 or (prune is not None and prune(self)):
+            return
+        stack = [iter(self.subranges)]
+        while len(stack) > 0:
+            br = next(stack[-1], None)
+            if br is None:
+                stack.pop()
+                continue
+            has_subranges = len(br.subranges) > 0
+            if not (has_subranges and leaves_only):
+                yield br, br._abs_start, br._abs_start + len(br), len(stack)
+            if has_subranges and (prune is None or not prune(br)):
+                stack.append(iter(br.subranges))
+
+    def leaves(self, prune=None):
+        """
+        Generate (byte range, absolute start, absolute stop, level) for all leaves in this range.
+        """
+        return self.walk(prune, leaves_only=True)
+
+    def find(self, cls):
+        """
+        Return all byte ranges in this range (including itself) whose data is an instance of cls in the
+        order of walk(). If this range has its own registry, the registry is used instead of walking.
+        """
+        if self.registry is not None and self.registry.byte_range is self:
+            return self.registry.find(cls)
+        return [br for (br, start, stop, level) in self.walk() if isinstance(br.data, cls)]
+
     def iterate_leaves(self, callback, start=0, level=0):
         assert callable(callback)
-        if len(self.subranges) == 0:
-            result = callback(self, start, start + len(self), level)
-            return [result]
-        results = list()
-        for sr in self.subranges:
-            results += sr.iterate_leaves(callback, start + sr.start, level + 1)
-        return results
+        offset = start - self._abs_start
+        return [callback(br, abs_start + offset, abs_stop + offset, level + depth)
+                for (br, abs_start, abs_stop, depth) in self.leaves()]
 
     def iterate(self, callback, start=0, level=0):
-        this_result = callback(self, start, start + len(self), level)
+        offset = start - self._abs_start
         results = list()
-        if this_result is not None:
-            results.append(this_result)
-        for sr in self.subranges:
-            results += sr.iterate(callback, start + sr.start, level + 1)
+        for (br, abs_start, abs_stop, depth) in self.walk():
+            result = callback(br, abs_start + offset, abs_stop + offset, level + depth)
+            if result is not None:
+                results.append(result)
         return results
 
     def scan_gap(self, callback):
+        """
+        Fill all gaps between subranges with new subranges. callback(start, stop) returns the data of a gap.
+        All gaps are added at once with add_subranges().
+        """
         assert callable(callback)
-        if len(self.subranges) > 0:
-            current = 0
-            for sr in self.subranges:
-                gap = sr.start - current
-                if gap > 0:
-                    # There is a gap in front
-                    data = callback(current, current + gap)
-                    self.add_subrange(current, gap, data=data)
-                current = sr.stop
-            gap = self.stop - (self.start + current)
-            if gap > 0:
-                data = callback(current, current + gap)
-                self.add_subrange(current, gap, data=data)
+        if len(self.subranges) == 0:
+            return
+        gaps = list()
+        current = 0
+        for sr in self.subranges:
+            if sr.start > current:
+                # There is a gap in front
+                gaps.append((current, sr.start - current, callback(current, sr.start)))
+            current = sr.stop
+        if len(self) > current:
+            gaps.append((current, len(self) - current, callback(current, len(self))))
+        self.add_subranges(gaps)
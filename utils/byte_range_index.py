@@ -0,0 +1,148 @@
+import bisect
+from array import array
+from byte_range import ByteRange
+from compact_byte_range import CompactSubranges
+
+
+class ByteRangeIndex(object):
+    """
+    ByteRangeIndex is a precomputed index for finding which nodes of a ByteRange tree cover a given
+    absolute offset.
+
+    The tree is flattened into a sorted list of disjoint segments. Each segment is attributed to the
+    deepest node that covers it. (A node is split into multiple segments by its subranges. Gaps between
+    subranges belong to the node itself.) A point query is then a binary search. The ancestors of a node
+    are found by following parent links.
+
+    The subtree of a compact store (CompactByteRangeStore or VirtualByteRangeStore) is one segment of
+    its owner. Nodes inside it are only resolved (by bisecting the columns of the store) when a query
+    hits the segment. So, building the index does not create a view or data of every node of a store.
+
+    The index is a snapshot. It must be rebuilt if the tree is modified afterward.
+    """
+    def __init__(self, byte_range):
+        assert isinstance(byte_range, ByteRange)
+        self.byte_range = byte_range
+        self._starts = array('L')
+        self._stops = array('L')
+        self._nodes = list()
+        self._is_store = array('B')  # 1 if the segment is the whole subtree of a compact store
+        self._build()
+
+    def _add_segment(self, start, stop, node, is_store=False):
+        if stop > start:
+            self._starts.append(start)
+            self._stops.append(stop)
+            self._nodes.append(node)
+            self._is_store.append(is_store)
+
+    def _build(self):
+        # Walk the tree without recursion. Each stack entry is [node, absolute start, next subrange index,
+        # absolute offset up to which segments have been emitted].
+        root = self.byte_range
+        stack = [[root, root.start, 0, root.start]]
+        while len(stack) > 0:
+            entry = stack[-1]
+            (node, abs_start, idx, current) = entry
+            if idx == 0 and isinstance(node.subranges, CompactSubranges):
+                self._add_segment(abs_start, abs_start + len(node), node, True)
+                stack.pop()
+                continue
+            if idx == len(node.subranges):
+                self._add_segment(current, abs_start + len(node), node)
+                stack.pop()
+                continue
+            sr = node.subranges[idx]
+            sr_start = abs_start + sr.start
+            self._add_segment(current, sr_start, node)
+            entry[2] = idx + 1
+            entry[3] = max(current, sr_start + len(sr))
+            stack.append([sr, sr_start, 0, sr_start])
+
+    @staticmethod
+    def _store_segments(owner, owner_start, start, stop):
+        """
+        Generate (absolute start, absolute stop, node) of the segments of the subtree of a compact store
+        (like _build()) that overlap [start, stop). Children outside of it are skipped by bisecting.
+        """
+        def first_child(node, abs_start):
+            return max(0, bisect.bisect_right(node._starts, start - abs_start) - 1)
+
+        stack = [[owner, owner_start, first_child(owner, owner_start), max(start, owner_start)]]
+        while len(stack) > 0:
+            entry = stack[-1]
+            (node, abs_start, idx, current) = entry
+            node_stop = min(stop, abs_start + len(node))
+            sr = None
+            if idx < len(node.subranges) and current < node_stop:
+                sr = node.subranges[idx]
+                sr_start = abs_start + sr.start
+                if sr_start >= node_stop:
+                    sr = None
+            if sr is None:
+                if node_stop > current:
+                    yield current, node_stop, node
+                stack.pop()
+                continue
+            entry[2] = idx + 1
+            sr_stop = sr_start + len(sr)
+            if sr_stop <= current:
+                continue  # before the range
+            if sr_start > current:
+                yield current, sr_start, node
+            entry[3] = sr_stop
+            stack.append([sr, sr_start, first_child(sr, sr_start), max(current, sr_start)])
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def _find(self, offset):
+        idx = bisect.bisect_right(self._starts, offset) - 1
+        if idx >= 0 and offset < self._stops[idx]:
+            return idx
+        return None
+
+    def find(self, offset):
+        """
+        Return the deepest node that covers the given absolute offset. Return None if the offset is outside
+        of the tree.
+        """
+        idx = self._find(offset)
+        if idx is None:
+            return None
+        if self._is_store[idx]:
+            for (start, stop, node) in self._store_segments(self._nodes[idx], self._starts[idx], offset, offset + 1):
+                return node
+        return self._nodes[idx]
+
+    def path(self, offset):
+        """
+        Return a list of nodes from the root to the deepest node that covers the given absolute offset.
+        """
+        node = self.find(offset)
+        path = list()
+        while node is not None:
+            path.append(node)
+            node = node.parent
+        path.reverse()
+        return path
+
+    def overlaps(self, start, stop):
+        """
+        Generate the deepest nodes that cover any byte in the absolute range [start, stop) in the order of
+        their first covered byte. Each node is generated once.
+        """
+        idx = max(0, bisect.bisect_right(self._starts, start) - 1)
+        seen = dict()  # id -> node. Nodes are kept so that the id of a view of a store is not reused.
+        while idx < len(self._nodes) and self._starts[idx] < stop:
+            if self._stops[idx] > start:
+                if self._is_store[idx]:
+                    nodes = [node for (seg_start, seg_stop, node) in
+                             self._store_segments(self._nodes[idx], self._starts[idx], start, stop)]
+                else:
+                    nodes = [self._nodes[idx]]
+                for node in nodes:
+                    if id(node) not in seen:
+                        seen[id(node)] = node
+                        yield node
+            idx += 1
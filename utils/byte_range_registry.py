@@ -0,0 +1,69 @@
+class ByteRangeRegistry(object):
+    """
+    ByteRangeRegistry keeps track of all byte ranges under a byte range by the type of their data. It
+    allows finding all byte ranges of a certain type (e.g. all dylib commands) without walking the
+    whole tree.
+
+    A registry is installed on a byte range at creation. All subranges that are added afterward inherit
+    the registry and they are registered whenever their data is set. A registry installed beneath another
+    registry (e.g. a Mach-O inside a fat binary) also registers byte ranges to the outer registry.
+    Compact byte ranges are found by scanning the data of their stores.
+    """
+    def __init__(self, byte_range):
+        self.byte_range = byte_range
+        self.parent = byte_range.registry
+        self._byte_ranges = dict()  # data type -> list of byte ranges
+        self._stores = list()  # all CompactByteRangeStore beneath
+        byte_range.registry = self
+
+    def attach(self, byte_range):
+        """
+        Move this registry to another byte range (e.g. when a subtree that is parsed in another process is
+        grafted) and register all its byte ranges to the registries above.
+        """
+        self.byte_range = byte_range
+        self.parent = byte_range.registry
+        byte_range.registry = self
+        registry = self.parent
+        while registry is not None:
+            for (data_type, byte_ranges) in self._byte_ranges.iteritems():
+                registry._byte_ranges.setdefault(data_type, list()).extend(byte_ranges)
+            registry._stores.extend(self._stores)
+            registry = registry.parent
+
+    def add(self, byte_range):
+        registry = self
+        while registry is not None:
+            registry._byte_ranges.setdefault(type(byte_range.data), list()).append(byte_range)
+            registry = registry.parent
+
+    def add_store(self, store):
+        registry = self
+        while registry is not None:
+            registry._stores.append(store)
+            registry = registry.parent
+
+    def find(self, cls):
+        """
+        Return all byte ranges whose data is an instance of cls (a class or a tuple of classes). They
+        are sorted by absolute start and then by depth. This is the same order as ByteRange.walk().
+        """
+        results = list()
+        seen = set()
+        for (data_type, byte_ranges) in self._byte_ranges.iteritems():
+            if not issubclass(data_type, cls):
+                continue
+            for br in byte_ranges:
+                # A byte range may be registered more than once if its data is replaced.
+                if id(br) in seen or not isinstance(br.data, cls):
+                    continue
+                seen.add(id(br))
+                results.append(br)
+        for store in self._stores:
+            if not any(issubclass(data_type, cls) for data_type in store.data_types):
+                continue
+            for (idx, data) in enumerate(store.data):
+                if isinstance(data, cls):
+                    results.append(store.node(idx))
+        results.sort(key=lambda x: (x.abs_start(), x.depth()))
+        return results
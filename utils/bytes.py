@@ -1,10 +1,138 @@
+import mmap
+from collections import OrderedDict
+
+
 class Bytes(object):
+    """
+    Bytes holds the content of a binary file. The entire file is read into memory and range() returns
+    a copy of the requested bytes.
+
+    All Bytes classes can also be sliced like a string (e.g. bytes_[0:32]) so that callers do not need
+    to know how the content is stored.
+    """
     def __init__(self, file_path):
+        self.file_path = file_path
         with open(file_path, 'rb') as f:
             self.bytes = f.read()
 
     def __len__(self):
         return len(self.bytes)
 
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError('step is not supported')
+            return self.range(start, stop)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('index out of range')
+        return self.range(key, key + 1)[0]
+
     def range(self, start, end):
         return self.bytes[start:end]
+
+    def open_args(self):
+        """
+        Return a 2-tuple of (class, arguments) that opens the same file in another process (e.g. a
+        worker of Fat). A file that is held as a whole is memory-mapped there so that all processes
+        share the same pages instead of each reading its own copy.
+        """
+        return MappedBytes, (self.file_path,)
+
+    def close(self):
+        pass
+
+
+class MappedBytes(Bytes):
+    """
+    MappedBytes memory-maps the file instead of reading it. range() returns a read-only buffer over
+    the mapping instead of a copy. So, no bytes are read until a page is touched and headers can be
+    unpacked directly from the mapping.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, 'rb') as f:
+            try:
+                self.bytes = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # mmap() refuses to map an empty file
+                self.bytes = ''
+
+    def range(self, start, end):
+        return buffer(self.bytes, start, max(0, end - start))
+
+    def close(self):
+        if isinstance(self.bytes, mmap.mmap):
+            self.bytes.close()
+
+
+class PagedBytes(Bytes):
+    """
+    PagedBytes reads the file in fixed-size pages on demand and keeps at most max_pages of them in
+    a LRU cache. Memory usage is bounded by the cache size instead of the file size. This is for
+    hosts where neither reading nor mapping the whole file is possible (e.g. 32-bit address space).
+
+    hits and misses count page lookups that are served from the cache and from the file respectively.
+    """
+    PAGE_SIZE = 64 * 1024
+    MAX_PAGES = 256
+
+    def __init__(self, file_path, page_size=None, max_pages=None):
+        if page_size is None:
+            page_size = self.PAGE_SIZE
+        if max_pages is None:
+            max_pages = self.MAX_PAGES
+        if page_size <= 0 or max_pages <= 0:
+            raise ValueError('page size and cache size must be positive')
+        self.file_path = file_path
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._file = open(file_path, 'rb')
+        self._file.seek(0, 2)
+        self._length = self._file.tell()
+
+    def __len__(self):
+        return self._length
+
+    def _page(self, page_num):
+        page = self._pages.pop(page_num, None)
+        if page is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._file.seek(page_num * self.page_size)
+            page = self._file.read(self.page_size)
+            if len(self._pages) >= self.max_pages:
+                self._pages.popitem(last=False)  # evict the least recently used page
+        self._pages[page_num] = page
+        return page
+
+    def range(self, start, end):
+        start = max(0, start)
+        end = min(end, self._length)
+        if end <= start:
+            return ''
+        first_page, first_offset = divmod(start, self.page_size)
+        last_page = (end - 1) / self.page_size
+        if first_page == last_page:
+            return self._page(first_page)[first_offset:first_offset + end - start]
+        chunks = [self._page(first_page)[first_offset:]]
+        for page_num in xrange(first_page + 1, last_page):
+            chunks.append(self._page(page_num))
+        chunks.append(self._page(last_page)[:end - last_page * self.page_size])
+        return ''.join(chunks)
+
+    def open_args(self):
+        return self.__class__, (self.file_path, self.page_size, self.max_pages)
+
+    def num_cached_pages(self):
+        return len(self._pages)
+
+    def close(self):
+        self._pages.clear()
+        self._file.close()
@@ -0,0 +1,16 @@
+class cached_property(object):
+    """
+    cached_property is a read-only property that is computed by its function on first access. The value is
+    then stored in the instance __dict__ which takes precedence over this (non-data) descriptor. So, the
+    function is called at most once per instance.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        value = self.func(obj)
+        obj.__dict__[self.func.__name__] = value
+        return value
@@ -0,0 +1,326 @@
+import weakref
+from array import array
+from byte_range import ByteRange
+
+
+class CompactByteRangeStore(object):
+    """
+    CompactByteRangeStore holds a (potentially huge) subtree of byte ranges beneath a regular ByteRange
+    (the owner) in flat columns instead of one ByteRange object per node:
+
+      starts - start offset of each node relative to its parent
+      lengths - length of each node
+      parents - index of the parent node (-1 if the parent is the owner)
+      first_children, num_children - span of children of each node. Children of a node are stored
+        contiguously.
+      data - data of each node
+
+    Nodes are exposed as CompactByteRange objects which are created on demand. So, the ByteRange API
+    (subranges, parent, data, abs_range(), bytes(), walk()...) works unchanged while only the nodes
+    that are in use have a python object. The subtree is read-only in the sense that no subrange can be
+    added to or inserted beneath a compact node. Use add_children() to build it.
+    """
+    OWNER = -1
+
+    def __init__(self, owner):
+        assert isinstance(owner, ByteRange)
+        self.owner = owner
+        self.starts = array('L')
+        self.lengths = array('L')
+        self.parents = array('l')
+        self.first_children = array('l')
+        self.num_children = array('L')
+        self.data = list()
+        self.data_types = set()  # types of all data. It allows registry lookups to skip a store.
+        self._views = weakref.WeakValueDictionary()
+        if owner.registry is not None:
+            owner.registry.add_store(self)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_views']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views = weakref.WeakValueDictionary()
+
+    def node(self, idx):
+        """
+        Return the CompactByteRange of a node. The same object is returned as long as it is referenced.
+        """
+        view = self._views.get(idx)
+        if view is None:
+            view = CompactByteRange(self, idx)
+            self._views[idx] = view
+        return view
+
+    def set_data(self, idx, data):
+        self.data[idx] = data
+        if data is not None:
+            self.data_types.add(type(data))
+
+    def add_children(self, parent, offsets, lengths, data=None):
+        """
+        Add all children of a node at once. Children must be sorted by offsets and must not overlap.
+
+        :param parent: Index of the parent node or OWNER.
+        :param offsets: Offsets of children relative to the parent.
+        :param lengths: Lengths of children.
+        :param data: An optional sequence of data of children.
+        :return: Index of the first child.
+        """
+        if parent == self.OWNER:
+            parent_len = len(self.owner)
+            has_children = len(self.owner.subranges) > 0
+        else:
+            parent_len = self.lengths[parent]
+            has_children = self.num_children[parent] > 0
+        if has_children:
+            raise ValueError('children of a compact byte range must be added at once')
+        if data is None:
+            data = [None] * len(offsets)
+        if not len(offsets) == len(lengths) == len(data):
+            raise ValueError('offsets, lengths and data must have the same length')
+
+        first = len(self.data)
+        current = 0
+        for (offset, length, data_) in zip(offsets, lengths, data):
+            if offset < current or length < 0 or offset + length > parent_len:
+                raise ValueError('New range overlaps with an existing range.')
+            current = offset + length
+            self.starts.append(offset)
+            self.lengths.append(length)
+            self.parents.append(parent)
+            self.first_children.append(-1)
+            self.num_children.append(0)
+            self.data.append(data_)
+            if data_ is not None:
+                self.data_types.add(type(data_))
+        count = len(self.data) - first
+
+        if parent == self.OWNER:
+            self.owner.subranges = CompactSubranges(self, first, count)
+            self.owner._starts = ColumnSlice(self.starts, first, count)
+        else:
+            self.first_children[parent] = first
+            self.num_children[parent] = count
+        return first
+
+
+class VirtualByteRangeStore(CompactByteRangeStore):
+    """
+    VirtualByteRangeStore is a CompactByteRangeStore of leaf children of its owner that are backed by
+    existing columns (e.g. offsets and sizes of strings in a section). The columns are used without a
+    copy and the data of a child is only created (by data_factory(idx)) when it is first accessed. So,
+    a child costs nothing until it is displayed or searched.
+
+    data_factory must be picklable (e.g. an instance of a class with __call__()) and data_type must be
+    the type of the data it creates so that a registry can skip the store without creating any data.
+    """
+    def __init__(self, owner, starts, lengths, data_factory, data_type):
+        count = len(starts)
+        if len(owner.subranges) > 0:
+            raise ValueError('children of a compact byte range must be added at once')
+        if len(lengths) != count:
+            raise ValueError('offsets, lengths and data must have the same length')
+        if count > 0 and starts[count - 1] + lengths[count - 1] > len(owner):
+            raise ValueError('New range overlaps with an existing range.')
+        super(VirtualByteRangeStore, self).__init__(owner)
+        self.starts = starts
+        self.lengths = lengths
+        self.parents = ConstantColumn(self.OWNER, count)
+        self.first_children = ConstantColumn(-1, count)
+        self.num_children = ConstantColumn(0, count)
+        self.data_factory = data_factory
+        self.data = LazyColumn(data_factory, count)
+        self.data_types.add(data_type)
+        owner.subranges = CompactSubranges(self, 0, count)
+        owner._starts = ColumnSlice(starts, 0, count)
+
+    def add_children(self, parent, offsets, lengths, data=None):
+        raise ValueError('cannot add a subrange to a compact byte range')
+
+
+class CompactByteRange(ByteRange):
+    """
+    CompactByteRange is a view of one node in a CompactByteRangeStore.
+    """
+    def __init__(self, store, idx):
+        # Do not call ByteRange.__init__(). All attributes are stored in the store.
+        self._store = store
+        self._idx = idx
+
+    @property
+    def start(self):
+        return self._store.starts[self._idx]
+
+    @property
+    def stop(self):
+        return self._store.starts[self._idx] + self._store.lengths[self._idx]
+
+    def __len__(self):
+        return self._store.lengths[self._idx]
+
+    @property
+    def parent(self):
+        parent = self._store.parents[self._idx]
+        if parent == CompactByteRangeStore.OWNER:
+            return self._store.owner
+        return self._store.node(parent)
+
+    _cached_data = None
+
+    @property
+    def data(self):
+        # The data of a virtual node is created on every access of the store. Keep it in the view so that
+        # whoever holds the view gets the same object. It goes away with the view.
+        data = self._cached_data
+        if data is None:
+            data = self._store.data[self._idx]
+            self._cached_data = data
+        return data
+
+    @data.setter
+    def data(self, data):
+        self._store.set_data(self._idx, data)
+        self._cached_data = data
+
+    @property
+    def subranges(self):
+        store = self._store
+        return CompactSubranges(store, store.first_children[self._idx], store.num_children[self._idx])
+
+    @property
+    def _starts(self):
+        store = self._store
+        return ColumnSlice(store.starts, store.first_children[self._idx], store.num_children[self._idx])
+
+    @property
+    def _abs_start(self):
+        return self.parent._abs_start + self.start
+
+    @property
+    def _root(self):
+        return self._store.owner._root
+
+    @property
+    def registry(self):
+        return self._store.owner.registry
+
+    def add_subrange(self, offset, length, data=None):
+        raise ValueError('cannot add a subrange to a compact byte range')
+
+    def add_subranges(self, subranges):
+        raise ValueError('cannot add a subrange to a compact byte range')
+
+    def insert_subrange(self, offset, length, data=None):
+        raise ValueError('cannot insert a subrange beneath a compact byte range')
+
+
+class CompactSubranges(object):
+    """
+    CompactSubranges is a read-only list of the children of a node in a CompactByteRangeStore.
+    """
+    def __init__(self, store, first, count):
+        self._store = store
+        self._first = first
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[x] for x in xrange(*idx.indices(self._count))]
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError('index out of range')
+        return self._store.node(self._first + idx)
+
+    def __iter__(self):
+        for idx in xrange(self._first, self._first + self._count):
+            yield self._store.node(idx)
+
+    def insert(self, idx, subrange):
+        raise ValueError('cannot add a subrange to a compact byte range')
+
+    def __delitem__(self, idx):
+        raise ValueError('cannot remove a subrange from a compact byte range')
+
+
+class ColumnSlice(object):
+    """
+    ColumnSlice is a read-only view of a slice of a column without copying it. It is used for bisecting.
+    """
+    def __init__(self, column, first, count):
+        self._column = column
+        self._first = first
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < self._count:
+            raise IndexError('index out of range')
+        return self._column[self._first + idx]
+
+    def __delitem__(self, idx):
+        raise ValueError('cannot remove a subrange from a compact byte range')
+
+
+class ConstantColumn(object):
+    """
+    ConstantColumn is a read-only column with the same value in every row.
+    """
+    def __init__(self, value, count):
+        self._value = value
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < self._count:
+            raise IndexError('index out of range')
+        return self._value
+
+
+class LazyColumn(object):
+    """
+    LazyColumn is a column whose values are created by factory(idx) whenever they are accessed. Created
+    values are not kept. So, walking or searching all of them does not keep them all in memory (nor in
+    a pickle). Only assigned values are stored.
+    """
+    def __init__(self, factory, count):
+        self._factory = factory
+        self._count = count
+        self._values = dict()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        value = self._values.get(idx)
+        if value is None:
+            if not 0 <= idx < self._count:
+                raise IndexError('index out of range')
+            value = self._factory(idx)
+        return value
+
+    def __setitem__(self, idx, value):
+        if not 0 <= idx < self._count:
+            raise IndexError('index out of range')
+        self._values[idx] = value
+
+    def assigned_values(self):
+        return self._values.values()
+
+    def __iter__(self):
+        for idx in xrange(self._count):
+            yield self[idx]
@@ -1,7 +1,14 @@
 import struct
 import datetime
+from array import array
 from mapping import Mapping
 from ansi_text import AnsiText
+from parse_context import ParseContext
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # optional. Without it, columns are decoded into arrays with struct.
 
 
 class HeaderError(Exception):
@@ -30,6 +37,27 @@ class HeaderSizeError(HeaderError):
         super(HeaderSizeError, self).__init__('%s: expect %d bytes. got %d' % (hdr_name, expected, got))
 
 
+class HeaderMeta(type):
+    """
+    Metaclass of all Header classes. It adds a slot for every field in FIELDS that is not already a slot
+    of a base class. Field values are then stored in slots instead of a per-instance __dict__, which
+    is only allocated if some other attribute is set.
+    """
+    def __new__(mcs, name, bases, namespace):
+        slots = list(namespace.get('__slots__', tuple()))
+        existing = set(slots)
+        for base in bases:
+            for klass in base.__mro__:
+                existing.update(klass.__dict__.get('__slots__', tuple()))
+        for field in namespace.get('FIELDS', tuple()):
+            if field.name in existing or field.name in namespace:
+                continue
+            slots.append(field.name)
+            existing.add(field.name)
+        namespace['__slots__'] = tuple(slots)
+        return super(HeaderMeta, mcs).__new__(mcs, name, bases, namespace)
+
+
 class Header(object):
     """
     Header class is the base class for parsing various Mach-O header structures. This class provides
@@ -48,13 +76,23 @@ class Header(object):
     that the default __repr__() implementation only display fields defined in FIELDS. So, if one
     creates additional member variables in the derived class, they will not be displayed unless
     one overrides __repr__() and displays them as well.
+
+    Decoding is done by a function generated from FIELDS when a class decodes its first header. It
+    assigns all fields at once and only calls validate() of fields that override it.
     """
+    __metaclass__ = HeaderMeta
+    __slots__ = ('name', '__dict__')
+
     ENDIAN = None  # None = native, True = big, False = little
     FIELDS = tuple()
     FIELD_NAMES = None
     FORMAT = None
     PARSER = None
     SIZE = None
+    ARRAY_PARSER = None
+    ARRAY_CHUNK_SIZE = 256
+    VALUES_SETTERS = None
+    DTYPE = None
 
     @classmethod
     def get_format(cls):
@@ -91,19 +129,197 @@ class Header(object):
         cls.FIELD_NAMES = set([x.name for x in cls.FIELDS])
         return cls.FIELD_NAMES
 
+    @classmethod
+    def get_array_parser(cls):
+        """
+        Return a 2-tuple of (parser, number of records) for unpacking a chunk of consecutive records with
+        a single struct call. If the records cannot be laid out back-to-back in a struct format (because of
+        native alignment), the chunk only contains 1 record.
+        """
+        array_parser = cls.__dict__.get('ARRAY_PARSER')  # not inherited as FIELDS may differ
+        if array_parser is not None:
+            return array_parser
+        fmt = cls.get_format()
+        prefix = ''
+        if fmt[:1] in ('<', '>'):
+            prefix = fmt[0]
+            fmt = fmt[1:]
+        num_records = cls.ARRAY_CHUNK_SIZE
+        if struct.calcsize(prefix + fmt * 2) != 2 * cls.get_size():
+            num_records = 1
+        cls.ARRAY_PARSER = (struct.Struct(prefix + fmt * num_records), num_records)
+        return cls.ARRAY_PARSER
+
+    @classmethod
+    def iterate_values(cls, bytes_, offset, count):
+        """
+        Generate a tuple of field values for each of count consecutive records starting at offset of bytes_.
+        Records are unpacked in chunks directly from bytes_ (which can be a buffer). No per-record slicing
+        or validation is done.
+        """
+        size = cls.get_size()
+        if offset < 0 or count < 0 or offset + count * size > len(bytes_):
+            raise HeaderSizeError(cls.__name__, offset + count * size, len(bytes_))
+        parser, num_records = cls.get_array_parser()
+        num_fields = len(cls.FIELDS)
+        chunk_size = num_records * size
+        while count >= num_records:
+            values = parser.unpack_from(bytes_, offset)
+            for start in xrange(0, len(values), num_fields):
+                yield values[start:start + num_fields]
+            offset += chunk_size
+            count -= num_records
+        parser = cls.get_parser()
+        while count > 0:
+            yield parser.unpack_from(bytes_, offset)
+            offset += size
+            count -= 1
+
+    @classmethod
+    def decode_array(cls, bytes_, offset, count, validate=True):
+        """
+        Decode an array of count headers starting at offset of bytes_ and return them as a list. This is
+        much faster than slicing bytes_ and constructing each header individually. The derived class must
+        be constructible without any argument.
+        """
+        setter = cls.get_values_setter(validate)
+        headers = list()
+        for values in cls.iterate_values(bytes_, offset, count):
+            hdr = cls()
+            setter(hdr, values)
+            headers.append(hdr)
+        return headers
+
+    @classmethod
+    def decode_columns(cls, bytes_, offset, count, validate=True):
+        """
+        Decode an array of count headers starting at offset of bytes_ into columns without creating any
+        header. Return a tuple with one column per field in FIELDS. If NumPy is installed, a column is a
+        NumPy array over bytes_ (no copy). Otherwise, it is an array (or a list for fields that an array
+        cannot hold). Use from_values() to create a header of a record on demand.
+
+        If validate is True, each distinct combination of values of the fields that override validate()
+        is validated once. So, validate() of a field may only depend on fields that also override it.
+        """
+        size = cls.get_size()
+        if offset < 0 or count < 0 or offset + count * size > len(bytes_):
+            raise HeaderSizeError(cls.__name__, offset + count * size, len(bytes_))
+        if numpy is not None:
+            array_ = numpy.frombuffer(bytes_, cls.get_dtype(), count, offset)
+            columns = tuple([array_[field.name] for field in cls.FIELDS])
+        else:
+            columns = tuple([cls.new_column(field.format) for field in cls.FIELDS])
+            num_fields = len(cls.FIELDS)
+            parser, num_records = cls.get_array_parser()
+            chunk_size = num_records * size
+            while count > 0:
+                if count < num_records:
+                    parser, num_records = (cls.get_parser(), 1)
+                    chunk_size = size
+                values = parser.unpack_from(bytes_, offset)
+                for (idx, column) in enumerate(columns):
+                    column.extend(values[idx::num_fields])
+                offset += chunk_size
+                count -= num_records
+        if validate:
+            cls._validate_columns(columns)
+        return columns
+
+    @classmethod
+    def get_dtype(cls):
+        """
+        Return a NumPy structured dtype with the same layout as the struct format.
+        """
+        dtype = cls.__dict__.get('DTYPE')  # not inherited as FIELDS may differ
+        if dtype is not None:
+            return dtype
+        fmt = cls.get_format()
+        prefix = ''
+        if fmt[:1] in ('<', '>'):
+            prefix = fmt[0]
+        formats = list()
+        offsets = list()
+        field_fmts = ''
+        for field in cls.FIELDS:
+            field_fmts += field.format
+            # The offset of a field (including any alignment padding before it)
+            offsets.append(struct.calcsize(prefix + field_fmts) - struct.calcsize(prefix + field.format))
+            code = field.format[-1]
+            if code == 's':
+                formats.append('S' + field.format[:-1])
+            else:
+                formats.append({'<': '<', '>': '>'}.get(prefix, '=') + field.format)
+        cls.DTYPE = numpy.dtype({'names': [field.name for field in cls.FIELDS], 'formats': formats,
+                                 'offsets': offsets, 'itemsize': cls.get_size()})
+        return cls.DTYPE
+
+    @staticmethod
+    def extend_column(column, values):
+        """
+        Append a column of values (e.g. from decode_columns()) to a column from new_column(). A NumPy column
+        is converted to the type of the array in bulk instead of one value at a time.
+        """
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            if isinstance(column, array):
+                column.fromstring(numpy.asarray(values, dtype=column.typecode).tobytes())
+            else:
+                column.extend(values.tolist())
+        else:
+            column.extend(values)
+
+    @staticmethod
+    def new_column(format_):
+        """
+        Return an empty column for values of a struct format. It is an array if possible, otherwise a list.
+        """
+        code = format_[-1]
+        if len(format_) > 1 or code not in 'bBhHiIlLqQ':
+            return list()
+        if code in 'qQ':
+            # array has no 64-bit type code in Python 2. Use long if it is 64-bit.
+            code = {'q': 'l', 'Q': 'L'}[code]
+            if array(code).itemsize < 8:
+                return list()
+        return array(code)
+
+    @classmethod
+    def _validate_columns(cls, columns):
+        checked = [(idx, field) for (idx, field) in enumerate(cls.FIELDS)
+                   if field.__class__.validate.__func__ is not Field.validate.__func__]
+        if len(checked) == 0:
+            return
+        hdr = cls.__new__(cls)  # only a holder of values for validate(). No __init__() (and no index).
+        hdr.name = cls.__name__
+        for values in set(zip(*[columns[idx] for (idx, field) in checked])):
+            for ((idx, field), value) in zip(checked, values):
+                setattr(hdr, field.name, value)
+            for (idx, field) in checked:
+                if not field.validate(hdr):
+                    raise HeaderInvalidValueError(hdr.name, field.name, getattr(hdr, field.name))
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Create a header from a tuple of (already validated) field values, e.g. a row of decode_columns().
+        The derived class must be constructible without any argument.
+        """
+        hdr = cls()
+        cls.get_values_setter(False)(hdr, values)
+        return hdr
+
     def __init__(self, name, bytes_=None, **kwargs):
+        """
+        If validate=False is given as a keyword argument, field values decoded from bytes_ are not
+        validated. This is only safe for input that is known to be well-formed.
+        """
         self.name = name
+        validate = kwargs.pop('validate', True)
         if bytes_ is not None:
             bytes_len = len(bytes_)
             if bytes_len != self.get_size():
                 raise HeaderSizeError(self.name, self.get_size(), bytes_len)
-            attrs = self.get_parser().unpack(bytes_)
-            assert len(attrs) == len(self.FIELDS)
-            for idx in xrange(len(attrs)):
-                field = self.FIELDS[idx]
-                setattr(self, field.name, attrs[idx])
-                if not field.validate(self):
-                    raise HeaderInvalidValueError(self.name, field.name, attrs[idx])
+            # unpack_from() accepts any buffer (e.g. a slice of a memory-mapped file) without copying it
+            self.set_values(self.get_parser().unpack_from(bytes_), validate)
         else:
             field_names = self.get_field_names()
             for (field_name, field_value) in kwargs.items():
@@ -111,6 +327,47 @@ class Header(object):
                     raise HeaderUnknownFieldError(self.name, field_name)
                 setattr(self, field_name, field_value)
 
+    @classmethod
+    def get_values_setter(cls, validate=True):
+        """
+        Return a function that sets (and optionally validates) all fields of a header from a tuple of
+        values. The function is generated from FIELDS and compiled on first use. For a header with fields
+        a and b where only b overrides validate(), the generated code is:
+
+        def set_values(self, values):
+            (self.a, self.b,) = values
+            if not validate_1(self):
+                raise HeaderInvalidValueError(self.name, 'b', self.b)
+        """
+        setters = cls.__dict__.get('VALUES_SETTERS')  # not inherited as FIELDS may differ
+        if setters is None:
+            setters = dict()
+            cls.VALUES_SETTERS = setters
+        setter = setters.get(validate)
+        if setter is not None:
+            return setter
+        namespace = {'HeaderInvalidValueError': HeaderInvalidValueError}
+        lines = ['def set_values(self, values):']
+        if len(cls.FIELDS) == 0:
+            lines.append('    assert len(values) == 0')
+        else:
+            lines.append('    (%s) = values' % ''.join(['self.%s, ' % field.name for field in cls.FIELDS]))
+        for (idx, field) in enumerate(cls.FIELDS):
+            if not validate or field.__class__.validate.__func__ is Field.validate.__func__:
+                continue  # nothing to validate
+            namespace['validate_%d' % idx] = field.validate
+            lines.append('    if not validate_%d(self):' % idx)
+            lines.append('        raise HeaderInvalidValueError(self.name, %r, self.%s)' % (field.name, field.name))
+        exec '\n'.join(lines) in namespace
+        setters[validate] = namespace['set_values']
+        return namespace['set_values']
+
+    def set_values(self, values, validate=True):
+        """
+        Set (and validate) all fields from a tuple of unpacked values in the order of FIELDS.
+        """
+        self.get_values_setter(validate)(self, values)
+
     def get_fields_repr(self, sep='='):
         return [field.name + sep + field.display(self) for field in self.FIELDS]
 
@@ -146,26 +403,40 @@ class IndexedHeader(Header):
     IndexedHeader is a Header with an object instance count. This is handy when objects are
     cross referencing each other. For example, an indirect symbol entry is just an index of
     the nlist entries defined in symtab_command.
+
+    Indices are counted by the current ParseContext. So, they are per binary (or per context) and
+    FIRST_INDEX is the index of the first object of a class in every context.
     """
-    NEXT_INDEX = 0
-    DERIVED_CLASSES = set()
+    __slots__ = ('index',)
+
+    FIRST_INDEX = 0
 
     @classmethod
     def _next_index(cls):
-        if cls not in IndexedHeader.DERIVED_CLASSES:
-            IndexedHeader.DERIVED_CLASSES.add(cls)
-        val = cls.NEXT_INDEX
-        cls.NEXT_INDEX += 1
-        return val
+        return ParseContext.current().next_index(cls)
+
+    @classmethod
+    def reserve_indices(cls, count):
+        """
+        Reserve count consecutive indices for headers that are created later (with index=...). Return the
+        first one.
+        """
+        return ParseContext.current().next_index(cls, count)
 
     @classmethod
     def reset_index(cls):
-        cls.NEXT_INDEX = 0
+        ParseContext.current().reset_index(cls)
 
     @staticmethod
     def reset_indices():
-        for cls in IndexedHeader.DERIVED_CLASSES:
-            cls.reset_index()
+        ParseContext.current().reset_indices()
+
+    def shift_index(self, delta):
+        """
+        Add delta to the index. It is used to merge headers that are indexed in another ParseContext.
+        """
+        self.index += delta
+        self.name = '%s[%d]' % (self.name[:self.name.rindex('[')], self.index)
 
     def __init__(self, name, bytes_=None, **kwargs):
         if 'index' not in kwargs:
@@ -177,6 +448,8 @@ class IndexedHeader(Header):
 
 
 class ColorHeader(Header):
+    __slots__ = ('color', 'bold')
+
     def __init__(self, name, color=None, bold=False, bytes_=None, **kwargs):
         super(ColorHeader, self).__init__(name, bytes_, **kwargs)
         self.color = color
@@ -187,6 +460,8 @@ class ColorHeader(Header):
 
 
 class ColorIndexedHeader(IndexedHeader):
+    __slots__ = ('color', 'bold')
+
     def __init__(self, name, color=None, bold=False, bytes_=None, **kwargs):
         super(ColorIndexedHeader, self).__init__(name, bytes_, **kwargs)
         self.color = color
@@ -258,7 +533,7 @@ class HexField(Field):
     def display(self, header):
         value = self._get_value(header)
         assert isinstance(value, (int, long))
-        return hex(value)
+        return hex(value).rstrip('L')  # values from an array are long
 
 
 class MagicField(HexField):
@@ -314,33 +589,32 @@ class BitFields(HexField):
     A value that contains multiple bitfields. Each field can only contain 1 bit and each bit must be unique
     """
     BITFIELDS = None
-    BITS_MASK = None
 
     def __init__(self, name, format_, bitfields=None):
         super(BitFields, self).__init__(name, format_)
-        if bitfields is not None:
-            self.__class__.BITFIELDS = bitfields
-        if self.BITS_MASK is None:
-            sum_ = 0
-            mask = 0
-            for (desc, bitfield) in self.BITFIELDS.items():
-                if (mask & bitfield) != 0:
-                    raise HeaderBitFieldError('duplicate bitfield %s (0x%x)' % (desc, bitfield))
-                sum_ += bitfield
-                mask |= bitfield
-                if sum_ != mask:
-                    raise HeaderBitFieldError('invalid bitfield %s (0x%x)' % (desc, bitfield))
-            self.BITS_MASK = mask
+        if bitfields is None:
+            bitfields = self.BITFIELDS
+        self.bitfields = bitfields
+        sum_ = 0
+        mask = 0
+        for (desc, bitfield) in self.bitfields.items():
+            if (mask & bitfield) != 0:
+                raise HeaderBitFieldError('duplicate bitfield %s (0x%x)' % (desc, bitfield))
+            sum_ += bitfield
+            mask |= bitfield
+            if sum_ != mask:
+                raise HeaderBitFieldError('invalid bitfield %s (0x%x)' % (desc, bitfield))
+        self.bits_mask = mask
 
     def validate(self, header):
         value = self._get_value(header)
-        return (value & ~self.BITS_MASK) == 0
+        return (value & ~self.bits_mask) == 0
 
     def display(self, header):
         if self.mnemonic:
             value = self._get_value(header)
             bits = list()
-            for (desc, bitfield) in self.BITFIELDS.items():
+            for (desc, bitfield) in self.bitfields.items():
                 if (value & bitfield) != 0:
                     bits.append(desc)
             return ','.join(bits)
@@ -352,9 +626,11 @@ class EnumField(Field):
     ENUMS_MAPPING = None
 
     def __init__(self, name, format_, enums=None):
-        if enums is not None:
-            self.__class__.ENUMS = enums
-        self._init_mapping()
+        if enums is None:
+            self._init_mapping()
+            self.enums_mapping = self.ENUMS_MAPPING
+        else:
+            self.enums_mapping = Mapping(enums)
         super(EnumField, self).__init__(name, format_)
 
     @classmethod
@@ -365,12 +641,12 @@ class EnumField(Field):
 
     def validate(self, header):
         value = self._get_value(header)
-        return self.ENUMS_MAPPING.has_value(value)
+        return self.enums_mapping.has_value(value)
 
     def display(self, header):
         if self.mnemonic:
             value = self._get_value(header)
-            desc = self.ENUMS_MAPPING.key(value)
+            desc = self.enums_mapping.key(value)
             return desc
         return super(EnumField, self).display(header)
 
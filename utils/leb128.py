@@ -0,0 +1,70 @@
+class Leb128(object):
+    """
+    Readers of the variable-length values of dyld opcode streams and tries in a string: LEB128
+    (little-endian base 128) integers and NUL-terminated strings. Each reader takes the offset of the
+    first byte and returns a 2-tuple of (value, offset of the next byte). A value that runs past the
+    end of the bytes raises ValueError.
+
+    The bytes can be a string or a buffer (e.g. of a memory-mapped file). A buffer is read in place.
+    """
+    CSTRING_CHUNK_SIZE = 64
+    @staticmethod
+    def read_uleb128(bytes_, offset):
+        try:
+            byte = ord(bytes_[offset])
+            if byte < 0x80:
+                return byte, offset + 1  # most values fit in one byte
+            value = byte & 0x7f
+            shift = 7
+            offset += 1
+            while True:
+                byte = ord(bytes_[offset])
+                offset += 1
+                value |= (byte & 0x7f) << shift
+                if byte < 0x80:
+                    return value, offset
+                shift += 7
+        except IndexError:
+            raise ValueError('truncated ULEB128 at offset %d' % offset)
+
+    @staticmethod
+    def read_sleb128(bytes_, offset):
+        value = 0
+        shift = 0
+        try:
+            while True:
+                byte = ord(bytes_[offset])
+                offset += 1
+                value |= (byte & 0x7f) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+        except IndexError:
+            raise ValueError('truncated SLEB128 at offset %d' % offset)
+        if byte & 0x40:
+            value -= 1 << shift
+        return value, offset
+
+    @classmethod
+    def read_cstring(cls, bytes_, offset):
+        """
+        Return a 2-tuple of (NUL-terminated string at offset, offset after the NUL).
+        """
+        if isinstance(bytes_, str):
+            end = bytes_.find('\x00', offset)
+        else:
+            # A buffer cannot be searched. Only search slices of it so that only the string is copied.
+            end = offset
+            while True:
+                chunk = bytes_[end:end + cls.CSTRING_CHUNK_SIZE]
+                if len(chunk) == 0:
+                    end = -1
+                    break
+                idx = chunk.find('\x00')
+                if idx >= 0:
+                    end += idx
+                    break
+                end += len(chunk)
+        if end < 0:
+            raise ValueError('unterminated string at offset %d' % offset)
+        return bytes_[offset:end], end + 1
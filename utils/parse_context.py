@@ -0,0 +1,87 @@
+import datetime
+import sys
+import threading
+
+
+class ParseContext(object):
+    """
+    ParseContext holds the state of one parsing session that used to be global to the process:
+
+      1. Index counters of IndexedHeader classes (e.g. the N in section_64[N]).
+      2. Progress output. If verbose is None, ProgressIndicator.ENABLED decides. Progress messages are
+         written to stream and recorded in records.
+      3. Options. If color is None, AnsiText.ENABLE_COLOR decides.
+
+    A context becomes the current context of the calling thread inside a with statement. MachO, Fat and
+    MachOFile make their context current while they create headers. So, headers get their indices from
+    the context of the binary being parsed and different binaries can be parsed concurrently in different
+    threads. When no context is current, the default context of the process is used.
+    """
+    _local = threading.local()
+    DEFAULT = None
+
+    def __init__(self, verbose=None, color=None, stream=None):
+        self.verbose = verbose
+        self.color = color
+        self.stream = stream
+        self.records = list()
+        self._next_indices = dict()
+
+    @classmethod
+    def current(cls):
+        stack = getattr(cls._local, 'stack', None)
+        if not stack:
+            return cls.DEFAULT
+        return stack[-1]
+
+    def __enter__(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = list()
+        self._local.stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        popped = self._local.stack.pop()
+        assert popped is self
+        return False
+
+    def __getstate__(self):
+        # Only options are pickled. A stream cannot be pickled. Records and index counters only belong to
+        # this parsing session.
+        return {'verbose': self.verbose, 'color': self.color}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def next_index(self, cls, count=1):
+        """
+        Allocate count consecutive indices of an IndexedHeader class. Return the first one.
+        """
+        first = self._next_indices.get(cls, cls.FIRST_INDEX)
+        self._next_indices[cls] = first + count
+        return first
+
+    def index_counts(self):
+        """
+        Return a dict of the number of indices allocated for each IndexedHeader class.
+        """
+        return dict([(cls, next_ - cls.FIRST_INDEX) for (cls, next_) in self._next_indices.items()])
+
+    def reset_index(self, cls):
+        self._next_indices.pop(cls, None)
+
+    def reset_indices(self):
+        self._next_indices.clear()
+
+    def write(self, output):
+        stream = self.stream
+        if stream is None:
+            stream = sys.stdout
+        stream.write(output)
+        stream.flush()
+
+    def record(self, event):
+        self.records.append((datetime.datetime.now(), event))
+
+
+ParseContext.DEFAULT = ParseContext()
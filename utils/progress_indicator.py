@@ -1,52 +1,71 @@
-import sys
-import datetime
+from parse_context import ParseContext
 
 
 class ProgressIndicator(object):
+    """
+    ProgressIndicator writes progress messages to the current ParseContext (or the given one) and records
+    them there. ENABLED is the default for contexts that do not set verbose.
+    """
     ENABLED = True
-    RECORDS = list()
 
-    def __init__(self, prompt, frequency):
-        self._display(prompt)
-        self._record(prompt + 'start')
+    def __init__(self, prompt, frequency, context=None):
+        if context is None:
+            context = ParseContext.current()
+        self.context = context
+        self._display(prompt, context)
+        self._record(prompt + 'start', context)
         self.prompt = prompt
         self.frequency = frequency
         self.count = 0
 
     def click(self):
         if (self.count % self.frequency) == 0:
-            self._display('.')
+            self._display('.', self.context)
         self.count += 1
 
     def done(self):
-        self._display('\n')
-        self._record(self.prompt + 'done (%d entries)' % self.count)
+        self._display('\n', self.context)
+        self._record(self.prompt + 'done (%d entries)' % self.count, self.context)
 
     @classmethod
-    def display(cls, fmt, *args):
-        if cls.ENABLED:
+    def is_enabled(cls, context=None):
+        if context is None:
+            context = ParseContext.current()
+        if context.verbose is None:
+            return cls.ENABLED
+        return context.verbose
+
+    @classmethod
+    def display(cls, fmt, *args, **kwargs):
+        context = kwargs.get('context', None)
+        if context is None:
+            context = ParseContext.current()
+        if cls.is_enabled(context):
             if len(args) == 0:
                 output = fmt
             else:
                 output = fmt % tuple(args)
-            cls._display(output)
-            cls._record(output)
+            cls._display(output, context)
+            cls._record(output, context)
 
     @classmethod
-    def _display(cls, output):
-        if cls.ENABLED:
-            sys.stdout.write(output)
-            sys.stdout.flush()
+    def _display(cls, output, context):
+        if cls.is_enabled(context):
+            context.write(output)
 
     @classmethod
-    def _record(cls, event):
-        cls.RECORDS.append((datetime.datetime.now(), event))
+    def _record(cls, event, context):
+        context.record(event)
 
     @classmethod
-    def clear(cls):
-        cls.RECORDS = list()
+    def clear(cls, context=None):
+        if context is None:
+            context = ParseContext.current()
+        context.records = list()
 
     @classmethod
-    def dump_records(cls):
-        for (timestamp, event) in cls.RECORDS:
+    def dump_records(cls, context=None):
+        if context is None:
+            context = ParseContext.current()
+        for (timestamp, event) in context.records:
             print '%s: %s' % (str(timestamp), event)